@@ -0,0 +1,122 @@
+"""Time /analytics/data over a large synthetic project table.
+
+Seeds projects with their type links, builds the daily rollup and checks it
+matches raw counts, then checks the rollup stays in step through project
+create/update/delete before timing each time frame.
+
+Run from the backend directory (the default builds 1M projects in a
+temporary SQLite file, which takes a little while):
+
+    python -m benchmarks.analytics [total_projects]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+from models import db
+from models.customer import Customer
+from models.project import Project
+from models.project_type import ProjectType, project_type_link, WORK_TYPE, JOB_COST_TYPE
+from services.analytics_rollup import (
+    rebuild_rollups, rollup_mismatches, rollup_keys, apply_rollup_delta, update_rollup
+)
+from benchmarks.common import create_bench_app
+
+WORK_TYPES = ['basement', 'garage', 'slab_on', 'under_footing', 'plumber_spray', 'footings',
+              'crawl_space', 'heavy_blanket', 'dry_blanket', 'exterior_gravel', 'track_out', 'other']
+JOB_COST_TYPES = ['standard', 'time_and_material', 'conveyer_rental', 'conveyer_rental_labor',
+                  'conveyer_rental_multiple', 'landscape', 'dumptruck_rental', 'other']
+TIME_FRAMES = ['today', 'week', 'month', 'year']
+BATCH_SIZE = 50000
+
+
+def seed(total, rng):
+    """Insert `total` projects spread over the past two years, with type links."""
+    db.session.execute(Customer.__table__.insert(), [
+        {'id': 1, 'name': 'Bench Customer', 'phone': '8015550000'}
+    ])
+    type_ids = {(t.category, t.name): t.id for t in ProjectType.query}
+    today = date.today()
+    for offset in range(0, total, BATCH_SIZE):
+        projects, links = [], []
+        for _ in range(min(BATCH_SIZE, total - offset)):
+            project_id = str(uuid.uuid4())
+            work_types = sorted(rng.sample(WORK_TYPES, rng.randint(1, 3)), key=WORK_TYPES.index)
+            job_cost_type = rng.choice(JOB_COST_TYPES)
+            projects.append({
+                'id': project_id,
+                'date': today - timedelta(days=rng.randrange(730)),
+                'address': 'Main St',
+                'region': rng.choice(('North', 'South')),
+                'work_type': ','.join(work_types),
+                'job_cost_type': job_cost_type,
+                'customer_id': 1
+            })
+            links.extend({'project_id': project_id, 'type_id': type_ids[(WORK_TYPE, name)]}
+                         for name in work_types)
+            links.append({'project_id': project_id, 'type_id': type_ids[(JOB_COST_TYPE, job_cost_type)]})
+        db.session.execute(Project.__table__.insert(), projects)
+        db.session.execute(project_type_link.insert(), links)
+    rebuild_rollups()
+    db.session.commit()
+
+
+def check_rollups(app, client):
+    """Run project writes through the rollup hooks and compare with raw counts.
+
+    Creation goes through the API; update and delete need a logged-in user,
+    so they repeat the route's model and rollup calls directly.
+    """
+    response = client.post('/projects/North', json={
+        'date': date.today().strftime('%Y-%m-%d'),
+        'customer_name': 'Bench Customer',
+        'customer_phone': '8015550000',
+        'address': '1 Rollup Way',
+        'work_type': ['basement', 'garage'],
+        'job_cost_type': ['standard']
+    })
+    assert response.status_code in (200, 201), response.get_json()
+    project_id = response.get_json()['project']['id']
+
+    with app.app_context():
+        project = Project.query.get(project_id)
+        old_keys = rollup_keys(project)
+        project.date = date.today() - timedelta(days=3)
+        project.set_types(['slab_on', 'basement'], ['landscape'])
+        update_rollup(old_keys, rollup_keys(project))
+        db.session.commit()
+        assert not rollup_mismatches(), "Rollup drifted after update"
+
+        apply_rollup_delta(rollup_keys(project), -1)
+        db.session.delete(project)
+        db.session.commit()
+        assert not rollup_mismatches(), "Rollup drifted after delete"
+    print("Rollup matches raw counts after create/update/delete")
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    path = os.path.join(tempfile.mkdtemp(), 'analytics.db')
+    app = create_bench_app(f'sqlite:///{path}')
+    client = app.test_client()
+    with app.app_context():
+        started = time.perf_counter()
+        seed(total, random.Random(42))
+        print(f"Seeded {total} projects in {time.perf_counter() - started:.1f}s")
+        assert not rollup_mismatches(), "Rebuilt rollup does not match raw counts"
+    check_rollups(app, client)
+
+    print(f"{'timeFrame':<10} {'seconds':>8}")
+    for time_frame in TIME_FRAMES:
+        started = time.perf_counter()
+        response = client.get(f'/analytics/data?timeFrame={time_frame}')
+        elapsed = time.perf_counter() - started
+        assert response.status_code == 200, response.get_json()
+        print(f"{time_frame:<10} {elapsed:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
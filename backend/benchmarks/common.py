@@ -0,0 +1,51 @@
+from contextlib import contextmanager
+from flask import Flask
+from sqlalchemy import event
+from config import Config
+from models import db, configure_database
+from migrations import upgrade
+
+
+def create_bench_app(database_uri='sqlite://', **config):
+    """Create a minimal backend app on a throwaway database.
+
+    The real `app.py` starts the reminder scheduler and points at the live
+    database on import, so benchmarks build their own app around the same
+    models and blueprints instead.
+    """
+    from routes.projects import projects_bp
+    from routes.analytics import analytics
+    from routes.customers import customers_bp
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'bench'
+    app.config['JWT_SECRET_KEY'] = 'bench'
+    app.config.update(config)
+    configure_database(app)
+    app.register_blueprint(projects_bp, url_prefix='/projects')
+    app.register_blueprint(analytics, url_prefix='/analytics')
+    app.register_blueprint(customers_bp)
+
+    with app.app_context():
+        db.create_all()
+        upgrade()
+    return app
+
+
+@contextmanager
+def count_queries():
+    """Count the SQL statements executed inside the block."""
+    counter = {'count': 0}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter['count'] += 1
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
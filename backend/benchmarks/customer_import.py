@@ -0,0 +1,82 @@
+"""Measure customer CSV import throughput in rows per second.
+
+Writes a synthetic QuickBooks-style export where half the phones belong to
+customers already in the database and imports it three times: into the new
+database, again unchanged (which must write nothing), and once more with a
+few changed emails, some of them listed twice, which must update each of
+those customers once. Checks the resulting counts.
+
+Run from the backend directory:
+
+    python -m benchmarks.customer_import [rows]
+"""
+import csv
+import os
+import sys
+import tempfile
+import time
+from models import db
+from models.customer import Customer
+from models.customer_change import CustomerChange
+from services.csv_service import import_customers_from_csv
+from benchmarks.common import create_bench_app, count_queries
+
+HEADERS = ['Customer', 'First_Name', 'Last_Name', 'Phone', 'Main_Email']
+
+
+def write_csv(path, total, changed=0):
+    """Write `total` customers; the first `changed` get a new email and are listed twice."""
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(HEADERS)
+        for i in range(total):
+            email = f'new{i}@example.com' if i < changed else f'customer{i}@example.com'
+            writer.writerow([f'Customer {i}', f'First{i}', f'Last{i}', f'8{i:09d}', email])
+        for i in range(changed):
+            writer.writerow([f'Customer {i}', f'First{i}', f'Last{i}', f'8{i:09d}', f'new{i}@example.com'])
+
+
+def seed_existing(total):
+    """Insert customers for every other phone in the CSV."""
+    db.session.execute(Customer.__table__.insert(), [
+        {'name': f'Old {i}', 'phone': f'8{i:09d}'} for i in range(0, total, 2)
+    ])
+    db.session.commit()
+
+
+def timed_import(path, total):
+    with count_queries() as queries:
+        started = time.perf_counter()
+        result = import_customers_from_csv(path)
+        elapsed = time.perf_counter() - started
+    assert result['success'], result
+    print(f"{result['message']}: {total / elapsed:,.0f} rows/sec, {queries['count']} queries")
+    return result
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    path = os.path.join(tempfile.mkdtemp(), 'cust_list.csv')
+    write_csv(path, total)
+    app = create_bench_app()
+    with app.app_context():
+        seed_existing(total)
+        result = timed_import(path, total)
+        assert result['imported'] == total // 2 and result['updated'] == (total + 1) // 2, result
+
+        version = db.session.query(db.func.max(CustomerChange.id)).scalar()
+        result = timed_import(path, total)
+        assert result['imported'] == 0 and result['updated'] == 0 and result['skipped'] == total, result
+        assert db.session.query(db.func.max(CustomerChange.id)).scalar() == version, "unchanged rows were rewritten"
+
+        changed = min(100, total)
+        write_csv(path, total, changed)
+        result = timed_import(path, total + changed)
+        assert result['imported'] == 0 and result['updated'] == changed, result
+        assert Customer.query.count() == total
+        customer = Customer.query.filter_by(phone='8000000000').one()
+        assert customer.name == 'Customer 0' and customer.email == 'new0@example.com'
+
+
+if __name__ == '__main__':
+    main()
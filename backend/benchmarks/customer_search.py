@@ -0,0 +1,110 @@
+"""Measure customer autocomplete latency against 100k customers.
+
+Loads synthetic customers, builds the search index, then replays
+autocomplete traffic (every prefix of a name as it is typed, names with a
+typo, email fragments and phone fragments) through the search service and
+reports latency percentiles. Also checks that ORM writes reach the index
+without a rebuild.
+
+Run from the backend directory:
+
+    python -m benchmarks.customer_search [customers]
+"""
+import random
+import sys
+import time
+from models import db
+from models.customer import Customer
+from services.customer_search import search_customers
+from benchmarks.common import create_bench_app
+
+FIRST_NAMES = ['james', 'mary', 'john', 'patricia', 'robert', 'jennifer', 'michael', 'linda', 'david',
+               'elizabeth', 'william', 'barbara', 'richard', 'susan', 'joseph', 'jessica', 'thomas',
+               'sarah', 'charles', 'karen', 'christopher', 'nancy', 'daniel', 'lisa', 'matthew']
+LAST_NAMES = ['smith', 'johnson', 'williams', 'brown', 'jones', 'garcia', 'miller', 'davis',
+              'rodriguez', 'martinez', 'hernandez', 'lopez', 'gonzalez', 'wilson', 'anderson',
+              'thomas', 'taylor', 'moore', 'jackson', 'martin', 'lee', 'perez', 'thompson', 'white']
+COMPANIES = ['homes', 'builders', 'construction', 'development', 'contracting', 'plumbing']
+QUERIES = 5000
+
+
+def synthetic_customers(total, rng):
+    for i in range(total):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        name = f'{first.title()} {last.title()}'
+        if i % 4 == 0:
+            name = f'{last.title()} {rng.choice(COMPANIES).title()} {i}'
+        yield {
+            'name': name,
+            'first_name': first.title(),
+            'last_name': last.title(),
+            'phone': f'(801) {rng.randrange(200, 999)}-{i % 10000:04d}',
+            'email': f'{first}.{last}{i}@example.com'
+        }
+
+
+def with_typo(word, rng):
+    i = rng.randrange(1, len(word))
+    return word[:i - 1] + word[i] + word[i - 1] + word[i + 1:]
+
+
+def autocomplete_queries(customers, rng):
+    for _ in range(QUERIES):
+        customer = rng.choice(customers)
+        kind = rng.random()
+        if kind < 0.6:
+            name = customer['name']
+            yield name[:rng.randint(2, len(name))]
+        elif kind < 0.75:
+            yield ' '.join(with_typo(w, rng) if len(w) > 4 else w for w in customer['name'].split())
+        elif kind < 0.85:
+            yield customer['email'].split('@')[0][:rng.randint(3, 12)]
+        else:
+            # As typed: from the start of the number, or a run of its digits
+            phone = customer['phone']
+            yield phone[:rng.randint(4, len(phone))] if rng.random() < 0.5 else phone[-4:]
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rng = random.Random(3)
+    customers = list(synthetic_customers(total, rng))
+    app = create_bench_app()
+    with app.app_context():
+        db.session.execute(Customer.__table__.insert(), customers)
+        db.session.commit()
+
+        started = time.perf_counter()
+        search_customers('warm up')
+        print(f"Built index over {total} customers in {time.perf_counter() - started:.2f}s")
+
+        timings = []
+        misses = 0
+        for query in autocomplete_queries(customers, rng):
+            started = time.perf_counter()
+            results = search_customers(query)
+            timings.append((time.perf_counter() - started) * 1000)
+            misses += not results
+        timings.sort()
+        print(f"{len(timings)} queries, {misses} without results")
+        print(f"p50 {percentile(timings, 0.5):.2f} ms  p95 {percentile(timings, 0.95):.2f} ms  "
+              f"p99 {percentile(timings, 0.99):.2f} ms  max {timings[-1]:.2f} ms")
+
+        # Writes through the ORM are searchable as soon as they commit
+        customer = Customer(name='Zebediah Quartermaine', phone='(435) 555-0199', email='zq@example.com')
+        db.session.add(customer)
+        db.session.commit()
+        assert search_customers('zebedaih quart')[0]['id'] == customer.id
+        assert search_customers('435-555-01')[0]['id'] == customer.id
+        db.session.delete(customer)
+        db.session.commit()
+        assert not search_customers('zebediah quartermaine')
+        print("ORM inserts and deletes reach the index on commit")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Time rendering reminder emails from the precompiled templates.
+
+Renders a batch of reminder bodies the way the daily job does, once with the
+templates compiled at import (as EmailService uses them) and once compiling
+the template for every message, which is what loading templates per send
+would cost. Also checks that customer-supplied fields are escaped.
+
+Run from the backend directory:
+
+    python -m benchmarks.email_render [emails]
+"""
+import sys
+import time
+from jinja2 import Environment, FileSystemLoader
+from services.email_templates import TEMPLATE_DIR, render_email
+
+
+def payload(i):
+    return {
+        'customer_name': f'Customer {i}',
+        'project_date': '2030-01-01',
+        'address': f'{i} Main St',
+        'customer_phone': f'801555{i:04d}',
+        'po': f'PO-{i}' if i % 2 else None,
+        'city': 'Salt Lake City',
+        'lot_number': str(i % 90),
+        'job_cost_type': ['time_and_material'],
+        'work_type': ['basement', 'garage'],
+        'notes': 'Gate code 1234' if i % 3 else None
+    }
+
+
+def render_uncached(**context):
+    environment = Environment(loader=FileSystemLoader(TEMPLATE_DIR), autoescape=True,
+                              trim_blocks=True, lstrip_blocks=True, cache_size=0)
+    template = environment.get_template('reminder.html')
+    return template.render(job_cost_types=', '.join(context.pop('job_cost_type')),
+                           work_types=', '.join(context.pop('work_type')), **context)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    payloads = [payload(i) for i in range(count)]
+
+    started = time.perf_counter()
+    for p in payloads:
+        render_email('reminder', format_types=False, **p)
+    precompiled = time.perf_counter() - started
+
+    sample = payloads[:max(count // 20, 1)]
+    started = time.perf_counter()
+    for p in sample:
+        render_uncached(**p)
+    per_message = (time.perf_counter() - started) / len(sample)
+
+    print(f"{count} reminder emails")
+    print(f"precompiled templates   {1000 * precompiled / count:7.3f} ms/email  {count / precompiled:8.0f} emails/s")
+    print(f"compiled per message    {1000 * per_message:7.3f} ms/email  {1 / per_message:8.0f} emails/s")
+
+    html = render_email('reminder', format_types=False,
+                        **dict(payload(0), customer_name='<script>alert(1)</script>'))
+    assert '<script>' not in html and '&lt;script&gt;' in html
+    print("Customer fields are HTML-escaped")
+
+
+if __name__ == '__main__':
+    main()
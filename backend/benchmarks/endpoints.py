@@ -0,0 +1,285 @@
+"""Time the main backend endpoints on synthetic data at several sizes.
+
+For each scale, builds a fresh SQLite database with `benchmarks.synthetic`
+and times these requests through Flask's test client:
+
+  get_projects          GET /projects/North for a month, as the day view's data
+  get_projects_page     GET /projects/North?limit=500, the first keyset page
+  get_projects_by_date  GET /projects/North/date/<day>
+  calendar              GET /calendar/North for the six-week window, logged
+                        in, rendering frontend/templates/calendar.html
+  calendar_window_api   GET /projects/North for the same window, in pages of
+                        500 following X-Next-Cursor, as the frontend calendar
+                        loads it
+  analytics_month       GET /analytics/data?timeFrame=month
+  analytics_year        GET /analytics/data?timeFrame=year
+  customer_search       GET /search-customers?q=..., typed and mistyped names,
+                        phone digits (the index is built during warm-up)
+  create_project        POST /projects/North for an existing customer
+  update_project        PUT /projects/North/<id>, changing the types
+  csv_import            POST /import-customers, half new and half known phones
+
+Reads run before writes, so every read sees the same data. The customer
+and calendar views are the same ones app.py serves. The backend renders
+pages from the frontend's templates, which in this checkout are in
+frontend/templates. Slow query capture is off so that EXPLAIN runs do not
+add to the timings.
+
+Results (median, p95, min and max in ms, plus SQL statements per request)
+are saved as JSON, by default to benchmarks/results/<commit>.json, and can
+be compared with an earlier run:
+
+    python -m benchmarks.endpoints --scales 1000,10000,100000
+    python -m benchmarks.endpoints --compare benchmarks/results/abc1234.json
+    python -m benchmarks.endpoints --compare old.json --against new.json
+
+Run from the backend directory. 1,000,000 projects work too, but building
+the data and running the suite then take several minutes.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import date, datetime, timedelta
+from flask_jwt_extended import JWTManager, create_access_token
+from flask_login import LoginManager
+from models import db
+from models.project import Project
+from models.user import User
+from routes.pages import calendar
+from services import customer_search
+from benchmarks.common import count_queries, create_bench_app
+from benchmarks.synthetic import customer_csv, customer_phone, populate
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'frontend', 'templates')
+SEARCH_TERMS = ['smith', 'jonson', 'christensen', 'peterson homes', '801200', 'megan']
+CALENDAR_PAGE_SIZE = 500
+CSV_ROWS = 2000
+# Slower by more than this fraction counts as a regression in --compare
+TOLERANCE = 0.10
+
+
+def build(scale, workdir):
+    """A bench app on a new database with `scale` synthetic projects."""
+    path = os.path.join(workdir, f'endpoints-{scale}.db')
+    with redirect_stdout(io.StringIO()):
+        app = create_bench_app(f'sqlite:///{path}', SLOW_QUERY_MS=None)
+    JWTManager(app)
+    app.template_folder = TEMPLATES_DIR
+    app.add_url_rule('/calendar/<region>', view_func=calendar)
+    login_manager = LoginManager(app)
+    login_manager.user_loader(lambda user_id: User.query.get(int(user_id)))
+    started = time.perf_counter()
+    with app.app_context():
+        summary = populate(scale)
+        summary['populate_seconds'] = round(time.perf_counter() - started, 2)
+        admin = User.query.filter_by(username='admin0').one()
+        summary['token'] = create_access_token(identity=str(admin.id), expires_delta=timedelta(days=1))
+        summary['admin_id'] = admin.id
+        summary['project_ids'] = [row.id for row in Project.query.filter_by(region='North').limit(200)]
+    return app, summary
+
+
+def cases(client, summary, repeat, app):
+    """Name -> (function taking the call number and returning the responses, calls to time)."""
+    today = date.today()
+    month = (today.replace(day=1), (today.replace(day=1) + timedelta(days=32)).replace(day=1))
+    first = today.replace(day=1)
+    window_start = first - timedelta(days=(first.weekday() + 1) % 7)
+    auth = {'Authorization': f"Bearer {summary['token']}"}
+    project_ids = summary['project_ids']
+    busy_day = today + timedelta(days=1)
+    window = {'start': window_start.isoformat(), 'end': (window_start + timedelta(weeks=6)).isoformat()}
+    logged_in = app.test_client()
+    with logged_in.session_transaction() as session:
+        session['_user_id'] = str(summary['admin_id'])
+        session['_fresh'] = True
+
+    def calendar_page(i):
+        response = logged_in.get('/calendar/North', query_string=window)
+        # The view renders an empty calendar when listing the projects fails
+        if b'var projectsData = [{' not in response.data:
+            raise RuntimeError("the calendar page rendered without projects")
+        return response
+
+    def calendar_window_api(i):
+        params = dict(window, limit=CALENDAR_PAGE_SIZE)
+        responses = []
+        while True:
+            responses.append(client.get('/projects/North', query_string=params))
+            cursor = responses[-1].headers.get('X-Next-Cursor')
+            if not cursor:
+                return responses
+            params['cursor'] = cursor
+
+    def project_json(i, day):
+        return {
+            'date': day.isoformat(), 'address': f'{i} Benchmark Way', 'city': 'Ogden',
+            'customer_name': 'Benchmark Customer', 'customer_phone': customer_phone(i % summary['customers']),
+            'work_type': ['basement', 'garage'] if i % 2 else ['slab_on'],
+            'job_cost_type': ['standard'] if i % 3 else ['time_and_material']
+        }
+
+    def csv_import(i):
+        text = customer_csv(CSV_ROWS, summary['customers'], summary['customers'] + i * CSV_ROWS, seed=i)
+        return client.post('/import-customers', content_type='multipart/form-data',
+                           data={'file': (io.BytesIO(text.encode()), 'customers.csv')})
+
+    return {
+        'get_projects': (lambda i: client.get(f'/projects/North?start={month[0]}&end={month[1]}'), repeat),
+        'get_projects_page': (lambda i: client.get(f'/projects/North?limit={CALENDAR_PAGE_SIZE}'), repeat),
+        'get_projects_by_date': (lambda i: client.get(f'/projects/North/date/{busy_day}'), repeat),
+        'calendar': (calendar_page, repeat),
+        'calendar_window_api': (calendar_window_api, repeat),
+        'analytics_month': (lambda i: client.get('/analytics/data?timeFrame=month'), repeat),
+        'analytics_year': (lambda i: client.get('/analytics/data?timeFrame=year'), repeat),
+        'customer_search': (lambda i: client.get('/search-customers', query_string={
+            'q': SEARCH_TERMS[i % len(SEARCH_TERMS)]}), repeat * 5),
+        'create_project': (lambda i: client.post('/projects/North', json=project_json(i, busy_day)), repeat),
+        'update_project': (lambda i: client.put(f'/projects/North/{project_ids[i % len(project_ids)]}',
+                                                json=project_json(i + 1, busy_day), headers=auth), repeat),
+        'csv_import': (csv_import, max(3, repeat // 4)),
+    }
+
+
+def time_case(app, request_fn, calls, warmup=2):
+    """Latency stats in ms over `calls` calls, after `warmup` untimed ones."""
+    for i in range(warmup):
+        request_fn(calls + i)
+    timings = []
+    statements = 0
+    with app.app_context(), count_queries() as queries:
+        for i in range(calls):
+            started = time.perf_counter()
+            responses = request_fn(i)
+            timings.append((time.perf_counter() - started) * 1000)
+            responses = responses if isinstance(responses, list) else [responses]
+            for response in responses:
+                if response.status_code >= 400:
+                    raise RuntimeError(f"{response.status_code}: {response.get_data(as_text=True)[:200]}")
+        statements = queries['count']
+    timings.sort()
+    return {
+        'calls': calls,
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[min(int(calls * 0.95), calls - 1)], 3),
+        'min_ms': round(timings[0], 3),
+        'max_ms': round(timings[-1], 3),
+        'statements_per_call': round(statements / calls, 1),
+        'response_bytes': sum(len(r.get_data()) for r in responses)
+    }
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                    capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+
+
+def run(scales, repeat, only):
+    commit, dirty = git_commit()
+    results = {
+        'commit': commit,
+        'dirty': dirty,
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'scales': {}
+    }
+    workdir = tempfile.mkdtemp()
+    for scale in scales:
+        print(f"Building {scale:,} projects...", flush=True)
+        app, summary = build(scale, workdir)
+        client = app.test_client()
+        customer_search.invalidate_customer_index()
+        data = {key: summary[key] for key in ('projects', 'customers', 'users', 'populate_seconds')}
+        results['scales'][str(scale)] = {'data': data, 'cases': {}}
+        print(f"  {'case':<22} {'median ms':>10} {'p95 ms':>9} {'SQL/call':>9}")
+        for name, (request_fn, calls) in cases(client, summary, repeat, app).items():
+            if only and name not in only:
+                continue
+            stats = time_case(app, request_fn, calls)
+            results['scales'][str(scale)]['cases'][name] = stats
+            print(f"  {name:<22} {stats['median_ms']:>10.2f} {stats['p95_ms']:>9.2f} {stats['statements_per_call']:>9}",
+                  flush=True)
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+    return results
+
+
+def compare(baseline, current, tolerance=TOLERANCE):
+    """Print median changes between two result files; returns the number of regressions."""
+    print(f"Comparing {current.get('commit')} against {baseline.get('commit')} (medians, ms)")
+    regressions = 0
+    for scale, results in current['scales'].items():
+        old_cases = baseline['scales'].get(scale, {}).get('cases', {})
+        for name, stats in results['cases'].items():
+            if name not in old_cases:
+                continue
+            old, new = old_cases[name]['median_ms'], stats['median_ms']
+            change = (new - old) / old if old else 0.0
+            flag = ''
+            if change > tolerance:
+                flag = '  slower'
+                regressions += 1
+            elif change < -tolerance:
+                flag = '  faster'
+            print(f"  {int(scale):>9,} {name:<22} {old:>10.2f} -> {new:>10.2f}  {change:+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scales', default='1000,10000', help='comma-separated project counts')
+    parser.add_argument('--repeat', type=int, default=20, help='timed calls per case')
+    parser.add_argument('--only', default='', help='comma-separated case names to run')
+    parser.add_argument('--output', help='results file (default: benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', metavar='BASELINE', help='results file to compare against')
+    parser.add_argument('--against', metavar='RESULTS', help='compare this file instead of running the suite')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help='slowdown that counts as a regression, as a fraction')
+    args = parser.parse_args()
+
+    if args.against:
+        with open(args.against) as f:
+            results = json.load(f)
+    else:
+        scales = [int(scale) for scale in args.scales.split(',')]
+        only = {name for name in args.only.split(',') if name}
+        results = run(scales, args.repeat, only)
+        output = args.output
+        if not output:
+            name = f"{results['commit'] or 'results'}{'-dirty' if results['dirty'] else ''}"
+            output = os.path.join(RESULTS_DIR, f'{name}.json')
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.tolerance)
+        if regressions:
+            sys.exit(f"{regressions} cases slower by more than {args.tolerance:.0%}")
+
+
+if __name__ == '__main__':
+    main()
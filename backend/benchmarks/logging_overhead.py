@@ -0,0 +1,110 @@
+"""Measure what logging costs on the project routes.
+
+Times GET /projects/<region> (a month of the calendar) and POST
+/projects/<region> through the test client under three setups:
+
+  warning      -- the production level; debug/info calls return early
+  debug, queue -- everything logged, written by the background listener
+  debug, sync  -- everything logged, written by the request thread, the way
+                  print() used to
+
+Log output goes to a temporary file so the terminal does not skew results.
+
+Run from the backend directory:
+
+    python -m benchmarks.logging_overhead [seconds]
+"""
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import redirect_stdout
+from datetime import date, timedelta
+import logging_setup
+from models import db
+from models.customer import Customer
+from models.project import Project
+from benchmarks.common import create_bench_app
+
+MONTH = (date(2030, 6, 1), date(2030, 7, 1))
+# Created projects land outside the listed month, so every mode lists the same rows
+CREATE_FROM = date(2031, 1, 1)
+
+
+def seed(count=2000):
+    db.session.add(Customer(id=1, name='Bench Customer', phone='8015550000'))
+    db.session.execute(Project.__table__.insert(), [{
+        'id': str(uuid.uuid4()), 'date': MONTH[0] + timedelta(days=i % 90),
+        'address': f'{i} Main St', 'region': 'North', 'customer_id': 1
+    } for i in range(count)])
+    db.session.commit()
+
+
+def throughput(request, seconds):
+    count = 0
+    stop_at = time.perf_counter() + seconds
+    while time.perf_counter() < stop_at:
+        response = request(count)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        count += 1
+    return count / seconds
+
+
+def use_logging(mode, log_file):
+    stdout = sys.stdout
+    sys.stdout = log_file
+    try:
+        logging_setup.configure_logging({'LOG_LEVEL': 'WARNING' if mode == 'warning' else 'DEBUG'})
+    finally:
+        sys.stdout = stdout
+    if mode == 'debug, sync':
+        # Same records and format, but written by the calling thread
+        logging_setup.shutdown_logging()
+        handler = logging.StreamHandler(log_file)
+        handler.setFormatter(logging_setup.KeyValueFormatter(logging_setup.TEXT_FORMAT))
+        logging.getLogger().addHandler(handler)
+        return handler
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+    with redirect_stdout(io.StringIO()):
+        app = create_bench_app(f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    with app.app_context():
+        seed()
+    client = app.test_client()
+    log_file = open(os.path.join(workdir, 'bench.log'), 'w')
+
+    def list_month(i):
+        return client.get(f'/projects/North?start={MONTH[0]}&end={MONTH[1]}')
+
+    def create(i):
+        return client.post('/projects/North', json={
+            'date': str(CREATE_FROM + timedelta(days=i % 30)), 'address': f'{i} Oak St',
+            'customer_name': 'Bench Customer', 'customer_phone': '8015550000',
+            'work_type': ['basement'], 'job_cost_type': ['time_and_material']
+        })
+
+    print(f"{'logging':<14} {'GET req/s':>10} {'POST req/s':>11} {'log lines':>10}")
+    for mode in ('warning', 'debug, queue', 'debug, sync'):
+        sync_handler = use_logging(mode, log_file)
+        get_rps = throughput(list_month, seconds)
+        post_rps = throughput(create, seconds)
+        logging_setup.shutdown_logging()
+        if sync_handler:
+            logging.getLogger().removeHandler(sync_handler)
+        log_file.flush()
+        with open(log_file.name) as f:
+            lines = sum(1 for _ in f)
+        log_file.truncate(0)
+        log_file.seek(0)
+        print(f"{mode:<14} {get_rps:>10.0f} {post_rps:>11.0f} {lines:>10}")
+
+
+if __name__ == '__main__':
+    main()
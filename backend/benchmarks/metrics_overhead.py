@@ -0,0 +1,119 @@
+"""Measure what the /metrics instrumentation costs on the project routes.
+
+Times GET /projects/<region> (a month of the calendar) and POST
+/projects/<region> through the test client on two apps over the same
+database, one plain and one with `init_metrics` timing requests and
+counting their SQL. Rounds alternate between the two so drift on the machine
+affects both; the best round of each is reported. Also times a bare
+Histogram.observe, and checks the scraped statement counts against the
+statements actually run and that snapshots from several processes add up.
+
+Run from the backend directory:
+
+    python -m benchmarks.metrics_overhead [seconds]
+"""
+import io
+import json
+import os
+import sys
+import tempfile
+import timeit
+from contextlib import redirect_stdout
+from datetime import timedelta
+from shared.metrics import Registry, init_metrics
+from benchmarks.common import count_queries, create_bench_app
+from benchmarks.logging_overhead import CREATE_FROM, MONTH, seed, throughput
+
+ROUNDS = 3
+
+
+def scraped(text, name):
+    """Sum of a sample over all label sets in /metrics output."""
+    return sum(float(line.rsplit(' ', 1)[1]) for line in text.splitlines()
+               if line.startswith(name + '{') or line.startswith(name + ' '))
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 2
+    workdir = tempfile.mkdtemp()
+    uri = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    metrics_dir = os.path.join(workdir, 'metrics')
+    with redirect_stdout(io.StringIO()):
+        plain = create_bench_app(uri)
+        measured = create_bench_app(uri)
+    with plain.app_context():
+        seed()
+    registry = Registry()
+    with measured.app_context():
+        from models import db
+        init_metrics(measured, registry, engine=db.engine, directory=metrics_dir)
+
+    def requests_for(app):
+        client = app.test_client()
+
+        def list_month(i):
+            return client.get(f'/projects/North?start={MONTH[0]}&end={MONTH[1]}')
+
+        def create(i):
+            return client.post('/projects/North', json={
+                'date': str(CREATE_FROM + timedelta(days=i % 30)), 'address': f'{i} Oak St',
+                'customer_name': 'Bench Customer', 'customer_phone': '8015550000',
+                'work_type': ['basement'], 'job_cost_type': ['time_and_material']
+            })
+        return list_month, create
+
+    best = {}
+    for _ in range(ROUNDS):
+        for name, app in (('plain', plain), ('metrics', measured)):
+            list_month, create = requests_for(app)
+            rates = (throughput(list_month, seconds), throughput(create, seconds))
+            best[name] = tuple(max(a, b) for a, b in zip(best.get(name, (0, 0)), rates))
+
+    print(f"{'app':<8} {'GET req/s':>10} {'POST req/s':>11}")
+    for name, (get_rps, post_rps) in best.items():
+        print(f"{name:<8} {get_rps:>10.0f} {post_rps:>11.0f}")
+    for i, route in enumerate(('GET', 'POST')):
+        cost = 1e6 / best['metrics'][i] - 1e6 / best['plain'][i]
+        print(f"{route} overhead: {cost:+.0f} us/request ({cost * best['plain'][i] / 1e4:+.1f}%)")
+
+    histogram = registry.histogram('bench_seconds', 'bench', ('endpoint',))
+    runs = 200000
+    per_call = timeit.timeit(lambda: histogram.observe(0.003, 'bench'), number=runs) / runs
+    print(f"Histogram.observe: {per_call * 1e6:.2f} us")
+
+    failures = 0
+    client = measured.test_client()
+    before = client.get('/metrics').get_data(as_text=True)
+    with measured.app_context(), count_queries() as queries:
+        for _ in range(10):
+            client.get(f'/projects/North?start={MONTH[0]}&end={MONTH[1]}')
+    after = client.get('/metrics').get_data(as_text=True)
+    counted = scraped(after, 'http_request_sql_statements_sum') - scraped(before, 'http_request_sql_statements_sum')
+    if counted != queries['count']:
+        failures += 1
+        print(f"FAIL statements scraped {counted:.0f}, run {queries['count']}")
+    else:
+        print(f"ok   /metrics counted all {queries['count']} statements of 10 listings")
+
+    # Pose as two more workers: the parent process (alive) and one that has exited
+    snapshot = registry.snapshot()
+    for pid in (os.getppid(), 999999999):
+        with open(os.path.join(metrics_dir, f'{pid}.json'), 'w') as f:
+            json.dump(snapshot, f)
+    handled = sum(count for _, counts in snapshot['http_request_duration_seconds']['samples']
+                  for count in counts[:-1])
+    combined = client.get('/metrics').get_data(as_text=True)
+    if scraped(combined, 'http_request_duration_seconds_count') != 2 * handled:
+        failures += 1
+        print("FAIL snapshots from another process were not added up")
+    elif os.path.exists(os.path.join(metrics_dir, '999999999.json')):
+        failures += 1
+        print("FAIL snapshot of an exited process was kept")
+    else:
+        print("ok   /metrics adds up live processes and drops exited ones")
+    if failures:
+        sys.exit(f"{failures} checks failed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Show that saving a project no longer waits on email/SMS providers.
+
+Fake transports sleep for a configurable provider latency; the request is
+timed while they are that slow, then the outbox is drained to confirm every
+notification is still delivered.
+
+Run from the backend directory:
+
+    python -m benchmarks.notification_latency
+"""
+import os
+import tempfile
+import time
+from models.outbox import OutboxMessage
+from services.notification_queue import (
+    NotificationQueue, PROJECT_CONFIRMATION_EMAIL, PROJECT_UPDATE_EMAIL, PROJECT_SMS
+)
+from benchmarks.common import create_bench_app
+
+PROVIDER_LATENCIES = [0.0, 0.5, 2.0]
+REQUESTS_PER_LATENCY = 5
+
+
+def fake_transport(latency, sent):
+    def send(payload):
+        time.sleep(latency)
+        sent.append(payload)
+        return True
+    return send
+
+
+def project_payload(i):
+    return {
+        'date': '2030-01-15',
+        'customer_name': f'Customer {i}',
+        'customer_phone': f'801555{i:04d}',
+        'customer_email': f'customer{i}@example.com',
+        'address': f'{i} Main St',
+        'work_type': ['basement'],
+        'job_cost_type': ['standard'],
+    }
+
+
+def main():
+    # create_project writes region exports relative to the working directory
+    os.chdir(tempfile.mkdtemp())
+    app = create_bench_app()
+    client = app.test_client()
+
+    print(f"{'provider s':>10} {'request ms':>11} {'delivered':>10}")
+    for latency in PROVIDER_LATENCIES:
+        sent = []
+        transport = fake_transport(latency, sent)
+        queue = NotificationQueue(app, handlers={
+            PROJECT_CONFIRMATION_EMAIL: transport,
+            PROJECT_UPDATE_EMAIL: transport,
+            PROJECT_SMS: transport,
+        })
+
+        timings = []
+        for i in range(REQUESTS_PER_LATENCY):
+            started = time.perf_counter()
+            response = client.post('/projects/North', json=project_payload(i))
+            timings.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.get_json()
+
+        queue.drain()
+        with app.app_context():
+            pending = OutboxMessage.query.filter_by(status=OutboxMessage.PENDING).count()
+            assert pending == 0
+        print(f"{latency:>10.1f} {1000 * sum(timings) / len(timings):>11.1f} {len(sent):>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Check that /projects/export streams with flat memory use.
+
+Seeds a temporary SQLite database with each size in turn and streams the
+full export in a fresh process, reporting that process's peak RSS. Peak
+memory should stay roughly constant as the row count grows.
+
+Run from the backend directory (the largest default size is 1M projects):
+
+    python -m benchmarks.project_export [rows ...]
+"""
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+from models import db
+from models.customer import Customer
+from models.project import Project
+from benchmarks.common import create_bench_app
+
+SIZES = [10000, 100000, 1000000]
+BATCH_SIZE = 10000
+
+
+def seed(path, total):
+    """Create a database file holding `total` projects."""
+    app = create_bench_app(f'sqlite:///{path}')
+    with app.app_context():
+        db.session.execute(Customer.__table__.insert(), [
+            {'id': i, 'name': f'Customer {i}', 'phone': f'801555{i:04d}', 'email': f'customer{i}@example.com'}
+            for i in range(1, 1001)
+        ])
+        today = date.today()
+        for offset in range(0, total, BATCH_SIZE):
+            db.session.execute(Project.__table__.insert(), [{
+                'id': str(uuid.uuid4()),
+                'date': today + timedelta(days=i % 730),
+                'address': f'{i} Main St',
+                'city': 'Salt Lake City',
+                'region': ('North', 'South')[i % 2],
+                'work_type': 'basement,garage',
+                'job_cost_type': 'standard',
+                'notes': 'Bench project',
+                'customer_id': i % 1000 + 1
+            } for i in range(offset, min(offset + BATCH_SIZE, total))])
+            db.session.commit()
+
+
+def stream_export(path):
+    """Stream the export from `path` and print rows, bytes, seconds and peak RSS."""
+    app = create_bench_app(f'sqlite:///{path}')
+    client = app.test_client()
+    started = time.perf_counter()
+    response = client.get('/projects/export', buffered=False)
+    assert response.status_code == 200
+    lines = size = 0
+    for chunk in response.iter_encoded():
+        lines += chunk.count(b'\n')
+        size += len(chunk)
+    response.close()
+    elapsed = time.perf_counter() - started
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(lines - 1, size, f'{elapsed:.1f}', peak_kb)
+
+
+def main(sizes):
+    print(f"{'rows':>9} {'MB sent':>8} {'seconds':>8} {'peak RSS MB':>12}")
+    for total in sizes:
+        path = os.path.join(tempfile.mkdtemp(), 'export.db')
+        seed(path, total)
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.project_export', '--stream', path],
+            check=True, capture_output=True, text=True
+        ).stdout.split('\n')[-2]
+        rows, size, elapsed, peak_kb = output.split()
+        assert int(rows) == total, f"exported {rows} of {total} rows"
+        print(f"{total:>9} {int(size) / 2**20:>8.1f} {elapsed:>8} {int(peak_kb) / 1024:>12.1f}")
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--stream']:
+        stream_export(sys.argv[2])
+    else:
+        main([int(arg) for arg in sys.argv[1:]] or SIZES)
@@ -0,0 +1,62 @@
+"""Show that project listings issue a constant number of queries.
+
+Run from the backend directory:
+
+    python -m benchmarks.project_listing
+"""
+import time
+import uuid
+from datetime import date, timedelta
+from models import db
+from models.customer import Customer
+from models.project import Project
+from benchmarks.common import create_bench_app, count_queries
+
+SIZES = [100, 1000, 5000, 20000]
+
+
+def seed_projects(total):
+    """Replace the database contents with `total` North projects."""
+    db.drop_all()
+    db.create_all()
+    customers = [
+        Customer(name=f'Customer {i}', phone=f'801555{i:04d}', email=f'customer{i}@example.com')
+        for i in range(max(total // 10, 1))
+    ]
+    db.session.add_all(customers)
+    db.session.flush()
+    start = date.today()
+    db.session.bulk_save_objects([
+        Project(
+            id=str(uuid.uuid4()),
+            date=start + timedelta(days=i % 365),
+            address=f'{i} Main St',
+            city='Salt Lake City',
+            work_type='basement,garage',
+            job_cost_type='standard',
+            region='North',
+            customer_id=customers[i % len(customers)].id
+        )
+        for i in range(total)
+    ])
+    db.session.commit()
+
+
+def main():
+    app = create_bench_app()
+    client = app.test_client()
+    print(f"{'projects':>10} {'queries':>8} {'seconds':>8}")
+    with app.app_context():
+        for size in SIZES:
+            seed_projects(size)
+            with count_queries() as counter:
+                started = time.perf_counter()
+                response = client.get('/projects/North')
+                elapsed = time.perf_counter() - started
+            assert response.status_code == 200
+            assert len(response.get_json()) == size
+            print(f"{size:>10} {counter['count']:>8} {elapsed:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
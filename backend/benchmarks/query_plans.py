@@ -0,0 +1,73 @@
+"""Check that the hot project/customer queries are served by indexes.
+
+Runs SQLite's EXPLAIN QUERY PLAN for each query after applying migrations
+to a database created without the lookup indexes, and fails if any of them
+falls back to a full table scan.
+
+Run from the backend directory:
+
+    python -m benchmarks.query_plans
+"""
+from datetime import date, timedelta
+from sqlalchemy import text
+from models import db
+from models.customer import Customer
+from models.project import Project
+from migrations import upgrade
+from services.project_listing import project_listing_query
+from benchmarks.common import create_bench_app
+
+
+def hot_queries():
+    """Name and build the queries the request path depends on."""
+    today = date.today()
+    return {
+        'projects by region': project_listing_query(region='North').order_by(Project.date, Project.id),
+        'projects by region window': project_listing_query(region='North', start=today, end=today),
+        'projects by region and date': project_listing_query(region='North', date=today),
+        'latest project in region': project_listing_query(region='North').order_by(Project.created_at.desc()).limit(1),
+        'projects by date': project_listing_query(date=today),
+        'projects by customer': Project.query.filter_by(customer_id=1),
+        'customer by phone': Customer.query.filter_by(phone='8015550000'),
+        'basement jobs in North next week': project_listing_query(
+            region='North', start=today, end=today + timedelta(weeks=1), work_type='basement'
+        ),
+        'all basement jobs': project_listing_query(work_type='basement'),
+    }
+
+
+def explain(query):
+    """Return SQLite's query plan details for an ORM query."""
+    compiled = query.statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+    rows = db.session.execute(text(f'EXPLAIN QUERY PLAN {compiled}')).fetchall()
+    return [row[-1] for row in rows]
+
+
+def drop_lookup_indexes():
+    """Simulate a database created before the indexes and migrations existed."""
+    for table in ('project', 'customer'):
+        for index in db.Model.metadata.tables[table].indexes:
+            db.session.execute(text(f'DROP INDEX IF EXISTS {index.name}'))
+    db.session.execute(text('DELETE FROM schema_version'))
+    db.session.commit()
+
+
+def main():
+    app = create_bench_app()
+    failures = []
+    with app.app_context():
+        drop_lookup_indexes()
+        upgrade()
+        for name, query in hot_queries().items():
+            plan = explain(query)
+            scans = [step for step in plan if step.startswith('SCAN') and 'INDEX' not in step]
+            status = 'FULL SCAN' if scans else 'ok'
+            print(f"{name:<34} {status:<10} {' | '.join(plan)}")
+            if scans:
+                failures.append(name)
+    if failures:
+        raise SystemExit(f"Queries without an index: {', '.join(failures)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Check that incrementally maintained region export files match a full export.
+
+Seeds projects, builds the region files, then applies random creates,
+updates (including customer email edits), deletes and POST /projects
+requests that give an existing customer a new email, compacting the
+changelog after each batch. Every file must be byte-for-byte identical to
+a fresh full export of its region, and each pass is timed against a full
+rebuild.
+
+Run from the backend directory:
+
+    python -m benchmarks.region_export [projects]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+from models import db
+from models.customer import Customer
+from models.project import Project
+from services.project_export import stream_projects_csv
+from services.region_export import (
+    record_export_change, record_customer_export_changes, record_full_export_rebuild,
+    process_export_changes, rebuild_region_export, region_export_path
+)
+from benchmarks.common import create_bench_app
+
+REGIONS = ['North', 'South']
+ROUNDS = 20
+CHANGES_PER_ROUND = 25
+
+
+def seed(total, rng):
+    customers = [Customer(name=f'Customer {i}', phone=f'801555{i:04d}', email=f'c{i}@example.com')
+                 for i in range(max(total // 10, 1))]
+    db.session.add_all(customers)
+    db.session.flush()
+    db.session.execute(Project.__table__.insert(), [{
+        'id': str(uuid.uuid4()),
+        'date': date.today() + timedelta(days=rng.randrange(365)),
+        'address': f'{i} Main St',
+        'region': rng.choice(REGIONS),
+        'notes': 'Line one\nline two, "quoted"' if i % 7 == 0 else None,
+        'customer_id': rng.choice(customers).id
+    } for i in range(total)])
+    db.session.commit()
+
+
+def create_for_customer(client, customer, rng):
+    """POST a project for an existing customer with a new email, which changes the customer's other rows."""
+    response = client.post(f'/projects/{rng.choice(REGIONS)}', json={
+        'date': (date.today() + timedelta(days=rng.randrange(365))).isoformat(),
+        'address': 'Shared Customer St',
+        'customer_name': customer.name,
+        'customer_phone': customer.phone,
+        'customer_email': f'posted{rng.random()}@example.com',
+        'work_type': ['basement'],
+        'job_cost_type': ['standard']
+    })
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+
+def random_change(client, rng):
+    """Apply one random project write, logging it the way the routes do."""
+    action = rng.choice(['create', 'update', 'update', 'delete', 'email', 'shared_customer'])
+    project = Project.query.order_by(db.func.random()).first()
+    if action == 'create' or project is None:
+        region = rng.choice(REGIONS)
+        project = Project(
+            id=str(uuid.uuid4()),
+            date=date.today() + timedelta(days=rng.randrange(365)),
+            address='New St',
+            region=region,
+            customer_id=Customer.query.order_by(db.func.random()).first().id
+        )
+        db.session.add(project)
+        record_export_change(region, project.id)
+    elif action == 'update':
+        project.date = date.today() + timedelta(days=rng.randrange(365))
+        project.notes = f'Moved {rng.random()}'
+        record_export_change(project.region, project.id)
+    elif action == 'email':
+        project.customer.email = f'changed{rng.random()}@example.com'
+        record_customer_export_changes(project.customer_id)
+    elif action == 'shared_customer':
+        create_for_customer(client, project.customer, rng)
+        return
+    else:
+        record_export_change(project.region, project.id)
+        db.session.delete(project)
+    db.session.commit()
+
+
+def assert_matches_full_export(export_dir):
+    for region in REGIONS:
+        with open(region_export_path(region, export_dir), newline='', encoding='utf-8') as f:
+            incremental = f.read()
+        assert incremental == ''.join(stream_projects_csv(region=region)), f"{region} export differs"
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    export_dir = tempfile.mkdtemp()
+    rng = random.Random(7)
+    app = create_bench_app()
+    client = app.test_client()
+    with app.app_context():
+        seed(total, rng)
+        record_full_export_rebuild()
+        db.session.commit()
+        process_export_changes(export_dir)
+        assert_matches_full_export(export_dir)
+
+        incremental = full = 0.0
+        for _ in range(ROUNDS):
+            for _ in range(CHANGES_PER_ROUND):
+                random_change(client, rng)
+            started = time.perf_counter()
+            process_export_changes(export_dir)
+            incremental += time.perf_counter() - started
+            assert_matches_full_export(export_dir)
+
+            started = time.perf_counter()
+            for region in REGIONS:
+                rebuild_region_export(region, os.path.join(export_dir, 'full'))
+            full += time.perf_counter() - started
+
+    print(f"{ROUNDS} rounds of {CHANGES_PER_ROUND} changes over {total} projects: files match a full export")
+    print(f"compaction pass {incremental / ROUNDS * 1000:.1f} ms, full rebuild {full / ROUNDS * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Time the daily reminder job against a local fake SendGrid.
+
+The fake API answers every send with a 202 after a fixed delay, like a slow
+provider. The old job sent each reminder with one blocking request after
+another; the job now queues them all in the outbox and delivers them from a
+bounded pool. The benchmark also checks that rerunning the job, including
+after a crash part-way through a batch, does not email anyone twice.
+
+Run from the backend directory:
+
+    python -m benchmarks.reminder_dispatch [projects] [provider_ms]
+"""
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from models import db
+from models.customer import Customer
+from models.project import Project
+from services.email_service import EmailService
+from services.notification_queue import NotificationQueue
+from services.project_listing import project_listing_query
+from services.scheduler_service import SchedulerService, queue_project_reminders, reminder_payload
+from benchmarks.common import create_bench_app
+
+
+class FakeSendGrid(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = 0.1
+    recipients = Counter()
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        time.sleep(self.latency)
+        with self.lock:
+            for personalization in body['personalizations']:
+                for to in personalization['to']:
+                    FakeSendGrid.recipients[to['email']] += 1
+        self.send_response(202)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def seed(day, count, start=0):
+    customers, projects = [], []
+    for i in range(start, start + count):
+        customers.append({'id': i + 1, 'name': f'Customer {i}', 'phone': f'801555{i:04d}',
+                          'email': f'customer{i}@example.com'})
+        projects.append({'id': str(uuid.uuid4()), 'date': day, 'address': f'{i} Main St',
+                         'region': 'North', 'work_type': 'basement', 'job_cost_type': 'standard',
+                         'customer_id': i + 1})
+    db.session.execute(Customer.__table__.insert(), customers)
+    db.session.execute(Project.__table__.insert(), projects)
+    db.session.commit()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    FakeSendGrid.latency = (int(sys.argv[2]) if len(sys.argv) > 2 else 100) / 1000
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeSendGrid)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ['SENDGRID_API_KEY'] = 'bench-key'
+    os.environ['SENDGRID_API_URL'] = f'http://127.0.0.1:{server.server_address[1]}/v3/mail/send'
+
+    os.chdir(tempfile.mkdtemp())
+    app = create_bench_app(f"sqlite:///{os.path.join(os.getcwd(), 'bench.db')}")
+    tomorrow = datetime.now().date() + timedelta(days=1)
+    with app.app_context():
+        seed(tomorrow, count)
+
+    print(f"{count} reminders, provider latency {1000 * FakeSendGrid.latency:.0f} ms")
+
+    # The old job: one blocking send per project, in order
+    with app.app_context(), redirect_stdout(io.StringIO()):
+        email_service = EmailService()
+        started = time.perf_counter()
+        for project in project_listing_query(date=tomorrow).all():
+            email_service.send_project_reminder(**reminder_payload(project))
+        sequential = time.perf_counter() - started
+    print(f"sequential sends       {sequential:7.2f}s")
+
+    FakeSendGrid.recipients.clear()
+    queue = NotificationQueue(app)
+    with redirect_stdout(io.StringIO()):
+        scheduler = SchedulerService(app)
+        started = time.perf_counter()
+        scheduler.check_upcoming_projects()
+        batched = time.perf_counter() - started
+    print(f"queued + {scheduler.concurrency} concurrent  {batched:7.2f}s")
+    assert len(FakeSendGrid.recipients) == count and set(FakeSendGrid.recipients.values()) == {1}
+
+    with redirect_stdout(io.StringIO()):
+        scheduler.check_upcoming_projects()
+    assert sum(FakeSendGrid.recipients.values()) == count, 'a rerun sent reminders again'
+
+    # Crash part-way: queue a new batch, deliver a few, then start over
+    with app.app_context():
+        seed(tomorrow, 50, start=count)
+    with redirect_stdout(io.StringIO()):
+        with app.app_context():
+            queue_project_reminders(tomorrow)
+            for _ in range(10):
+                queue.process_next()
+        # The restarted process comes back with a fresh queue
+        NotificationQueue(app)
+        scheduler.check_upcoming_projects()
+        scheduler.shutdown()
+    assert len(FakeSendGrid.recipients) == count + 50 and set(FakeSendGrid.recipients.values()) == {1}
+    print("Reruns, including after a partial batch, email each customer once")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Check the request profiler and what it costs.
+
+Profiles GET, POST and PUT /projects/<region> on a seeded database. It
+checks that:
+
+- X-Profile: 1 from an admin writes a collapsed-stack file under the route's
+  endpoint, and the same header from anyone else is ignored
+- with PROFILE_SAMPLE_RATE=1, only the requests to PROFILE_ENDPOINTS are
+  profiled, with no header needed
+- admins can fetch the merged profile from /admin/profiles
+
+It then prints where a month's calendar listing spends its time, by
+innermost function, and compares request throughput with the profiler
+installed but idle, installed and profiling every request, and not
+installed at all.
+
+Run from the backend directory:
+
+    python -m benchmarks.request_profiler
+"""
+import io
+import os
+import sys
+import tempfile
+from collections import Counter
+from contextlib import redirect_stdout
+from datetime import timedelta
+from flask_jwt_extended import JWTManager, create_access_token
+from models import db
+from models.user import Role, User, ROLES
+from routes.diagnostics import diagnostics
+from services.profiler import init_profiler, merged_profile
+from benchmarks.common import create_bench_app
+from benchmarks.logging_overhead import CREATE_FROM, MONTH, seed, throughput
+
+INTERVAL = 0.001
+
+
+def check(label, condition):
+    print(f"  {'ok  ' if condition else 'FAIL'} {label}")
+    if not condition:
+        check.failures += 1
+
+
+check.failures = 0
+
+
+def profiled_app(uri, profile_dir, **config):
+    with redirect_stdout(io.StringIO()):
+        app = create_bench_app(uri, PROFILE_INTERVAL=INTERVAL, **config)
+    JWTManager(app)
+    app.register_blueprint(diagnostics, url_prefix='/admin')
+    if profile_dir:
+        init_profiler(app, profile_dir)
+    return app
+
+
+def project(i):
+    return {
+        'date': str(CREATE_FROM + timedelta(days=i)), 'address': f'{i} Oak St', 'customer_name': 'Bench Customer',
+        'customer_phone': '8015550000', 'work_type': ['basement'], 'job_cost_type': ['standard']
+    }
+
+
+def main():
+    workdir = tempfile.mkdtemp()
+    uri = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    on_demand_dir, sampled_dir = os.path.join(workdir, 'on-demand'), os.path.join(workdir, 'sampled')
+    app = profiled_app(uri, on_demand_dir)
+    with app.app_context():
+        seed()
+        roles = {name: Role(name=name, permissions=data['permissions']) for name, data in ROLES.items()}
+        admin, viewer = User('admin', 'admin@example.com', roles['admin']), User('viewer', 'v@example.com', roles['viewer'])
+        db.session.add_all([admin, viewer])
+        db.session.commit()
+        tokens = {name: f'Bearer {create_access_token(identity=str(user.id))}'
+                  for name, user in (('admin', admin), ('viewer', viewer))}
+    headers = {name: {'Authorization': token, 'X-Profile': '1'} for name, token in tokens.items()}
+    client = app.test_client()
+    listing = f'/projects/North?start={MONTH[0]}&end={MONTH[1]}'
+
+    client.get(listing, headers=headers['viewer'])
+    check("X-Profile from a non-admin is ignored", not os.path.exists(on_demand_dir))
+    for _ in range(20):
+        client.get(listing, headers=headers['admin'])
+    created = client.post('/projects/North', json=project(0), headers=headers['admin']).get_json()['project']
+    client.put(f"/projects/North/{created['id']}", json=project(1), headers=headers['admin'])
+    written = sorted(os.listdir(on_demand_dir))
+    check("admin X-Profile requests are written per endpoint",
+          {'projects.get_projects', 'projects.create_project', 'projects.update_project'} <= set(written))
+    profile = merged_profile(on_demand_dir, 'projects.get_projects')
+    check("stacks run from the WSGI app down into the route",
+          any('flask.app.Flask.wsgi_app' in s and 'routes.projects.get_projects' in s for s in profile))
+
+    response = client.get('/admin/profiles', headers={'Authorization': tokens['admin']})
+    check("admins can list profiled endpoints", response.status_code == 200
+          and {e['endpoint'] for e in response.get_json()['endpoints']} == set(written))
+    folded = client.get('/admin/profiles/projects.get_projects', headers={'Authorization': tokens['admin']})
+    check("and fetch one as collapsed stacks", folded.status_code == 200
+          and folded.get_data(as_text=True).splitlines()[0].rsplit(' ', 1)[1].isdigit())
+    check("other users cannot", client.get('/admin/profiles', headers={'Authorization': tokens['viewer']}).status_code == 403)
+
+    sampled = profiled_app(uri, sampled_dir, PROFILE_SAMPLE_RATE=1.0, PROFILE_ENDPOINTS='projects.create_project')
+    sampled_client = sampled.test_client()
+    sampled_client.get(listing)
+    sampled_client.post('/projects/North', json=project(2))
+    check("sampling profiles only PROFILE_ENDPOINTS, without the header",
+          os.listdir(sampled_dir) == ['projects.create_project'])
+
+    leaves = Counter()
+    for stack, count in profile.items():
+        leaves[stack.rsplit(';', 1)[-1]] += count
+    total = sum(leaves.values())
+    print(f"Month listing, {total} samples over 20 requests, top functions by own time:")
+    for name, count in leaves.most_common(8):
+        print(f"  {100 * count / total:5.1f}%  {name}")
+
+    plain = profiled_app(uri, None)
+    always = profiled_app(uri, os.path.join(workdir, 'always'), PROFILE_SAMPLE_RATE=1.0, PROFILE_ENDPOINTS='')
+    for label, bench_app in (('not installed', plain), ('idle', app), ('every request', always)):
+        bench_client = bench_app.test_client()
+        rate = throughput(lambda i: bench_client.get(listing), 2)
+        print(f"  {label:<14} {rate:.0f} req/s")
+
+    if check.failures:
+        sys.exit(f"{check.failures} checks failed")
+    print("All checks passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Exercise the shared SendGrid transport against a local stub API.
+
+Compares sending through the pooled keep-alive session with the old bare
+`requests.post` per email (a new connection each time), then checks the
+token bucket holds sends to the configured rate and that a burst of 429s
+with Retry-After is waited out and every email still goes through once.
+A Retry-After longer than max_retry_wait is not waited out by the send
+that got it, and must hold back the sends after it for max_retry_wait only.
+
+Run from the backend directory:
+
+    python -m benchmarks.sendgrid_transport [emails]
+"""
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from services.sendgrid_transport import SendGridTransport
+
+MESSAGE = {
+    "personalizations": [{"to": [{"email": "customer@example.com"}]}],
+    "from": {"email": "savageut@savageut.com"},
+    "subject": "Project Reminder - Savage Concrete",
+    "content": [{"type": "text/html", "value": "<p>See you tomorrow</p>"}]
+}
+
+
+class StubSendGrid(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    lock = threading.Lock()
+    connections = 0
+    accepted = Counter()
+    rate_limit_next = 0
+    retry_after = '1'
+
+    def setup(self):
+        super().setup()
+        with self.lock:
+            StubSendGrid.connections += 1
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with self.lock:
+            limited = StubSendGrid.rate_limit_next > 0
+            if limited:
+                StubSendGrid.rate_limit_next -= 1
+            else:
+                StubSendGrid.accepted[body['subject']] += 1
+        self.send_response(429 if limited else 202)
+        if limited:
+            self.send_header('Retry-After', StubSendGrid.retry_after)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def reset():
+    StubSendGrid.connections = 0
+    StubSendGrid.accepted.clear()
+
+
+def timed(send, count, threads=4):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        statuses = list(pool.map(lambda i: send(dict(MESSAGE, subject=f'email {i}')).status_code, range(count)))
+    assert statuses == [202] * count
+    return time.perf_counter() - started
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubSendGrid)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}/v3/mail/send'
+    headers = {"Authorization": "Bearer bench-key", "Content-Type": "application/json"}
+
+    reset()
+    elapsed = timed(lambda data: requests.post(url, headers=headers, json=data), count)
+    print(f"requests.post per email   {1000 * elapsed / count:6.2f} ms/email  {StubSendGrid.connections:5} connections")
+
+    reset()
+    transport = SendGridTransport('bench-key', url, rate=1e6, burst=1000)
+    elapsed = timed(transport.send, count)
+    stats = transport.stats()
+    print(f"pooled transport          {1000 * elapsed / count:6.2f} ms/email  {StubSendGrid.connections:5} connections"
+          f"  (send p50 {1000 * stats['latency_p50']:.2f} ms, p99 {1000 * stats['latency_p99']:.2f} ms)")
+
+    transport = SendGridTransport('bench-key', url, rate=50, burst=10)
+    elapsed = timed(transport.send, 110)
+    print(f"110 emails at 50/s, burst 10: {elapsed:.2f}s")
+    assert 1.9 < elapsed < 2.5, 'the token bucket should pace sends to the configured rate'
+
+    reset()
+    StubSendGrid.rate_limit_next = 5
+    transport = SendGridTransport('bench-key', url, rate=1e6, burst=1000)
+    elapsed = timed(transport.send, 20)
+    stats = transport.stats()
+    assert len(StubSendGrid.accepted) == 20 and set(StubSendGrid.accepted.values()) == {1}
+    assert stats['rate_limited'] == 5 and elapsed >= 1
+    print(f"5 x 429 Retry-After: 1 -> all 20 delivered once in {elapsed:.2f}s")
+
+    StubSendGrid.rate_limit_next = 1
+    StubSendGrid.retry_after = '3600'
+    transport = SendGridTransport('bench-key', url, rate=1e6, burst=1000, max_retry_wait=0.5)
+    assert transport.send(MESSAGE).status_code == 429, 'a Retry-After over max_retry_wait is not waited out'
+    started = time.perf_counter()
+    assert transport.send(MESSAGE).status_code == 202
+    held = time.perf_counter() - started
+    assert 0.4 <= held < 2, 'other sends should hold off for max_retry_wait, not the whole Retry-After'
+    print(f"429 Retry-After: 3600 over max_retry_wait 0.5 -> returned, next send held {held:.2f}s")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
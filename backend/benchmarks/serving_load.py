@@ -0,0 +1,147 @@
+"""Load-test the backend under gunicorn at several worker counts.
+
+Starts `gunicorn -c gunicorn.conf.py app:app` for each worker count, waits
+for every worker to boot, then keeps a fixed number of clients busy against
+one endpoint and reports throughput and latency. Like requests proxied by
+nginx, each request uses a new connection, so the workers share them as they
+accept them. Also checks that exactly one worker started the background jobs
+(reminder scheduler and export files).
+
+Throughput only scales while the machine has idle cores for the extra
+workers (and for the client processes, which run here too).
+
+This runs the real app, against the database configured in app.py, so point
+it at a development copy. Run from the backend directory:
+
+    python -m benchmarks.serving_load [--workers 1,2,4] [--clients 16] [--seconds 10] [--path /analytics/data?timeFrame=year]
+"""
+import argparse
+import http.client
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+PORT = 5051
+
+
+def wait_for_workers(log_path, workers, process, timeout=120):
+    """Wait until every worker has finished importing the app."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {process.returncode}")
+        with open(log_path) as f:
+            if f.read().count('Notification queue started') >= workers:
+                return
+        time.sleep(0.2)
+    raise RuntimeError(f"{workers} workers did not boot within {timeout}s")
+
+
+def run_clients(path, clients, seconds):
+    """Send requests from `clients` threads for `seconds`; return the latencies in ms.
+
+    Runs in its own process, so several of them can drive more load than one
+    interpreter could.
+    """
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    stop_at = time.monotonic() + seconds
+
+    def client():
+        mine = []
+        try:
+            while time.monotonic() < stop_at:
+                started = time.perf_counter()
+                # A new connection per request, as nginx makes by default
+                conn = http.client.HTTPConnection('127.0.0.1', PORT, timeout=30)
+                conn.request('GET', path, headers={'Connection': 'close'})
+                response = conn.getresponse()
+                response.read()
+                conn.close()
+                if response.status != 200:
+                    raise RuntimeError(f"HTTP {response.status}")
+                mine.append(1000 * (time.perf_counter() - started))
+        except (OSError, RuntimeError, http.client.HTTPException) as e:
+            errors.append(str(e))
+        finally:
+            with lock:
+                latencies.extend(mine)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        print(f"  {len(errors)} clients stopped early: {errors[0]}")
+    return latencies
+
+
+def drive_load(path, clients, seconds):
+    """Split the clients across processes and gather their latencies, sorted."""
+    processes = min(clients, os.cpu_count() or 1)
+    shares = [clients // processes + (i < clients % processes) for i in range(processes)]
+    with ProcessPoolExecutor(processes) as pool:
+        results = pool.map(run_clients, [path] * processes, shares, [seconds] * processes)
+        return sorted(latency for latencies in results for latency in latencies)
+
+
+def measure(workers, path, clients, seconds):
+    log_file = tempfile.NamedTemporaryFile('w+', suffix='.log', delete=False)
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), BIND=f'127.0.0.1:{PORT}',
+               GUNICORN_ACCESS_LOG='', PYTHONUNBUFFERED='1', LOG_LEVEL='INFO')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+        stdout=log_file, stderr=subprocess.STDOUT, env=env
+    )
+    try:
+        wait_for_workers(log_file.name, workers, process)
+        latencies = drive_load(path, clients, 1)  # warm up connections and caches
+        latencies = drive_load(path, clients, seconds)
+    finally:
+        process.terminate()
+        process.wait(30)
+    with open(log_file.name) as f:
+        leaders = set(re.findall(r'Background jobs running in process (\d+)', f.read()))
+    os.unlink(log_file.name)
+
+    count = len(latencies)
+    return {
+        'workers': workers,
+        'rps': count / seconds,
+        'p50': latencies[count // 2] if count else 0,
+        'p99': latencies[int(count * 0.99)] if count else 0,
+        'leaders': len(leaders)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--path', default='/analytics/data?timeFrame=year')
+    args = parser.parse_args()
+
+    with socket.socket() as s:
+        if s.connect_ex(('127.0.0.1', PORT)) == 0:
+            sys.exit(f"Port {PORT} is already in use")
+
+    print(f"GET {args.path} from {args.clients} clients for {args.seconds:g}s per run, {os.cpu_count()} CPUs")
+    print(f"{'workers':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'leaders':>8}")
+    for workers in (int(w) for w in args.workers.split(',')):
+        result = measure(workers, args.path, args.clients, args.seconds)
+        print(f"{result['workers']:>7} {result['rps']:>8.0f} {result['p50']:>8.2f} "
+              f"{result['p99']:>8.2f} {result['leaders']:>8}")
+        assert result['leaders'] == 1, 'background jobs must run in exactly one worker'
+
+
+if __name__ == '__main__':
+    main()
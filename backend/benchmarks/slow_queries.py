@@ -0,0 +1,128 @@
+"""Check slow-query capture on a customer table that has lost its phone index.
+
+Seeds a large customer table, drops the index on customer.phone and creates
+a project for a new phone number, whose customer lookup then scans the
+table. The capture must record that statement with its parameters, the
+route that ran it and a query plan flagged as a full scan, and show it on
+GET /admin/slow-queries to an admin only. With the index restored the same
+lookup must no longer be slow, and statements that fail must not throw
+off the timing of later ones. Also times a fast request with capture on
+and off, for the cost of timing every statement.
+
+Run from the backend directory:
+
+    python -m benchmarks.slow_queries [customers]
+"""
+import io
+import os
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from flask_jwt_extended import JWTManager, create_access_token
+from sqlalchemy import text
+from models import db
+from models.customer import Customer
+from models.user import Role, User, ROLES
+from routes.diagnostics import diagnostics
+from benchmarks.common import create_bench_app
+from benchmarks.logging_overhead import throughput
+
+THRESHOLD_MS = 5
+
+
+def check(label, condition):
+    print(f"  {'ok  ' if condition else 'FAIL'} {label}")
+    if not condition:
+        check.failures += 1
+
+
+check.failures = 0
+
+
+def create_project(client, phone):
+    response = client.post('/projects/North', json={
+        'date': '2030-05-01', 'address': '1 Main St', 'customer_name': 'New Customer',
+        'customer_phone': phone, 'work_type': ['basement'], 'job_cost_type': ['standard']
+    })
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+
+def phone_lookups(log):
+    return [e for e in log.entries() if 'FROM customer' in e['statement'] and 'customer.phone = ' in e['statement']]
+
+
+def main():
+    customers = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    workdir = tempfile.mkdtemp()
+    with redirect_stdout(io.StringIO()):
+        app = create_bench_app(f"sqlite:///{os.path.join(workdir, 'bench.db')}", SLOW_QUERY_MS=THRESHOLD_MS)
+    JWTManager(app)
+    app.register_blueprint(diagnostics, url_prefix='/admin')
+    log = app.extensions['slow_queries']
+    client = app.test_client()
+
+    with app.app_context():
+        db.session.execute(Customer.__table__.insert(), [
+            {'name': f'Customer {i}', 'phone': f'{8010000000 + i}'} for i in range(customers)
+        ])
+        roles = {name: Role(name=name, permissions=data['permissions']) for name, data in ROLES.items()}
+        admin, viewer = User('admin', 'admin@example.com', roles['admin']), User('viewer', 'v@example.com', roles['viewer'])
+        db.session.add_all([admin, viewer])
+        db.session.execute(text('DROP INDEX ix_customer_phone'))
+        db.session.commit()
+        headers = {name: {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+                   for name, user in (('admin', admin), ('viewer', viewer))}
+    print(f"{customers} customers, no index on customer.phone, threshold {THRESHOLD_MS} ms")
+
+    log.clear()
+    create_project(client, '8009990001')
+    captured = phone_lookups(log)
+    check("the phone lookup is captured", len(captured) >= 1)
+    if captured:
+        entry = captured[0]
+        print(f"       {entry['duration_ms']} ms, plan: {' | '.join(entry['plan'])}")
+        check("with the route that ran it", entry['origin'] == 'projects.create_project')
+        check("with its bound parameters", '8009990001' in entry['parameters'])
+        check("flagged as a full table scan", entry['full_scan'])
+
+    shown = client.get('/admin/slow-queries', headers=headers['admin'])
+    check("admins see it at /admin/slow-queries",
+          shown.status_code == 200 and any('customer.phone' in e['statement'] for e in shown.get_json()['entries']))
+    check("other users are refused", client.get('/admin/slow-queries', headers=headers['viewer']).status_code == 403)
+
+    with app.app_context():
+        db.session.execute(text('CREATE INDEX ix_customer_phone ON customer (phone)'))
+        db.session.commit()
+    client.delete('/admin/slow-queries', headers=headers['admin'])
+    check("admins can clear the log", not log.entries())
+    create_project(client, '8009990002')
+    check("with the index back the lookup is not slow", not phone_lookups(log))
+
+    with app.app_context():
+        connection = db.session.connection()
+        for _ in range(100):
+            try:
+                connection.execute(text('SELECT * FROM no_such_table'))
+            except Exception:
+                pass
+        db.session.rollback()
+        connection = db.session.connection()
+        check("failed statements leave no timing state on the connection",
+              not any(isinstance(value, list) and value for value in connection.info.values()))
+        connection.execute(text('SELECT 1'))
+    check("and later statements are still timed on their own", not log.entries())
+
+    with redirect_stdout(io.StringIO()):
+        uncaptured = create_bench_app(app.config['SQLALCHEMY_DATABASE_URI'], SLOW_QUERY_MS=None)
+    for label, bench_app in (('capture on', app), ('capture off', uncaptured)):
+        bench_client = bench_app.test_client()
+        rate = throughput(lambda i: bench_client.get('/projects/North?start=2030-05-01&end=2030-05-02'), 2)
+        print(f"  {label:<12} {rate:.0f} req/s for a fast listing")
+
+    if check.failures:
+        sys.exit(f"{check.failures} checks failed")
+    print("All checks passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Show calendar reads are no longer held up by concurrent writes on SQLite.
+
+Runs the same mixed workload twice on a fresh database file: reader threads
+list a month of projects (the calendar view) while a writer keeps committing
+batches of new projects, like create_project and the CSV import. The first
+run uses the old connection settings (rollback journal, synchronous=full, a
+new connection per checkout), the second the tuned defaults from config.py.
+
+Run from the backend directory:
+
+    python -m benchmarks.sqlite_concurrency [seconds] [readers]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+from sqlalchemy.pool import NullPool
+from models import db
+from models.customer import Customer
+from models.project import Project
+from services.project_listing import project_listing_query
+from benchmarks.common import create_bench_app
+
+WRITE_BATCH = 200
+MONTH = (date(2030, 6, 1), date(2030, 7, 1))
+
+OLD_SETTINGS = {
+    'SQLITE_PRAGMAS': {'journal_mode': 'delete', 'synchronous': 'full'},
+    'SQLALCHEMY_ENGINE_OPTIONS': {'poolclass': NullPool},
+}
+
+
+def seed(count=5000):
+    db.session.add(Customer(id=1, name='Bench Customer', phone='8015550000'))
+    db.session.execute(Project.__table__.insert(), [{
+        'id': str(uuid.uuid4()), 'date': MONTH[0] + timedelta(days=i % 30),
+        'address': f'{i} Main St', 'region': 'North', 'customer_id': 1
+    } for i in range(count)])
+    db.session.commit()
+
+
+def run(label, seconds, readers, **settings):
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = create_bench_app(f'sqlite:///{path}', **settings)
+    with app.app_context():
+        seed()
+        mode = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+
+    stop_at = time.monotonic() + seconds
+    reads, writes, errors = [], [], []
+    lock = threading.Lock()
+
+    def reader():
+        mine = []
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            try:
+                with app.app_context():
+                    project_listing_query(start=MONTH[0], end=MONTH[1]).limit(200).all()
+                    db.session.remove()
+            except Exception as e:
+                errors.append(str(e))
+            mine.append(1000 * (time.perf_counter() - started))
+        with lock:
+            reads.extend(mine)
+
+    def writer():
+        n = 0
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            with app.app_context():
+                for _ in range(WRITE_BATCH):
+                    db.session.add(Project(id=str(uuid.uuid4()), date=MONTH[0] + timedelta(days=n % 30),
+                                           address=f'{n} Oak St', region='South', customer_id=1))
+                    n += 1
+                db.session.commit()
+                db.session.remove()
+            writes.append(1000 * (time.perf_counter() - started))
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)] + [threading.Thread(target=writer)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    reads.sort()
+    writes.sort()
+    print(f"{label:<8} {mode:<8} {len(reads) / seconds:>8.0f} {reads[len(reads) // 2]:>8.2f} "
+          f"{reads[int(len(reads) * 0.99)]:>8.2f} {reads[-1]:>8.1f} {len(writes):>7} "
+          f"{writes[len(writes) // 2]:>8.1f} {len(errors):>7}")
+    return reads
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    print(f"{readers} readers listing a month of projects, 1 writer committing {WRITE_BATCH} projects at a time, {seconds:g}s")
+    print(f"{'':<8} {'journal':<8} {'reads/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'commits':>7} "
+          f"{'write ms':>8} {'errors':>7}")
+    run('old', seconds, readers, **OLD_SETTINGS)
+    run('tuned', seconds, readers)
+
+
+if __name__ == '__main__':
+    main()
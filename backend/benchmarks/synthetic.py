@@ -0,0 +1,218 @@
+"""Generate realistic synthetic data for the benchmarks.
+
+`populate(projects)` fills the current app's database with:
+
+- customers with names, unique phone numbers and mostly an email, plus the
+  customer sync log
+- projects split between North and South and spread over the past year and
+  the next six months, with region-specific cities and subdivisions; work
+  and job cost types are comma-joined, with the type links and the daily
+  analytics rollup to match
+- the standard roles, and users for each (password 'benchmark')
+
+A fifth of the customers (builders) get most of the projects. Rows go in
+with batched core inserts, so a million projects take a few minutes on
+SQLite. The same `seed` always gives the same data, with dates relative to
+today.
+
+To build a standalone SQLite file, e.g. to point DATABASE_URL at, run from
+the backend directory:
+
+    python -m benchmarks.synthetic [projects] [path]
+"""
+import csv
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import redirect_stdout
+from datetime import date, datetime, timedelta
+from werkzeug.security import generate_password_hash
+from models import db
+from models.customer import Customer
+from models.customer_change import CustomerChange
+from models.project import Project
+from models.project_type import ProjectType, project_type_link, WORK_TYPE, JOB_COST_TYPE, WORK_TYPES, JOB_COST_TYPES
+from models.user import Role, User, ROLES
+from services.analytics_rollup import rebuild_rollups
+
+BATCH_SIZE = 20000
+PASSWORD = 'benchmark'
+
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David',
+               'Elizabeth', 'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas',
+               'Sarah', 'Christopher', 'Karen', 'Daniel', 'Emily', 'Matthew', 'Ashley', 'Tyler', 'Megan']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Anderson',
+              'Taylor', 'Thomas', 'Moore', 'Jackson', 'Martin', 'Thompson', 'White', 'Harris', 'Clark',
+              'Lewis', 'Young', 'Allen', 'Christensen', 'Jensen', 'Larsen', 'Peterson', 'Hansen']
+BUILDERS = ['Homes', 'Construction', 'Builders', 'Development', 'Contracting']
+EMAIL_DOMAINS = ['gmail.com', 'yahoo.com', 'outlook.com', 'comcast.net', 'icloud.com']
+AREA_CODES = ['801', '385', '435']
+STREETS = ['Main St', 'State St', 'Center St', 'Canyon Rd', 'Maple Dr', 'Oak Ln', 'Ridge Way',
+           'Highland Dr', 'Cedar Ct', 'Aspen Cir', 'Willow Creek Dr', 'Sunset Blvd']
+CITIES = {
+    'North': ['Ogden', 'Layton', 'Bountiful', 'Kaysville', 'Farmington', 'Syracuse', 'Logan', 'Roy'],
+    'South': ['Provo', 'Orem', 'Lehi', 'American Fork', 'Spanish Fork', 'Saratoga Springs', 'Eagle Mountain'],
+}
+SUBDIVISIONS = ['Eagle Point', 'Cherry Hill', 'Quail Ridge', 'Meadow Brook', 'Stone Creek', 'Hidden Hollow',
+                'Sage Hills', 'River Bend', None, None]
+NOTES = ['Gate code 1234', 'Call before arrival', 'Park on street', 'Second phase of job',
+         'Dog in backyard', 'Access from alley']
+# Relative frequencies; basements and garages are most of the work
+WORK_TYPE_WEIGHTS = [30, 25, 8, 5, 4, 8, 6, 3, 3, 4, 2, 2]
+JOB_COST_TYPE_WEIGHTS = [60, 15, 5, 4, 2, 6, 5, 3]
+REGION_WEIGHTS = {'North': 55, 'South': 45}
+PAST_DAYS, FUTURE_DAYS = 365, 180
+
+
+def customer_phone(number):
+    """A unique, random-looking 10-digit phone for customer number `number` (up to 9M)."""
+    return f"{AREA_CODES[number % 3]}{(1000000 + number * 7919) % 9000000 + 1000000:07d}"
+
+
+def customer_row(number, rng):
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    builder = number % 5 == 0
+    name = f"{last} {rng.choice(BUILDERS)}" if builder else f"{first} {last}"
+    email = None
+    if rng.random() < 0.85:
+        email = f"{first.lower()}.{last.lower()}{number}@{rng.choice(EMAIL_DOMAINS)}"
+    return {
+        'name': name,
+        'first_name': None if builder else first,
+        'last_name': None if builder else last,
+        'phone': customer_phone(number),
+        'email': email
+    }
+
+
+def pick_types(names, weights, rng, most):
+    """1 to `most` distinct names, in their canonical order."""
+    chosen = set()
+    for _ in range(rng.choices(range(1, most + 1), weights=[70, 22, 8][:most])[0]):
+        chosen.add(rng.choices(names, weights=weights)[0])
+    return [name for name in names if name in chosen]
+
+
+def project_row(project_id, customer_id, today, rng):
+    region = rng.choices(list(REGION_WEIGHTS), weights=list(REGION_WEIGHTS.values()))[0]
+    day = today + timedelta(days=rng.randrange(-PAST_DAYS, FUTURE_DAYS))
+    created_at = datetime.combine(day, datetime.min.time()) - timedelta(
+        days=rng.randint(1, 60), minutes=rng.randrange(600, 1080))
+    return {
+        'id': project_id,
+        'date': day,
+        'po': f"PO-{rng.randrange(10000, 99999)}" if rng.random() < 0.6 else None,
+        'address': f"{rng.randrange(100, 9999)} {rng.choice(STREETS)}",
+        'city': rng.choice(CITIES[region]),
+        'subdivision': rng.choice(SUBDIVISIONS),
+        'lot_number': str(rng.randrange(1, 250)) if rng.random() < 0.5 else None,
+        'square_footage': rng.randrange(800, 4500, 50),
+        'work_type': ','.join(pick_types(WORK_TYPES, WORK_TYPE_WEIGHTS, rng, 3)),
+        'job_cost_type': ','.join(pick_types(JOB_COST_TYPES, JOB_COST_TYPE_WEIGHTS, rng, 2)),
+        'notes': rng.choice(NOTES) if rng.random() < 0.2 else None,
+        'region': region,
+        'customer_id': customer_id,
+        'created_at': created_at,
+        'updated_at': created_at
+    }
+
+
+def populate_roles_and_users(users):
+    """Create any missing standard roles and `users` users: one admin, then project managers and viewers."""
+    roles = {role.name: role for role in Role.query}
+    for name, data in ROLES.items():
+        if name not in roles:
+            roles[name] = Role(name=name, description=data['description'], permissions=data['permissions'])
+            db.session.add(roles[name])
+    db.session.flush()
+    password_hash = generate_password_hash(PASSWORD)
+    rows = []
+    for i in range(users):
+        role = 'admin' if i == 0 else 'project_manager' if i % 3 else 'viewer'
+        rows.append({'username': f'{role}{i}', 'email': f'{role}{i}@example.com', 'role_id': roles[role].id,
+                     'password_hash': password_hash, 'is_active': True})
+    db.session.execute(User.__table__.insert(), rows)
+
+
+def populate(projects, customers=None, users=12, seed=0):
+    """Fill the database with `projects` projects and related data; returns a summary."""
+    rng = random.Random(seed)
+    customers = customers or max(50, projects // 4)
+    today = date.today()
+    type_ids = {(t.category, t.name): t.id for t in ProjectType.query}
+
+    for start in range(0, customers, BATCH_SIZE):
+        numbers = range(start, min(start + BATCH_SIZE, customers))
+        db.session.execute(Customer.__table__.insert(), [
+            dict(customer_row(number, rng), id=number + 1) for number in numbers
+        ])
+        db.session.execute(CustomerChange.__table__.insert(), [
+            {'customer_id': number + 1, 'deleted': False} for number in numbers
+        ])
+
+    builders = max(1, customers // 5)
+    for start in range(0, projects, BATCH_SIZE):
+        rows, links = [], []
+        for _ in range(min(BATCH_SIZE, projects - start)):
+            # Builders, a fifth of the customers, get about 80% of the projects
+            customer_id = rng.randrange(builders) * 5 + 1 if rng.random() < 0.8 else rng.randrange(customers) + 1
+            row = project_row(str(uuid.UUID(int=rng.getrandbits(128), version=4)), customer_id, today, rng)
+            rows.append(row)
+            links.extend({'project_id': row['id'], 'type_id': type_ids[(WORK_TYPE, name)]}
+                         for name in row['work_type'].split(','))
+            links.extend({'project_id': row['id'], 'type_id': type_ids[(JOB_COST_TYPE, name)]}
+                         for name in row['job_cost_type'].split(','))
+        db.session.execute(Project.__table__.insert(), rows)
+        db.session.execute(project_type_link.insert(), links)
+
+    rebuild_rollups()
+    populate_roles_and_users(users)
+    db.session.commit()
+    return {
+        'projects': projects,
+        'customers': customers,
+        'users': users,
+        'first_day': (today - timedelta(days=PAST_DAYS)).isoformat(),
+        'last_day': (today + timedelta(days=FUTURE_DAYS - 1)).isoformat()
+    }
+
+
+def customer_csv(rows, existing, first_new, seed=0):
+    """A QuickBooks-style customer export as text.
+
+    Half the rows reuse phones of the first `existing` customers; the other
+    half are new customers numbered from `first_new`.
+    """
+    rng = random.Random(seed)
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(['Customer', 'First_Name', 'Last_Name', 'Phone', 'Main_Email'])
+    for i in range(rows):
+        number = rng.randrange(existing) if i % 2 else first_new + i // 2
+        row = customer_row(number, rng)
+        writer.writerow([row['name'], row['first_name'] or '', row['last_name'] or '', row['phone'], row['email'] or ''])
+    return out.getvalue()
+
+
+def main():
+    from benchmarks.common import create_bench_app
+    projects = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    path = os.path.abspath(sys.argv[2] if len(sys.argv) > 2 else os.path.join(tempfile.mkdtemp(), 'synthetic.db'))
+    if os.path.exists(path):
+        sys.exit(f"{path} already exists")
+    with redirect_stdout(io.StringIO()):
+        app = create_bench_app(f'sqlite:///{path}', SLOW_QUERY_MS=None)
+    started = time.perf_counter()
+    with app.app_context():
+        summary = populate(projects)
+    print(f"{summary['projects']} projects, {summary['customers']} customers and {summary['users']} users "
+          f"({summary['first_day']} to {summary['last_day']}) in {time.perf_counter() - started:.1f}s")
+    print(f"Written to {path}; users log in with password '{PASSWORD}'")
+
+
+if __name__ == '__main__':
+    main()
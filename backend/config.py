@@ -4,11 +4,61 @@ from datetime import timedelta
 
 load_dotenv()
 
+def database_url(value):
+    """Normalize a DATABASE_URL; hosting providers often hand out postgres:// URLs."""
+    if value and value.startswith('postgres://'):
+        return 'postgresql://' + value[len('postgres://'):]
+    return value
+
+def get_config():
+    """The config class for this environment: ProductionConfig when APP_ENV=production."""
+    if os.environ.get('APP_ENV') == 'production':
+        from config_prod import ProductionConfig
+        return ProductionConfig
+    return Config
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev'
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///app.db'
+    # Relative SQLite paths are resolved against the backend directory.
+    # PostgreSQL URLs are accepted but unverified: run benchmarks.db_portability
+    # against one before relying on it (see README)
+    SQLALCHEMY_DATABASE_URI = database_url(os.environ.get('DATABASE_URL')) or 'sqlite:///scheduler.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Database connection pool
+    DB_POOL_SIZE = 5
+    DB_MAX_OVERFLOW = 10
+    DB_POOL_TIMEOUT = 30
+    DB_POOL_RECYCLE = 3600
+
+    # Applied to every new SQLite connection. WAL lets reads run during writes;
+    # synchronous=normal is safe with WAL and skips an fsync per commit
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'wal',
+        'synchronous': 'normal',
+        'busy_timeout': 5000,        # ms a writer waits for the lock
+        'cache_size': -16000,        # 16 MB page cache per connection
+        'mmap_size': 64 * 1024 * 1024
+    }
     
+    # Logging (see logging_setup.py); LOG_LEVELS takes 'module=LEVEL,...'
+    LOG_LEVEL = os.environ.get('LOG_LEVEL') or 'INFO'
+    LOG_LEVELS = os.environ.get('LOG_LEVELS', '')
+    LOG_FORMAT = os.environ.get('LOG_FORMAT') or 'text'
+
+    # Statements slower than SLOW_QUERY_MS are logged with their query plan and
+    # the last few kept for /admin/slow-queries; SLOW_QUERY_MS= turns this off
+    SLOW_QUERY_MS = os.environ.get('SLOW_QUERY_MS', '100') or None
+    SLOW_QUERY_LOG_SIZE = int(os.environ.get('SLOW_QUERY_LOG_SIZE', 200))
+
+    # Request profiling (see services/profiler.py): admins can send X-Profile: 1
+    # on any request; PROFILE_SAMPLE_RATE also profiles that fraction of the
+    # requests to PROFILE_ENDPOINTS. Profiles are kept in data/profiles
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_ENDPOINTS = os.environ.get(
+        'PROFILE_ENDPOINTS', 'projects.create_project,projects.update_project,calendar')
+    PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL', 0.005))
+
     # Twilio configuration
     TWILIO_ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID')
     TWILIO_AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN')
@@ -1,11 +1,44 @@
 import os
 from datetime import timedelta
+from config import database_url
 
 class ProductionConfig:
     SECRET_KEY = os.environ.get('SECRET_KEY')
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
+    SQLALCHEMY_DATABASE_URI = database_url(os.environ.get('DATABASE_URL'))
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Database connection pool, sized for the gunicorn threads and background workers
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = 30
+    DB_POOL_RECYCLE = 1800
+
+    # Applied to every new SQLite connection
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'wal',
+        'synchronous': 'normal',
+        'busy_timeout': 10000,       # ms a writer waits for the lock
+        'cache_size': -64000,        # 64 MB page cache per connection
+        'mmap_size': 256 * 1024 * 1024
+    }
     
+    # Logging (see logging_setup.py): only warnings and errors unless overridden
+    LOG_LEVEL = os.environ.get('LOG_LEVEL') or 'WARNING'
+    LOG_LEVELS = os.environ.get('LOG_LEVELS', '')
+    LOG_FORMAT = os.environ.get('LOG_FORMAT') or 'json'
+
+    # Slow statements are logged with their query plan and kept for /admin/slow-queries
+    SLOW_QUERY_MS = os.environ.get('SLOW_QUERY_MS', '250') or None
+    SLOW_QUERY_LOG_SIZE = int(os.environ.get('SLOW_QUERY_LOG_SIZE', 200))
+
+    # Request profiling (see services/profiler.py): admins can send X-Profile: 1
+    # on any request; PROFILE_SAMPLE_RATE also profiles that fraction of the
+    # requests to PROFILE_ENDPOINTS. Profiles are kept in data/profiles
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_ENDPOINTS = os.environ.get(
+        'PROFILE_ENDPOINTS', 'projects.create_project,projects.update_project,calendar')
+    PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL', 0.005))
+
     # Twilio configuration
     TWILIO_ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID')
     TWILIO_AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN')
@@ -0,0 +1,27 @@
+"""Gunicorn settings for serving the backend in production.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Each worker process imports the app on its own (no preload), so it gets its
+own database connections, and the leader lock in app.py picks the one worker
+that runs the reminder scheduler and the export files. Override the defaults
+with environment variables, e.g. WEB_CONCURRENCY=8.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5001')
+
+# Processes spread requests across cores; threads overlap waits on the
+# database and on other services within each process
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Startup runs migrations and the customer import one worker at a time
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+preload_app = False
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
@@ -1,5 +1,7 @@
 from flask import Flask
-from models import db
+from config import get_config
+from models import db, configure_database
+from migrations import upgrade as upgrade_schema
 from models.user import User, Role
 from models.customer import Customer
 from models.project import Project
@@ -8,11 +10,10 @@ def init_db():
     """Initialize the database with required data."""
     # Create Flask app and configure it
     app = Flask(__name__)
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///scheduler.db'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config.from_object(get_config())
     
     # Initialize the database with the app
-    db.init_app(app)
+    configure_database(app)
     
     # Create an application context
     with app.app_context():
@@ -22,6 +23,10 @@ def init_db():
         db.create_all()
         print("Tables created")
 
+        # Apply any schema migrations the existing database is missing
+        applied = upgrade_schema()
+        print(f"Migrations applied: {applied or 'none'}")
+
         # Create roles if they don't exist
         admin_role = Role.query.filter_by(name='admin').first()
         if not admin_role:
@@ -0,0 +1,119 @@
+"""Application logging: leveled, per-module, and written off the request thread.
+
+Modules log through `logging.getLogger(__name__)` with %-style arguments, so
+a message below the configured level costs one level check and is never
+formatted. Records that pass go onto an in-memory queue and a background
+listener thread writes them to stdout, so a request never waits on the
+terminal or the journal.
+
+Configured from the app config:
+
+    LOG_LEVEL   -- level for everything, e.g. 'INFO' (default) or 'WARNING'
+    LOG_LEVELS  -- per-module overrides, a dict or 'routes.projects=DEBUG,...'
+    LOG_FORMAT  -- 'text' (default) or 'json', one object per line
+
+Extra fields passed with `extra={...}` are appended as key=value pairs (or
+JSON keys), e.g. logger.info("Created project", extra={'project_id': id}).
+"""
+import atexit
+import json
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s [%(name)s] %(message)s'
+
+# Attributes every LogRecord has; anything else on a record came from `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+# Third-party loggers that are chatty below WARNING: Twilio logs every request's
+# headers, and SQLAlchemy every statement and row once its level allows it.
+# Override with LOG_LEVELS, e.g. 'sqlalchemy.engine=INFO' to see the SQL.
+QUIET_LOGGERS = {
+    'twilio.http_client': 'WARNING',
+    'apscheduler': 'WARNING',
+    'sqlalchemy': 'WARNING',
+}
+
+_listener = None
+_handler = None
+
+
+def record_fields(record):
+    """The `extra` fields attached to a record."""
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRIBUTES}
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Plain text lines with any extra fields appended as key=value."""
+
+    def format(self, record):
+        line = super().format(record)
+        fields = record_fields(record)
+        if fields:
+            line += ' ' + ' '.join(f'{k}={v}' for k, v in fields.items())
+        return line
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record, for log collectors."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            **record_fields(record)
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def parse_levels(levels):
+    """Per-module levels from a dict or a 'module=LEVEL,module=LEVEL' string."""
+    if isinstance(levels, dict):
+        return levels
+    parsed = {}
+    for item in (levels or '').split(','):
+        if '=' in item:
+            name, level = item.split('=', 1)
+            parsed[name.strip()] = level.strip().upper()
+    return parsed
+
+
+def configure_logging(config):
+    """Route all logging through a background writer, at the configured levels.
+
+    Safe to call again (e.g. from another app in the same process); the
+    previous writer is stopped and replaced.
+    """
+    global _listener, _handler
+    formatter = JSONFormatter() if config.get('LOG_FORMAT') == 'json' else KeyValueFormatter(TEXT_FORMAT)
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(formatter)
+
+    shutdown_logging()
+    root = logging.getLogger()
+    records = queue.SimpleQueue()
+    _handler = QueueHandler(records)
+    _listener = QueueListener(records, output)
+    _listener.start()
+    root.addHandler(_handler)
+    root.setLevel(config.get('LOG_LEVEL') or 'INFO')
+    for name, level in {**QUIET_LOGGERS, **parse_levels(config.get('LOG_LEVELS'))}.items():
+        logging.getLogger(name).setLevel(level)
+
+
+def shutdown_logging():
+    """Write out whatever is still queued and stop the background writer."""
+    global _listener, _handler
+    if _listener:
+        _listener.stop()
+        logging.getLogger().removeHandler(_handler)
+        _listener = _handler = None
+
+
+atexit.register(shutdown_logging)
@@ -1,42 +1,174 @@
-from app import app, db
-from models.project import Project
+"""Versioned schema migrations.
+
+Each migration is registered with a version number and runs once, inside its
+own transaction, against databases that have not recorded it yet. Applied
+versions are tracked in the `schema_version` table, so existing data is kept
+when the schema changes.
+
+Run from the backend directory to bring the database up to date:
+
+    python migrations.py
+"""
+import logging
+from datetime import datetime
+from sqlalchemy import Table, Column, Integer, String, DateTime, MetaData, false, inspect, select, text
+from models import db
+from models.outbox import OutboxMessage
+from models.export_change import ExportChange
+from models.customer_change import CustomerChange
 from models.customer import Customer
-from models.user import User, Role
+from models.project_rollup import ProjectTypeDailyCount
+from services.analytics_rollup import rebuild_rollups
+from models.project_type import (
+    ProjectType, project_type_link, seed_project_types, WORK_TYPE, JOB_COST_TYPE
+)
 
-def recreate_database():
-    with app.app_context():
-        # Drop all tables
-        db.drop_all()
-        
-        # Create all tables with new schema
-        db.create_all()
-        
-        # Initialize roles if needed
-        from app import ROLES
-        for role_name, role_data in ROLES.items():
-            role = Role.query.filter_by(name=role_name).first()
-            if not role:
-                role = Role(
-                    name=role_name,
-                    description=role_data['description'],
-                    permissions=role_data['permissions']
-                )
-                db.session.add(role)
-        db.session.commit()
-
-        # Create admin user if it doesn't exist
-        admin_role = Role.query.filter_by(name='admin').first()
-        if not User.query.filter_by(username='admin').first():
-            admin_user = User(
-                username='admin',
-                email='admin@example.com',
-                role=admin_role
-            )
-            admin_user.set_password('Coolio03!')
-            db.session.add(admin_user)
-            db.session.commit()
-            print("Admin user created successfully!")
+schema_version = Table(
+    'schema_version', MetaData(),
+    Column('version', Integer, primary_key=True),
+    Column('description', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = []
+
+def migration(version, description):
+    """Register a function taking a connection as schema migration `version`."""
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return register
+
+def create_indexes(conn, table_name, index_names):
+    """Create named indexes declared on a model's table if they are missing."""
+    table = db.Model.metadata.tables[table_name]
+    for index in table.indexes:
+        if index.name in index_names:
+            index.create(bind=conn, checkfirst=True)
+
+@migration(1, 'Add lookup indexes to project and customer')
+def add_lookup_indexes(conn):
+    create_indexes(conn, 'project', {
+        'ix_project_region_date',
+        'ix_project_region_created_at',
+        'ix_project_customer_id',
+        'ix_project_date',
+    })
+    create_indexes(conn, 'customer', {'ix_customer_phone'})
+
+@migration(2, 'Add notification outbox table')
+def add_outbox_table(conn):
+    OutboxMessage.__table__.create(bind=conn, checkfirst=True)
+
+@migration(3, 'Add covering index for analytics type counts')
+def add_analytics_index(conn):
+    # No longer declared on the model (migration 5 drops it again), so create it
+    # with plain DDL rather than an Index that would attach to the project table
+    conn.execute(text(
+        'CREATE INDEX IF NOT EXISTS ix_project_region_types_date '
+        'ON project (region, work_type, job_cost_type, date)'
+    ))
+
+@migration(4, 'Normalize project work/job cost types into project_type tables')
+def normalize_project_types(conn):
+    ProjectType.__table__.create(bind=conn, checkfirst=True)
+    project_type_link.create(bind=conn, checkfirst=True)
+    seed_project_types(conn)
+
+    # Backfill links from the comma-joined strings on existing projects
+    type_table = ProjectType.__table__
+    type_ids = {
+        (row.category, row.name): row.id
+        for row in conn.execute(select(type_table.c.id, type_table.c.category, type_table.c.name))
+    }
+    project = db.Model.metadata.tables['project']
+    last_id = ''
+    while True:
+        rows = conn.execute(
+            select(project.c.id, project.c.work_type, project.c.job_cost_type)
+            .where(project.c.id > last_id)
+            .order_by(project.c.id)
+            .limit(10000)
+        ).fetchall()
+        if not rows:
+            break
+        links = []
+        for row in rows:
+            for category, value in ((WORK_TYPE, row.work_type), (JOB_COST_TYPE, row.job_cost_type)):
+                for name in dict.fromkeys(n.strip() for n in (value or '').split(',') if n.strip()):
+                    if (category, name) not in type_ids:
+                        result = conn.execute(type_table.insert().values(category=category, name=name))
+                        type_ids[(category, name)] = result.inserted_primary_key[0]
+                    links.append({'project_id': row.id, 'type_id': type_ids[(category, name)]})
+        if links:
+            conn.execute(project_type_link.insert(), links)
+        last_id = rows[-1].id
+
+@migration(5, 'Add daily project type rollup for analytics')
+def add_type_rollup(conn):
+    ProjectTypeDailyCount.__table__.create(bind=conn, checkfirst=True)
+    rebuild_rollups(conn)
+    conn.execute(text('DROP INDEX IF EXISTS ix_project_region_types_date'))
+
+@migration(6, 'Add export changelog and rebuild region export files')
+def add_export_changelog(conn):
+    ExportChange.__table__.create(bind=conn, checkfirst=True)
+    # Existing files may hold duplicate rows; rebuild them all on the next pass
+    conn.execute(ExportChange.__table__.insert().values(region=None, project_id=None))
+
+@migration(7, 'Add customer changelog for incremental customer sync')
+def add_customer_changelog(conn):
+    CustomerChange.__table__.create(bind=conn, checkfirst=True)
+    # Number every existing customer so a first sync returns them all
+    conn.execute(CustomerChange.__table__.insert().from_select(
+        ['customer_id', 'deleted'],
+        select(Customer.id, false()).where(
+            Customer.id.notin_(select(CustomerChange.customer_id))
+        ).order_by(Customer.id)
+    ))
+
+@migration(8, 'Add dedupe keys to the notification outbox')
+def add_outbox_dedupe_key(conn):
+    columns = {column['name'] for column in inspect(conn).get_columns('outbox_message')}
+    if 'dedupe_key' not in columns:
+        conn.execute(text('ALTER TABLE outbox_message ADD COLUMN dedupe_key VARCHAR(100)'))
+    create_indexes(conn, 'outbox_message', {'ix_outbox_message_dedupe_key'})
+
+def current_version(conn):
+    """Return the highest applied migration version, or 0."""
+    versions = [row.version for row in conn.execute(select(schema_version.c.version))]
+    return max(versions, default=0)
+
+def upgrade(engine=None):
+    """Apply every pending migration and return the list of versions applied."""
+    engine = engine or db.engine
+    schema_version.create(bind=engine, checkfirst=True)
+
+    applied = []
+    with engine.connect() as conn:
+        version = current_version(conn)
+    for number, description, fn in MIGRATIONS:
+        if number <= version:
+            continue
+        with engine.begin() as conn:
+            logger.info("Applying migration %d: %s", number, description)
+            fn(conn)
+            conn.execute(schema_version.insert().values(
+                version=number,
+                description=description,
+                applied_at=datetime.utcnow()
+            ))
+        applied.append(number)
+    return applied
 
 if __name__ == '__main__':
-    recreate_database()
-    print("Database recreated successfully!") 
\ No newline at end of file
+    from app import app
+    with app.app_context():
+        applied = upgrade()
+    if applied:
+        print(f"Applied migrations: {', '.join(str(v) for v in applied)}")
+    else:
+        print("Database schema is up to date")
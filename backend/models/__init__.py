@@ -1,12 +1,207 @@
+from collections import deque
+from datetime import datetime
+from flask import has_request_context, request
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+import logging
 import os
+import threading
+import time
 
 db = SQLAlchemy()
+logger = logging.getLogger(__name__)
+
+# Connection settings used when the app config does not set its own
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'cache_size': -16000,
+    'mmap_size': 64 * 1024 * 1024,
+}
+DEFAULT_POOL = {
+    'pool_size': 5,
+    'max_overflow': 10,
+    'pool_timeout': 30,
+    'pool_recycle': 3600,
+}
+
+def engine_options(config):
+    """SQLAlchemy engine options for the configured database and pool settings."""
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    if not config.get('SQLALCHEMY_DATABASE_URI'):
+        raise RuntimeError("No database configured; set DATABASE_URL")
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    pool = {key: config.get(f'DB_{key.upper()}', default) for key, default in DEFAULT_POOL.items()}
+    if url.get_backend_name() == 'sqlite':
+        if url.database in (None, '', ':memory:'):
+            return options  # Flask-SQLAlchemy keeps in-memory databases on one shared connection
+        # SQLAlchemy 1.4 opens a new SQLite connection per checkout unless told to pool them
+        options.setdefault('poolclass', QueuePool)
+        if options['poolclass'] is QueuePool:
+            options.setdefault('pool_size', pool['pool_size'])
+            options.setdefault('max_overflow', pool['max_overflow'])
+            options.setdefault('pool_timeout', pool['pool_timeout'])
+        connect_args = options.setdefault('connect_args', {})
+        connect_args.setdefault('check_same_thread', False)
+    else:
+        for key, value in pool.items():
+            options.setdefault(key, value)
+        options.setdefault('pool_pre_ping', True)
+    return options
+
+def upsert(table):
+    """An INSERT into `table` that takes ON CONFLICT clauses, for the session's database.
+
+    SQLite (3.24 and later) and PostgreSQL both settle two transactions
+    inserting the same key inside the statement, where a check followed by
+    an INSERT would let both insert and one fail.
+    """
+    if db.engine.dialect.name == 'postgresql':
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+def _apply_sqlite_pragmas(pragmas):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+    return on_connect
+
+class SlowQueryLog:
+    """The most recent slow statements, in a fixed-size buffer (oldest dropped first)."""
+
+    def __init__(self, threshold_ms, size=200):
+        self.threshold_ms = threshold_ms
+        self._entries = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, entry):
+        with self._lock:
+            self._entries.append(entry)
+
+    def entries(self):
+        """Captured statements, newest first."""
+        with self._lock:
+            return list(reversed(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# Statements worth asking SQLite for a plan; not PRAGMA, BEGIN, COMMIT etc.
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+MAX_PARAMETERS_LENGTH = 1000
+
+def explain_query_plan(dbapi_connection, statement, parameters):
+    """SQLite's EXPLAIN QUERY PLAN for a statement, one step per line, indented by depth."""
+    cursor = dbapi_connection.cursor()
+    try:
+        rows = cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+    finally:
+        cursor.close()
+    depths = {0: -1}
+    lines = []
+    for step_id, parent, _, detail in rows:
+        depths[step_id] = depths.get(parent, -1) + 1
+        lines.append('  ' * depths[step_id] + detail)
+    return lines
+
+def is_full_scan(plan):
+    """Whether a plan reads a whole table rather than going through an index."""
+    return any(
+        step.strip().startswith(('SCAN ', 'SCAN TABLE ')) and ' USING ' not in step
+        for step in plan or ()
+    )
+
+def _capture_slow_queries(engine, log):
+    """Record statements on `engine` slower than the log's threshold.
+
+    The time covers executing the statement, which for SQLite includes
+    finding the first row but not fetching the rest.
+    """
+    threshold = log.threshold_ms / 1000.0
+    explain = engine.dialect.name == 'sqlite'
+
+    # The start time lives on the statement's execution context, which is
+    # dropped with it when the statement raises and after_cursor_execute
+    # never runs
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.slow_query_started = time.perf_counter()
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, 'slow_query_started', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        if elapsed < threshold:
+            return
+        if has_request_context():
+            origin = request.endpoint or request.path
+        else:
+            origin = threading.current_thread().name
+        plan = None
+        if explain and statement.lstrip().upper().startswith(EXPLAINABLE):
+            try:
+                plan = explain_query_plan(
+                    conn.connection, statement, parameters[0] if executemany else parameters)
+            except Exception as e:
+                plan = [f'EXPLAIN failed: {e}']
+        entry = {
+            'time': datetime.utcnow().isoformat(),
+            'duration_ms': round(elapsed * 1000, 2),
+            'origin': origin,
+            'pid': os.getpid(),
+            'statement': statement,
+            'parameters': repr(parameters)[:MAX_PARAMETERS_LENGTH],
+            'executemany': executemany,
+            'plan': plan,
+            'full_scan': is_full_scan(plan)
+        }
+        log.add(entry)
+        logger.warning("Slow query (%.1f ms) in %s: %s", entry['duration_ms'], origin, statement, extra={
+            'parameters': entry['parameters'],
+            'plan': ' | '.join(line.strip() for line in plan or ())
+        })
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+
+def configure_database(app):
+    """Bind `db` to the app, with its pool settings and (for SQLite) connection pragmas.
+
+    Reads SQLALCHEMY_DATABASE_URI, the DB_POOL_SIZE / DB_MAX_OVERFLOW /
+    DB_POOL_TIMEOUT / DB_POOL_RECYCLE settings and SQLITE_PRAGMAS from the app
+    config. WAL lets readers keep going while the scheduler or a request is
+    writing; busy_timeout makes a second writer wait instead of failing with
+    "database is locked".
+
+    With SLOW_QUERY_MS set, statements slower than that are logged along with
+    their parameters, the route (or thread) that ran them and, on SQLite,
+    their query plan; the last SLOW_QUERY_LOG_SIZE of them are kept in
+    app.extensions['slow_queries'] for the admin view.
+    """
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    db.init_app(app)
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name == 'sqlite':
+            pragmas = app.config.get('SQLITE_PRAGMAS', DEFAULT_SQLITE_PRAGMAS)
+            event.listen(engine, 'connect', _apply_sqlite_pragmas(pragmas))
+        if app.config.get('SLOW_QUERY_MS') is not None:
+            log = SlowQueryLog(float(app.config['SLOW_QUERY_MS']), app.config.get('SLOW_QUERY_LOG_SIZE', 200))
+            _capture_slow_queries(engine, log)
+            app.extensions['slow_queries'] = log
 
 def init_app(app):
     # Initialize the database
-    db.init_app(app)
+    configure_database(app)
     
     # Create all tables
     with app.app_context():
-        db.create_all()
\ No newline at end of file
+        db.create_all()
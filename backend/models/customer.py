@@ -7,7 +7,7 @@ class Customer(db.Model):
     name = db.Column(db.String(100))  # Full name
     first_name = db.Column(db.String(100))
     last_name = db.Column(db.String(100))
-    phone = db.Column(db.String(20), nullable=False)  # Keep phone as required for uniqueness
+    phone = db.Column(db.String(20), nullable=False, index=True)  # Keep phone as required for uniqueness
     email = db.Column(db.String(120))
     # Define one-to-many relationship with Project
     projects = db.relationship('Project', back_populates='customer', lazy=True)
@@ -0,0 +1,18 @@
+from . import db
+
+class CustomerChange(db.Model):
+    """The latest change to each customer, numbered for incremental sync.
+
+    Every insert, update or delete of a customer replaces its row here with
+    one holding a new, higher id, so a client that has seen changes up to id
+    N only needs the rows above N. AUTOINCREMENT keeps ids from being reused.
+    """
+    __tablename__ = 'customer_change'
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    customer_id = db.Column(db.Integer, nullable=False, unique=True)  # no foreign key: deletes are logged too
+    deleted = db.Column(db.Boolean, nullable=False, default=False)
+
+    def __repr__(self):
+        return f'<CustomerChange {self.id} {self.customer_id}>'
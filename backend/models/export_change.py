@@ -0,0 +1,20 @@
+from . import db
+from datetime import datetime
+
+class ExportChange(db.Model):
+    """A project whose row in its region's export file is out of date.
+
+    Written in the same transaction as the project change and compacted into
+    the export files by `services.region_export.RegionExportWorker`. A row with
+    no project_id marks the whole region (or, with no region, every region) for
+    a full rebuild.
+    """
+    __tablename__ = 'export_change'
+
+    id = db.Column(db.Integer, primary_key=True)
+    region = db.Column(db.String(50))
+    project_id = db.Column(db.String(36))  # no foreign key: deleted projects are logged too
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ExportChange {self.id} {self.region} {self.project_id}>'
@@ -0,0 +1,35 @@
+from . import db
+from datetime import datetime
+
+class OutboxMessage(db.Model):
+    """An outbound email/SMS notification waiting to be delivered.
+
+    Rows are written in the same transaction as the change that triggered them
+    and drained by `services.notification_queue.NotificationQueue`. A worker
+    claims a row by pushing `next_attempt_at` forward by a lease, so a message
+    whose worker dies mid-send becomes due again once the lease expires.
+    A `dedupe_key` makes enqueueing idempotent: a message is only queued once
+    per key, so a job that is rerun does not notify anyone twice.
+    """
+    __tablename__ = 'outbox_message'
+    __table_args__ = (
+        db.Index('ix_outbox_message_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    dedupe_key = db.Column(db.String(100), index=True, unique=True)
+    payload = db.Column(db.Text, nullable=False)  # JSON-encoded keyword arguments
+    status = db.Column(db.String(20), nullable=False, default=PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<OutboxMessage {self.id} {self.kind} {self.status}>'
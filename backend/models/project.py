@@ -1,11 +1,16 @@
 from . import db
+from .project_type import ProjectType, project_type_link, WORK_TYPE, JOB_COST_TYPE
 from datetime import datetime
 
 class Project(db.Model):
     __tablename__ = 'project'
+    __table_args__ = (
+        db.Index('ix_project_region_date', 'region', 'date'),
+        db.Index('ix_project_region_created_at', 'region', 'created_at'),
+    )
     
     id = db.Column(db.String(36), primary_key=True)
-    date = db.Column(db.Date, nullable=False)
+    date = db.Column(db.Date, nullable=False, index=True)
     po = db.Column(db.String(100))
     address = db.Column(db.String(200), nullable=False)
     city = db.Column(db.String(100))
@@ -16,9 +21,21 @@ class Project(db.Model):
     work_type = db.Column(db.String(100))
     notes = db.Column(db.Text)
     region = db.Column(db.String(50), nullable=False)
-    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=False, index=True)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
     
     # Define many-to-one relationship with Customer
     customer = db.relationship('Customer', back_populates='projects', lazy=True)
+
+    # Indexed work/job cost types; work_type and job_cost_type keep the
+    # comma-joined form for display and exports
+    types = db.relationship('ProjectType', secondary=project_type_link, lazy=True)
+
+    def set_types(self, work_types, job_cost_types):
+        """Set work and job cost types, keeping the joined strings in sync."""
+        work_types = list(work_types or [])
+        job_cost_types = list(job_cost_types or [])
+        self.work_type = ','.join(work_types)
+        self.job_cost_type = ','.join(job_cost_types)
+        self.types = ProjectType.resolve(WORK_TYPE, work_types) + ProjectType.resolve(JOB_COST_TYPE, job_cost_types)
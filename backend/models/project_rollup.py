@@ -0,0 +1,19 @@
+from . import db
+
+class ProjectTypeDailyCount(db.Model):
+    """Number of projects per region, day and work/job cost type.
+
+    Kept in step with project writes (see services.analytics_rollup) so
+    analytics can sum a few rows per day instead of scanning projects.
+    """
+    __tablename__ = 'project_type_daily_count'
+
+    region = db.Column(db.String(50), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    type_id = db.Column(db.Integer, db.ForeignKey('project_type.id'), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    project_type = db.relationship('ProjectType')
+
+    def __repr__(self):
+        return f'<ProjectTypeDailyCount {self.region} {self.day} {self.type_id}={self.count}>'
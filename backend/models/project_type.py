@@ -0,0 +1,90 @@
+from . import db, upsert
+
+WORK_TYPE = 'work_type'
+JOB_COST_TYPE = 'job_cost_type'
+
+# Seed values, matching the options offered by the frontend project form
+WORK_TYPES = [
+    'basement',
+    'garage',
+    'slab_on',
+    'under_footing',
+    'plumber_spray',
+    'footings',
+    'crawl_space',
+    'heavy_blanket',
+    'dry_blanket',
+    'exterior_gravel',
+    'track_out',
+    'other'
+]
+
+JOB_COST_TYPES = [
+    'standard',
+    'time_and_material',
+    'conveyer_rental',
+    'conveyer_rental_labor',
+    'conveyer_rental_multiple',
+    'landscape',
+    'dumptruck_rental',
+    'other'
+]
+
+# Links each project to its work and job cost types
+project_type_link = db.Table(
+    'project_type_link',
+    db.Column('project_id', db.String(36), db.ForeignKey('project.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('type_id', db.Integer, db.ForeignKey('project_type.id'), primary_key=True),
+    db.Index('ix_project_type_link_type_id_project_id', 'type_id', 'project_id'),
+)
+
+class ProjectType(db.Model):
+    """A work type or job cost type that projects can be tagged with."""
+    __tablename__ = 'project_type'
+    __table_args__ = (
+        db.UniqueConstraint('category', 'name', name='uq_project_type_category_name'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    category = db.Column(db.String(20), nullable=False)  # WORK_TYPE or JOB_COST_TYPE
+    name = db.Column(db.String(50), nullable=False)
+
+    @classmethod
+    def resolve(cls, category, names):
+        """Return ProjectType rows for `names`, creating any that are new."""
+        names = [n.strip() for n in names if n and n.strip()]
+        if not names:
+            return []
+        names = list(dict.fromkeys(names))
+        existing = {
+            t.name: t for t in cls.query.filter(cls.category == category, cls.name.in_(names))
+        }
+        missing = [name for name in names if name not in existing]
+        if missing:
+            # Another request may be creating the same types; DO NOTHING
+            # leaves theirs in place and both read back the same rows
+            db.session.execute(
+                upsert(cls.__table__)
+                .values([{'category': category, 'name': name} for name in missing])
+                .on_conflict_do_nothing(index_elements=['category', 'name'])
+            )
+            existing.update(
+                (t.name, t) for t in cls.query.filter(cls.category == category, cls.name.in_(missing))
+            )
+        return [existing[name] for name in names]
+
+    def __repr__(self):
+        return f'<ProjectType {self.category}:{self.name}>'
+
+def seed_project_types(conn):
+    """Insert the standard work and job cost types that are not present yet."""
+    table = ProjectType.__table__
+    present = {(row.category, row.name) for row in conn.execute(db.select(table.c.category, table.c.name))}
+    rows = [
+        {'category': category, 'name': name}
+        for category, names in ((WORK_TYPE, WORK_TYPES), (JOB_COST_TYPE, JOB_COST_TYPES))
+        for name in names
+        if (category, name) not in present
+    ]
+    if rows:
+        conn.execute(table.insert(), rows)
@@ -1,7 +1,11 @@
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from . import db
+from datetime import datetime, timedelta
 import uuid
+import logging
+
+logger = logging.getLogger(__name__)
 
 class Invitation(db.Model):
     __tablename__ = 'invitations'
@@ -22,10 +26,11 @@ class Invitation(db.Model):
         self.code = str(uuid.uuid4())
         self.email = email
         self.role = role
-        self.expires_at = db.func.current_timestamp() + db.func.interval(expires_in_days, 'day')
+        # Computed here rather than in SQL: date arithmetic differs between databases
+        self.expires_at = datetime.utcnow() + timedelta(days=int(expires_in_days))
     
     def is_valid(self):
-        return not self.used and self.expires_at > db.func.current_timestamp()
+        return not self.used and self.expires_at > datetime.utcnow()
 
 class Role(db.Model):
     __tablename__ = 'roles'
@@ -62,15 +67,12 @@ class User(UserMixin, db.Model):
             self.role = Role.query.filter_by(name='viewer').first()
 
     def set_password(self, password):
-        print(f"Setting password for user: {self.username}")
+        logger.debug("Setting password for user: %s", self.username)
         self.password_hash = generate_password_hash(password)
-        print(f"Password hash generated: {self.password_hash[:20]}...")
 
     def check_password(self, password):
-        print(f"Checking password for user: {self.username}")
-        print(f"Stored hash: {self.password_hash[:20]}...")
         result = check_password_hash(self.password_hash, password)
-        print(f"Password check result: {result}")
+        logger.debug("Password check for user %s: %s", self.username, result)
         return result
 
     def has_permission(self, permission):
@@ -0,0 +1,31 @@
+"""Rebuild or verify the analytics daily rollup table.
+
+The rollup is maintained on every project write; this recomputes it from
+the raw project tables, e.g. after bulk edits made outside the API.
+
+Run from the backend directory:
+
+    python reconcile_rollups.py          # rebuild from raw counts
+    python reconcile_rollups.py --check  # report drift without changing anything
+"""
+import sys
+from models import db
+from services.analytics_rollup import rebuild_rollups, rollup_mismatches
+
+def main(argv):
+    from app import app
+    with app.app_context():
+        if '--check' in argv:
+            mismatches = rollup_mismatches()
+            for region, day, type_id, rolled, raw in mismatches:
+                print(f"{region} {day} type {type_id}: rollup={rolled} raw={raw}")
+            print(f"Found {len(mismatches)} mismatched rollup counts")
+            return 1 if mismatches else 0
+
+        rebuild_rollups()
+        db.session.commit()
+        print("Rebuilt analytics rollups from project data")
+        return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
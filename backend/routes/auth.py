@@ -7,37 +7,36 @@ import jwt
 from datetime import datetime, timedelta
 from functools import wraps
 from services.email_service import EmailService
+from services.user_cache import token_identity, load_user, invalidate_user
 import os
+import logging
 
 auth = Blueprint('auth', __name__)
+logger = logging.getLogger(__name__)
 
 # List of valid signup codes - you can modify these as needed
 VALID_SIGNUP_CODES = ['SAVAGE2024']  # Single code for simplicity
 
 def token_required(f):
+    """Pass the caller to the view as a read-only `CachedUser` snapshot.
+
+    The snapshot is shared with other requests and is not an ORM instance,
+    so views that change a user query the `User` again.
+    """
     @wraps(f)
     def decorated(*args, **kwargs):
         try:
-            # Add debug logging
-            auth_header = request.headers.get('Authorization')
-            print(f"Auth header received: {auth_header}")
-            
-            verify_jwt_in_request()
-            user_id = get_jwt_identity()
-            print(f"JWT identity: {user_id}")
-            
-            # Convert string ID back to integer
-            user_id = int(user_id)
-            current_user = User.query.get(user_id)
+            # Identity and user record come from short-lived caches when warm
+            user_id = token_identity()
+            current_user = load_user(user_id)
             
             if not current_user:
-                print(f"No user found for id: {user_id}")
+                logger.info("No user found for id: %s", user_id)
                 return jsonify({'error': 'User not found'}), 401
                 
-            print(f"User found: {current_user.username}")
             return f(current_user, *args, **kwargs)
         except Exception as e:
-            print(f"Token validation error: {str(e)}")
+            logger.info("Token validation error: %s", e)
             return jsonify({'error': 'Token is invalid'}), 401
             
     return decorated
@@ -45,9 +44,7 @@ def token_required(f):
 def admin_required(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        verify_jwt_in_request()
-        user_id = get_jwt_identity()
-        current_user = User.query.get(user_id)
+        current_user = load_user(token_identity())
         
         if not current_user or not current_user.is_admin():
             return jsonify({'error': 'Admin privileges required'}), 403
@@ -138,7 +135,7 @@ def create_invitation(current_user):
             expires_in_days=invitation.expires_at - datetime.utcnow()
         )
     except Exception as e:
-        print(f"Error sending invitation email: {str(e)}")
+        logger.error("Error sending invitation email: %s", e)
         # Don't return error here, just log it
     
     return jsonify({
@@ -202,7 +199,7 @@ def signup():
         return jsonify({'message': 'User created successfully'}), 201
         
     except Exception as e:
-        print(f"Error in signup: {str(e)}")
+        logger.exception("Error in signup")
         return jsonify({'error': 'Internal server error'}), 500
 
 @auth.route('/login', methods=['GET', 'POST'])
@@ -214,7 +211,7 @@ def login():
     username = request.form.get('username')
     password = request.form.get('password')
 
-    print(f"Login attempt for username: {username}")
+    logger.info("Login attempt for username: %s", username)
     
     if not username or not password:
         return jsonify({'error': 'Missing username or password'}), 400
@@ -225,7 +222,7 @@ def login():
         login_user(user)
         # Create JWT token with string identity
         token = create_access_token(identity=str(user.id))
-        print(f"Created token for user {user.username} with ID {user.id}")
+        logger.debug("Created token for user %s with ID %s", user.username, user.id)
         return jsonify({
             'message': 'Login successful',
             'token': token,
@@ -260,7 +257,7 @@ def get_users(current_user):
             'role': user.role.name if user.role else None
         } for user in users]), 200
     except Exception as e:
-        print(f"Error fetching users: {str(e)}")
+        logger.exception("Error fetching users")
         return jsonify({'error': 'Failed to fetch users'}), 500
 
 @auth.route('/roles', methods=['GET'])
@@ -273,7 +270,7 @@ def get_roles():
             'description': role.description
         } for role in roles]), 200
     except Exception as e:
-        print(f"Error fetching roles: {str(e)}")
+        logger.exception("Error fetching roles")
         return jsonify({'error': 'Failed to fetch roles'}), 500
 
 @auth.route('/users/<int:user_id>/role', methods=['PUT'])
@@ -294,6 +291,7 @@ def update_user_role(user_id):
 
         user.role = role
         db.session.commit()
+        invalidate_user(user_id)
 
         return jsonify({
             'message': 'User role updated successfully',
@@ -304,7 +302,7 @@ def update_user_role(user_id):
             }
         }), 200
     except Exception as e:
-        print(f"Error updating user role: {str(e)}")
+        logger.exception("Error updating user role")
         db.session.rollback()
         return jsonify({'error': 'Failed to update user role'}), 500
 
@@ -312,7 +310,7 @@ def update_user_role(user_id):
 @token_required
 def validate_token(current_user):
     try:
-        print(f"Validating token for user: {current_user.username}")
+        logger.debug("Validating token for user: %s", current_user.username)
         return jsonify({
             'valid': True,
             'user': {
@@ -323,7 +321,7 @@ def validate_token(current_user):
             }
         })
     except Exception as e:
-        print(f"Error in validate_token: {str(e)}")
+        logger.exception("Error in validate_token")
         return jsonify({'error': str(e)}), 500
 
 @auth.route('/user/<int:user_id>', methods=['PUT'])
@@ -358,6 +356,7 @@ def update_user(current_user, user_id):
             user.set_password(data['password'])
             
         db.session.commit()
+        invalidate_user(user_id)
         
         return jsonify({
             'message': 'User updated successfully',
@@ -369,6 +368,6 @@ def update_user(current_user, user_id):
             }
         }), 200
     except Exception as e:
-        print(f"Error updating user: {str(e)}")
+        logger.exception("Error updating user")
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -0,0 +1,71 @@
+from flask import Blueprint, current_app, jsonify, request
+from io import TextIOWrapper
+from routes.auth import token_required
+from services import csv_service, customer_search, customer_sync
+import logging
+
+customers_bp = Blueprint('customers', __name__)
+logger = logging.getLogger(__name__)
+
+@customers_bp.route('/import-customers', methods=['POST'])
+def import_customers():
+    try:
+        if 'file' not in request.files:
+            return jsonify({"error": "No file provided"}), 400
+        
+        file = request.files['file']
+        if file.filename == '':
+            return jsonify({"error": "No file selected"}), 400
+        
+        if not file.filename.endswith('.csv'):
+            return jsonify({"error": "File must be a CSV"}), 400
+        
+        # Stream the upload through the import engine; known phones are left as they are
+        stream = TextIOWrapper(file.stream, encoding='utf-8-sig', newline='')
+        result = csv_service.import_customers(stream, update_existing=False)
+        if not result['success']:
+            return jsonify({"error": result['error']}), 500
+        return jsonify({"message": f"Successfully imported {result['imported']} customers"})
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@customers_bp.route('/search-customers', methods=['GET'])
+def search_customers():
+    try:
+        search_term = request.args.get('q', '')
+        logger.debug("Received search request with term: %s", search_term)
+        
+        # Typo-tolerant lookup by name, email or phone digits from the in-memory index
+        result = customer_search.search_customers(search_term, limit=10)
+        logger.debug("Found %d matching customers", len(result))
+        return jsonify(result)
+        
+    except Exception as e:
+        logger.exception("Error in search_customers")
+        return jsonify({"error": str(e)}), 500
+
+
+@customers_bp.route('/customers/sync', methods=['GET'])
+@token_required
+def sync_customers(current_user):
+    """Customers changed since `?since=<version>`, for the frontend's cache.
+
+    The ETag is the current version, so polling with If-None-Match costs a
+    single indexed lookup and an empty 304 while nothing has changed.
+    """
+    since = request.args.get('since', 0, type=int)
+    version = customer_sync.customer_version()
+    if since > version:
+        # The client's copy came from another database; start it over
+        since = 0
+    if since == version or request.if_none_match.contains(str(version)):
+        response = current_app.response_class(status=304)
+        response.set_etag(str(version))
+        return response
+
+    changes = customer_sync.customer_changes_since(since)
+    changes['full'] = since == 0
+    response = jsonify(changes)
+    response.set_etag(str(changes['version']))
+    return response
@@ -0,0 +1,54 @@
+from flask import Blueprint, current_app, jsonify
+from routes.user_management import admin_required
+from services.profiler import merged_profile, profiled_endpoints
+import logging
+
+diagnostics = Blueprint('diagnostics', __name__)
+logger = logging.getLogger(__name__)
+
+@diagnostics.route('/slow-queries', methods=['GET'], endpoint='slow_queries')
+@admin_required
+def get_slow_queries(current_user):
+    """Recent statements over SLOW_QUERY_MS in this worker process, newest first.
+
+    Each entry has the statement, its parameters, the route or thread that
+    ran it, how long it took and, on SQLite, its query plan with `full_scan`
+    set when the plan reads a whole table.
+    """
+    log = current_app.extensions.get('slow_queries')
+    if log is None:
+        return jsonify({'enabled': False, 'entries': []})
+    return jsonify({
+        'enabled': True,
+        'threshold_ms': log.threshold_ms,
+        'entries': log.entries()
+    })
+
+@diagnostics.route('/slow-queries', methods=['DELETE'], endpoint='clear_slow_queries')
+@admin_required
+def clear_slow_queries(current_user):
+    log = current_app.extensions.get('slow_queries')
+    if log is not None:
+        log.clear()
+        logger.info("Slow query log cleared by %s", current_user.username)
+    return jsonify({'message': 'Slow query log cleared'})
+
+@diagnostics.route('/profiles', methods=['GET'], endpoint='profiles')
+@admin_required
+def get_profiles(current_user):
+    """Endpoints with request profiles, and how many requests and samples each has."""
+    directory = current_app.extensions.get('profiler')
+    if directory is None:
+        return jsonify({'enabled': False, 'endpoints': []})
+    return jsonify({'enabled': True, 'endpoints': profiled_endpoints(directory)})
+
+@diagnostics.route('/profiles/<endpoint>', methods=['GET'], endpoint='profile')
+@admin_required
+def get_profile(current_user, endpoint):
+    """All of an endpoint's profiles added up, as collapsed stacks for flamegraph.pl or speedscope."""
+    directory = current_app.extensions.get('profiler')
+    samples = merged_profile(directory, endpoint) if directory else None
+    if samples is None:
+        return jsonify({'error': 'No profiles for this endpoint'}), 404
+    lines = ''.join(f'{stack} {count}\n' for stack, count in samples.most_common())
+    return current_app.response_class(lines, mimetype='text/plain')
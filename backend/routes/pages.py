@@ -0,0 +1,36 @@
+from flask import render_template
+from flask_login import current_user, login_required
+from routes.projects import parse_date_arg
+from services.project_listing import list_projects
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+@login_required
+def calendar(region):
+    try:
+        # Get projects for this region in the requested window, formatted for the calendar
+        projects_list = list_projects(
+            region=region,
+            start=parse_date_arg('start'),
+            end=parse_date_arg('end')
+        )
+        
+        # Convert to JSON for the template
+        projects_json = json.dumps(projects_list)
+        
+        return render_template('calendar.html',
+                            region=region,
+                            username=current_user.username,
+                            role=current_user.role.name if current_user.role else None,
+                            projects=projects_list,
+                            projects_json=projects_json)
+    except Exception as e:
+        logger.exception("Exception in calendar route")
+        return render_template('calendar.html',
+                            region=region,
+                            username=current_user.username,
+                            role=current_user.role.name if current_user.role else None,
+                            projects=[],
+                            projects_json='[]')
@@ -1,137 +1,82 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_login import current_user, login_required
 from models import db
 from models.project import Project
 from models.customer import Customer
-from services.sms_service import SMSService
-from services.email_service import EmailService
+from services.notification_queue import (
+    enqueue_notification, wake_notification_workers,
+    PROJECT_CONFIRMATION_EMAIL, PROJECT_UPDATE_EMAIL, PROJECT_SMS
+)
+from services.analytics_rollup import rollup_keys, apply_rollup_delta, update_rollup
+from services.project_listing import list_projects, list_projects_page, latest_project, MAX_PAGE_SIZE
+from services.project_export import stream_projects_csv
+from services.region_export import record_export_change, record_customer_export_changes, wake_export_worker
 from datetime import datetime
 import uuid
+import logging
 from routes.auth import token_required
-import csv
-import io
-import os
 
 projects_bp = Blueprint('projects', __name__)
+logger = logging.getLogger(__name__)
+
+def parse_date_arg(name):
+    """Read an optional YYYY-MM-DD query parameter, raising ValueError if malformed."""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f"Invalid {name} date, expected YYYY-MM-DD")
 
 @projects_bp.route('/<region>', methods=['GET'])
 def get_projects(region):
-    try:
-        print(f"Getting projects for region: {region}")
-        # Use subquery to ensure we get unique projects
-        subquery = db.session.query(Project.id).filter_by(region=region).group_by(Project.id).subquery()
-        projects = Project.query.filter(Project.id.in_(subquery)).order_by(Project.date).all()
-        print(f"Found {len(projects)} projects")
-        
-        project_list = []
-        seen_ids = set()  # Extra safety check
-        
-        for project in projects:
-            if project.id not in seen_ids:  # Extra safety check
-                seen_ids.add(project.id)
-                print(f"Project {project.id}: Found customer {project.customer.name if project.customer else 'Unknown'}")
-                
-                project_dict = {
-                    'id': project.id,
-                    'date': project.date.strftime('%Y-%m-%d'),
-                    'po': project.po,
-                    'customer_name': project.customer.name if project.customer else "Unknown",
-                    'customer_phone': project.customer.phone if project.customer else "",
-                    'customer_email': project.customer.email if project.customer else "",
-                    'address': project.address,
-                    'city': project.city,
-                    'subdivision': project.subdivision,
-                    'lot_number': project.lot_number,
-                    'square_footage': project.square_footage,
-                    'job_cost_type': project.job_cost_type.split(',') if project.job_cost_type else [],
-                    'work_type': project.work_type.split(',') if project.work_type else [],
-                    'notes': project.notes,
-                    'region': project.region
-                }
-                project_list.append(project_dict)
-        
-        print(f"Returning {len(project_list)} unique projects")
-        return jsonify(project_list)
-    except Exception as e:
-        print(f"Error getting projects: {str(e)}")
-        return jsonify({"error": str(e)}), 500
+    """List a region's projects ordered by (date, id).
 
-def export_region_projects(region):
+    Optional query parameters:
+      start, end     -- YYYY-MM-DD bounds of the half-open window [start, end)
+      work_type      -- only projects with this work type
+      job_cost_type  -- only projects with this job cost type
+      limit          -- page size; enables keyset pagination
+      cursor         -- value of the previous page's X-Next-Cursor header
+    """
     try:
-        # Get all projects for the specific region
-        projects = Project.query.filter_by(region=region).all()
-        
-        # Create export directory if it doesn't exist
-        export_dir = 'exports'
-        if not os.path.exists(export_dir):
-            os.makedirs(export_dir)
-        
-        # Fixed filename for each region
-        filepath = os.path.join(export_dir, f'projects_{region}.csv')
-        
-        # Check if file exists to determine if we need to write headers
-        file_exists = os.path.exists(filepath)
-        
-        # Open file in append mode
-        with open(filepath, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            
-            # Write header only if file is new
-            if not file_exists:
-                writer.writerow([
-                    'Project ID',
-                    'Customer Name',
-                    'Customer Email',
-                    'Customer Phone',
-                    'Date',
-                    'PO',
-                    'Address',
-                    'City',
-                    'Subdivision',
-                    'Lot Number',
-                    'Square Footage',
-                    'Job Cost Type',
-                    'Work Type',
-                    'Notes',
-                    'Created At',
-                    'Updated At'
-                ])
-            
-            # Write only the most recently added project
-            latest_project = projects[-1] if projects else None
-            if latest_project:
-                writer.writerow([
-                    latest_project.id,
-                    latest_project.customer.name if latest_project.customer else 'N/A',
-                    latest_project.customer.email if latest_project.customer else 'N/A',
-                    latest_project.customer.phone if latest_project.customer else 'N/A',
-                    latest_project.date.strftime('%Y-%m-%d'),
-                    latest_project.po or 'N/A',
-                    latest_project.address,
-                    latest_project.city or 'N/A',
-                    latest_project.subdivision or 'N/A',
-                    latest_project.lot_number or 'N/A',
-                    latest_project.square_footage or 'N/A',
-                    latest_project.job_cost_type or 'N/A',
-                    latest_project.work_type or 'N/A',
-                    latest_project.notes or 'N/A',
-                    latest_project.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                    latest_project.updated_at.strftime('%Y-%m-%d %H:%M:%S')
-                ])
-            
-        print(f"Added new project to {filepath}")
-        
+        try:
+            filters = {
+                'region': region,
+                'start': parse_date_arg('start'),
+                'end': parse_date_arg('end'),
+                'work_type': request.args.get('work_type') or None,
+                'job_cost_type': request.args.get('job_cost_type') or None
+            }
+            limit = request.args.get('limit', type=int)
+            cursor = request.args.get('cursor')
+            if limit is None and cursor is None:
+                return jsonify(list_projects(**filters))
+
+            project_list, next_cursor = list_projects_page(
+                cursor=cursor,
+                limit=limit or MAX_PAGE_SIZE,
+                **filters
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        response = jsonify(project_list)
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
     except Exception as e:
-        print(f"Error exporting {region} projects: {str(e)}")
+        logger.exception("Error getting projects")
+        return jsonify({"error": str(e)}), 500
 
 @projects_bp.route('/<region>', methods=['POST'])
 def create_project(region):
     try:
-        print(f"\n=== Creating Project in {region} Region ===")
+        logger.debug("Creating project in %s region", region)
         project_data = request.json
-        print(f"Project data received:")
-        print(f"  Work Types: {project_data.get('work_type', [])}")
-        print(f"  Job Cost Types: {project_data.get('job_cost_type', [])}")
+        logger.debug("Work types: %s, job cost types: %s",
+                     project_data.get('work_type', []), project_data.get('job_cost_type', []))
         
         # Check if customer already exists
         customer = Customer.query.filter_by(
@@ -142,7 +87,7 @@ def create_project(region):
         # 1. Customer doesn't exist, or
         # 2. Customer exists but has a different name
         if not customer or customer.name != project_data['customer_name']:
-            print(f"Creating new customer: {project_data['customer_name']}")
+            logger.debug("Creating new customer: %s", project_data['customer_name'])
             customer = Customer(
                 name=project_data['customer_name'],
                 phone=project_data['customer_phone'],
@@ -151,21 +96,14 @@ def create_project(region):
             db.session.add(customer)
             db.session.flush()
         else:
-            print(f"Found existing customer: {customer.name}")
+            logger.debug("Found existing customer: %s", customer.name)
             # Only update email if provided and different
             if project_data.get('customer_email') and project_data.get('customer_email') != customer.email:
                 customer.email = project_data.get('customer_email')
+                # The email appears on every export row of this customer's projects
+                record_customer_export_changes(customer.id)
 
         # Create new project
-        work_type_str = ','.join(project_data.get('work_type', []))
-        job_cost_type_str = ','.join(project_data.get('job_cost_type', []))
-        
-        print("\nCreating project with types:")
-        print(f"  Work Types (raw): {project_data.get('work_type', [])}")
-        print(f"  Work Types (joined): {work_type_str}")
-        print(f"  Job Cost Types (raw): {project_data.get('job_cost_type', [])}")
-        print(f"  Job Cost Types (joined): {job_cost_type_str}")
-        
         project = Project(
             id=str(uuid.uuid4()),
             date=datetime.strptime(project_data['date'], '%Y-%m-%d').date(),
@@ -175,59 +113,46 @@ def create_project(region):
             subdivision=project_data.get('subdivision'),
             lot_number=project_data.get('lot_number'),
             square_footage=project_data.get('square_footage'),
-            job_cost_type=job_cost_type_str,
-            work_type=work_type_str,
             notes=project_data.get('notes'),
             region=region,
             customer_id=customer.id
         )
+        project.set_types(project_data.get('work_type', []), project_data.get('job_cost_type', []))
         
         db.session.add(project)
-        db.session.commit()
-        print(f"\nCreated project with ID: {project.id}")
-        
-        # Send email confirmation if customer has email
+        apply_rollup_delta(rollup_keys(project), 1)
+        record_export_change(region, project.id)
+
+        # Queue notifications in the same transaction; workers deliver them after commit
         if customer.email:
-            try:
-                print(f"Attempting to send email to {customer.email}")
-                email_service = EmailService()
-                email_service.send_project_confirmation(
-                    customer_email=customer.email,
-                    customer_name=customer.name,
-                    project_date=project_data['date'],
-                    address=project_data['address'],
-                    work_type=project_data.get('work_type', []),
-                    job_cost_type=project_data.get('job_cost_type', []),
-                    city=project_data.get('city'),
-                    subdivision=project_data.get('subdivision'),
-                    lot_number=project_data.get('lot_number'),
-                    square_footage=project_data.get('square_footage'),
-                    notes=project_data.get('notes'),
-                    customer_phone=project_data.get('customer_phone'),
-                    region=region
-                )
-            except Exception as e:
-                print(f"Error sending email: {str(e)}")
-        
-        # Schedule SMS notification
-        sms_service = SMSService()
-        try:
-            print(f"Attempting to send SMS to {customer.phone}")
-            sms_service.schedule_project_notification(
-                phone_number=customer.phone,
+            enqueue_notification(
+                PROJECT_CONFIRMATION_EMAIL,
+                customer_email=customer.email,
                 customer_name=customer.name,
                 project_date=project_data['date'],
-                address=project_data['address']
+                address=project_data['address'],
+                work_type=project_data.get('work_type', []),
+                job_cost_type=project_data.get('job_cost_type', []),
+                city=project_data.get('city'),
+                subdivision=project_data.get('subdivision'),
+                lot_number=project_data.get('lot_number'),
+                square_footage=project_data.get('square_footage'),
+                notes=project_data.get('notes'),
+                customer_phone=project_data.get('customer_phone'),
+                region=region
             )
-        except Exception as e:
-            print(f"Error sending SMS: {str(e)}")
-            # Don't fail the request if SMS fails
-        
-        # Export project to CSV
-        try:
-            export_region_projects(region)
-        except Exception as e:
-            print(f"Error exporting project: {str(e)}")
+        enqueue_notification(
+            PROJECT_SMS,
+            phone_number=customer.phone,
+            customer_name=customer.name,
+            project_date=project_data['date'],
+            address=project_data['address']
+        )
+
+        db.session.commit()
+        wake_notification_workers()
+        wake_export_worker()
+        logger.info("Created project", extra={'project_id': project.id, 'region': region})
         
         return jsonify({
             'message': 'Project created successfully',
@@ -240,7 +165,7 @@ def create_project(region):
         })
         
     except Exception as e:
-        print(f"Error creating project: {str(e)}")
+        logger.exception("Error creating project")
         db.session.rollback()
         return jsonify({
             'success': False,
@@ -274,27 +199,28 @@ def get_project(region, project_id):
         }
         return jsonify(project_dict)
     except Exception as e:
-        print(f"Error getting project: {str(e)}")
+        logger.exception("Error getting project")
         return jsonify({"error": str(e)}), 500
 
 @projects_bp.route('/<region>/<project_id>', methods=['PUT'])
 @token_required
 def update_project(current_user, region, project_id):
     try:
-        print(f"Received update request for project {project_id} in region {region}")
+        logger.debug("Received update request for project %s in region %s", project_id, region)
         project_data = request.json
-        print(f"Update data received: {project_data}")
+        logger.debug("Update data received: %s", project_data)
         
         project = Project.query.get(project_id)
         if not project:
-            print(f"Project {project_id} not found")
+            logger.info("Project %s not found", project_id)
             return jsonify({"error": "Project not found"}), 404
         
         if project.region != region:
-            print(f"Project {project_id} belongs to region {project.region}, not {region}")
+            logger.info("Project %s belongs to region %s, not %s", project_id, project.region, region)
             return jsonify({"error": "Project does not belong to this region"}), 400
 
         # Update project details
+        old_rollup_keys = rollup_keys(project)
         try:
             project.date = datetime.strptime(project_data['date'], '%Y-%m-%d').date()
             project.po = project_data.get('po')
@@ -303,15 +229,15 @@ def update_project(current_user, region, project_id):
             project.subdivision = project_data.get('subdivision')
             project.lot_number = project_data.get('lot_number')
             project.square_footage = project_data.get('square_footage')
-            project.job_cost_type = ','.join(project_data.get('job_cost_type', []))
-            project.work_type = ','.join(project_data.get('work_type', []))
+            project.set_types(project_data.get('work_type', []), project_data.get('job_cost_type', []))
             project.notes = project_data.get('notes')
-            print(f"Updated project details for {project_id}")
+            update_rollup(old_rollup_keys, rollup_keys(project))
+            logger.debug("Updated project details for %s", project_id)
         except KeyError as e:
-            print(f"Missing required field: {str(e)}")
+            logger.info("Missing required field: %s", e)
             return jsonify({"error": f"Missing required field: {str(e)}"}), 400
         except Exception as e:
-            print(f"Error updating project details: {str(e)}")
+            logger.exception("Error updating project details")
             return jsonify({"error": f"Error updating project details: {str(e)}"}), 500
 
         # Handle customer updates
@@ -321,7 +247,7 @@ def update_project(current_user, region, project_id):
             # If customer name or phone has changed, create a new customer
             if (current_customer.name != project_data['customer_name'] or 
                 current_customer.phone != project_data['customer_phone']):
-                print(f"Customer details changed, creating new customer record")
+                logger.debug("Customer details changed, creating new customer record")
                 new_customer = Customer(
                     name=project_data['customer_name'],
                     phone=project_data['customer_phone'],
@@ -335,53 +261,44 @@ def update_project(current_user, region, project_id):
                 # Only update email if it changed
                 if project_data.get('customer_email') and project_data['customer_email'] != current_customer.email:
                     current_customer.email = project_data['customer_email']
+                    # The email appears on every export row of this customer's projects
+                    record_customer_export_changes(current_customer.id)
                 customer = current_customer
                 
-            print(f"Updated customer details for project {project_id}")
+            logger.debug("Updated customer details for project %s", project_id)
         except KeyError as e:
-            print(f"Missing required customer field: {str(e)}")
+            logger.info("Missing required customer field: %s", e)
             return jsonify({"error": f"Missing required customer field: {str(e)}"}), 400
         except Exception as e:
-            print(f"Error updating customer details: {str(e)}")
+            logger.exception("Error updating customer details")
             return jsonify({"error": f"Error updating customer details: {str(e)}"}), 500
 
-        # Send update email if customer has email
+        # Queue update email if customer has email; it is only sent if the commit succeeds
         if customer and customer.email:
-            email_service = EmailService()
-            try:
-                print(f"Attempting to send update email to {customer.email}")
-                email_service.send_project_update(
-                    customer_email=customer.email,
-                    customer_name=customer.name,
-                    project_date=project_data['date'],
-                    address=project_data['address'],
-                    customer_phone=customer.phone,
-                    po=project_data.get('po'),
-                    city=project_data.get('city'),
-                    subdivision=project_data.get('subdivision'),
-                    lot_number=project_data.get('lot_number'),
-                    square_footage=project_data.get('square_footage'),
-                    job_cost_type=project_data.get('job_cost_type', []),
-                    work_type=project_data.get('work_type', []),
-                    notes=project_data.get('notes'),
-                    region=region
-                )
-                print("Update email sent successfully")
-            except Exception as e:
-                print(f"Error sending update email: {str(e)}")
-                # Don't return error here, just log it
+            enqueue_notification(
+                PROJECT_UPDATE_EMAIL,
+                customer_email=customer.email,
+                customer_name=customer.name,
+                project_date=project_data['date'],
+                address=project_data['address'],
+                customer_phone=customer.phone,
+                po=project_data.get('po'),
+                city=project_data.get('city'),
+                subdivision=project_data.get('subdivision'),
+                lot_number=project_data.get('lot_number'),
+                square_footage=project_data.get('square_footage'),
+                job_cost_type=project_data.get('job_cost_type', []),
+                work_type=project_data.get('work_type', []),
+                notes=project_data.get('notes'),
+                region=region
+            )
 
         try:
+            record_export_change(project.region, project.id)
             db.session.commit()
-            print(f"Successfully committed updates for project {project_id}")
-            
-            # Export updated projects to CSV after update
-            try:
-                print(f"Exporting projects for region {region} to CSV...")
-                export_region_projects(region)
-                print("CSV export completed successfully")
-            except Exception as e:
-                print(f"Warning: Failed to export to CSV: {str(e)}")
+            wake_notification_workers()
+            wake_export_worker()
+            logger.info("Updated project", extra={'project_id': project_id, 'region': region})
             
             return jsonify({
                 "message": "Project updated successfully",
@@ -405,12 +322,12 @@ def update_project(current_user, region, project_id):
             })
         except Exception as e:
             db.session.rollback()
-            print(f"Error committing updates: {str(e)}")
+            logger.exception("Error committing updates")
             return jsonify({"error": f"Error saving updates: {str(e)}"}), 500
             
     except Exception as e:
         db.session.rollback()
-        print(f"Unexpected error updating project: {str(e)}")
+        logger.exception("Unexpected error updating project")
         return jsonify({"error": str(e)}), 500
 
 @projects_bp.route('/<region>/<project_id>', methods=['DELETE'])
@@ -425,7 +342,9 @@ def delete_project(current_user, region, project_id):
         region = project.region
         customer_id = project.customer_id
         
-        # Delete the project
+        # Delete the project and its analytics counts
+        apply_rollup_delta(rollup_keys(project), -1)
+        record_export_change(region, project.id)
         db.session.delete(project)
         
         # Check if customer has any other projects
@@ -437,151 +356,61 @@ def delete_project(current_user, region, project_id):
                 db.session.delete(customer)
         
         db.session.commit()
-
-        # Export updated projects to CSV after deletion
-        try:
-            print(f"Exporting projects for region {region} to CSV...")
-            export_region_projects(region)
-            print("CSV export completed successfully")
-        except Exception as e:
-            print(f"Warning: Failed to export to CSV: {str(e)}")
+        wake_export_worker()
         
         return jsonify({"message": "Project deleted successfully"})
     except Exception as e:
         db.session.rollback()
-        print(f"Error deleting project: {str(e)}")
+        logger.exception("Error deleting project")
         return jsonify({"error": str(e)}), 500
 
 @projects_bp.route('/export', methods=['GET'])
 def export_projects():
+    """Stream all projects as CSV.
+
+    Optional query parameters:
+      region      -- only projects in this region
+      start, end  -- YYYY-MM-DD bounds of the half-open window [start, end)
+    """
     try:
-        # Get all projects with their customer information
-        projects = Project.query.all()
-        
-        # Create a StringIO object to write CSV data
-        si = io.StringIO()
-        writer = csv.writer(si)
-        
-        # Write header
-        writer.writerow([
-            'Project ID',
-            'Customer Name',
-            'Customer Email',
-            'Date',
-            'Region',
-            'Description',
-            'Work Type',
-            'Status',
-            'Created At',
-            'Updated At'
-        ])
-        
-        # Write data
-        for project in projects:
-            writer.writerow([
-                project.id,
-                project.customer.name if project.customer else 'N/A',
-                project.customer.email if project.customer else 'N/A',
-                project.date.strftime('%Y-%m-%d'),
-                project.region,
-                project.description,
-                project.work_type,
-                project.status,
-                project.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                project.updated_at.strftime('%Y-%m-%d %H:%M:%S')
-            ])
-        
-        # Create the response
-        output = si.getvalue()
-        si.close()
-        
-        return send_file(
-            io.BytesIO(output.encode('utf-8')),
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=f'projects_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-        )
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        filters = {
+            'region': request.args.get('region') or None,
+            'start': parse_date_arg('start'),
+            'end': parse_date_arg('end')
+        }
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    filename = f'projects_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+    return Response(
+        stream_with_context(stream_projects_csv(**filters)),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
 
 @projects_bp.route('/<region>/latest', methods=['GET'])
 def get_latest_project(region):
     try:
-        print(f"Getting latest project for region: {region}")
-        # Get the most recent project for the region
-        project = Project.query.filter_by(region=region).order_by(Project.created_at.desc()).first()
+        project_dict = latest_project(region)
         
-        if not project:
+        if not project_dict:
             return jsonify({"error": "No projects found"}), 404
             
-        print(f"Found latest project {project.id}")
-        
-        project_dict = {
-            'id': project.id,
-            'date': project.date.strftime('%Y-%m-%d'),
-            'po': project.po,
-            'customer_name': project.customer.name if project.customer else "Unknown",
-            'customer_phone': project.customer.phone if project.customer else "",
-            'customer_email': project.customer.email if project.customer else "",
-            'address': project.address,
-            'city': project.city,
-            'subdivision': project.subdivision,
-            'lot_number': project.lot_number,
-            'square_footage': project.square_footage,
-            'job_cost_type': project.job_cost_type.split(',') if project.job_cost_type else [],
-            'work_type': project.work_type.split(',') if project.work_type else [],
-            'notes': project.notes,
-            'region': project.region
-        }
-        
-        print(f"Returning latest project data")
         return jsonify(project_dict)
     except Exception as e:
-        print(f"Error getting latest project: {str(e)}")
+        logger.exception("Error getting latest project")
         return jsonify({"error": str(e)}), 500
 
 @projects_bp.route('/<region>/date/<date>', methods=['GET'])
 def get_projects_by_date(region, date):
     try:
-        print(f"Getting projects for region {region} on date {date}")
         # Parse the date string to a datetime object
         target_date = datetime.strptime(date, '%Y-%m-%d').date()
         
-        # Query projects for the specific date and region
-        projects = Project.query.filter_by(
-            region=region,
-            date=target_date
-        ).all()
-        
-        print(f"Found {len(projects)} projects")
-        project_list = []
-        
-        for project in projects:
-            print(f"Processing project {project.id}")
-            project_dict = {
-                'id': project.id,
-                'date': project.date.strftime('%Y-%m-%d'),
-                'po': project.po,
-                'customer_name': project.customer.name if project.customer else "Unknown",
-                'customer_phone': project.customer.phone if project.customer else "",
-                'customer_email': project.customer.email if project.customer else "",
-                'address': project.address,
-                'city': project.city,
-                'subdivision': project.subdivision,
-                'lot_number': project.lot_number,
-                'square_footage': project.square_footage,
-                'job_cost_type': project.job_cost_type.split(',') if project.job_cost_type else [],
-                'work_type': project.work_type.split(',') if project.work_type else [],
-                'notes': project.notes,
-                'region': project.region
-            }
-            project_list.append(project_dict)
-        
-        print(f"Returning {len(project_list)} projects")
+        project_list = list_projects(region=region, date=target_date)
         return jsonify(project_list)
     except Exception as e:
-        print(f"Error getting projects by date: {str(e)}")
+        logger.exception("Error getting projects by date")
         return jsonify({"error": str(e)}), 500
 
 if __name__ == '__main__':
@@ -3,8 +3,11 @@ from flask_login import current_user
 from models.user import User, Role, ROLES, PERMISSIONS
 from models import db
 from routes.auth import token_required
+from services.user_cache import invalidate_user
+import logging
 
 user_management = Blueprint('user_management', __name__)
+logger = logging.getLogger(__name__)
 
 def admin_required(f):
     @token_required
@@ -28,12 +31,11 @@ def get_users(current_user):
     if not current_user.is_admin():
         return jsonify({'error': 'Admin privileges required'}), 403
         
-    print("GET /users endpoint called")
-    print(f"Current user: {current_user}")
+    logger.debug("GET /users called by %s", current_user)
     
     try:
         users = User.query.all()
-        print(f"Found {len(users)} users")
+        logger.debug("Found %d users", len(users))
         user_list = [{
             'id': user.id,
             'username': user.username,
@@ -46,19 +48,16 @@ def get_users(current_user):
             # Return an empty list instead of an error when there are no other users
             return jsonify([])
             
-        print(f"Returning user list: {user_list}")
+        logger.debug("Returning user list: %s", user_list)
         return jsonify(user_list)
     except Exception as e:
-        print(f"Error in get_users: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in get_users")
         return jsonify({'error': str(e)}), 500
 
 @user_management.route('/user/<int:user_id>/role', methods=['PUT'], endpoint='update_role')
 @admin_required
 def update_user_role(current_user, user_id):
-    print(f"PUT /user/{user_id}/role endpoint called")
-    print(f"Current user: {current_user}")
+    logger.debug("PUT /user/%s/role called by %s", user_id, current_user)
     
     data = request.get_json()
     if not data or 'role' not in data:
@@ -75,16 +74,16 @@ def update_user_role(current_user, user_id):
             
         user.role = role
         db.session.commit()
+        invalidate_user(user_id)
         return jsonify({'message': 'User role updated successfully'})
     except Exception as e:
-        print(f"Error in update_user_role: {str(e)}")
+        logger.exception("Error in update_user_role")
         return jsonify({'error': str(e)}), 500
 
 @user_management.route('/user/<int:user_id>/status', methods=['PUT'], endpoint='update_status')
 @admin_required
 def update_user_status(current_user, user_id):
-    print(f"PUT /user/{user_id}/status endpoint called")
-    print(f"Current user: {current_user}")
+    logger.debug("PUT /user/%s/status called by %s", user_id, current_user)
     
     data = request.get_json()
     if not data or 'is_active' not in data:
@@ -97,38 +96,36 @@ def update_user_status(current_user, user_id):
             
         user.is_active = data['is_active']
         db.session.commit()
+        invalidate_user(user_id)
         return jsonify({'message': 'User status updated successfully'})
     except Exception as e:
-        print(f"Error in update_user_status: {str(e)}")
+        logger.exception("Error in update_user_status")
         return jsonify({'error': str(e)}), 500
 
 @user_management.route('/roles', methods=['GET'], endpoint='list_roles')
 @admin_required
 def get_roles(current_user):
-    print("GET /roles endpoint called")
-    print(f"Current user: {current_user}")
-    print(f"Is authenticated: {current_user.is_authenticated}")
+    logger.debug("GET /roles called by %s", current_user)
     
     try:
         roles = Role.query.all()
-        print(f"Found {len(roles)} roles")
+        logger.debug("Found %d roles", len(roles))
         role_list = [{
             'name': role.name,
             'description': role.description,
             'permissions': role.permissions,
             'display_name': ROLES[role.name]['display_name'] if role.name in ROLES else role.name.title()
         } for role in roles]
-        print(f"Returning role list: {role_list}")
+        logger.debug("Returning role list: %s", role_list)
         return jsonify(role_list)
     except Exception as e:
-        print(f"Error in get_roles: {str(e)}")
+        logger.exception("Error in get_roles")
         return jsonify({'error': str(e)}), 500
 
 @user_management.route('/user/<int:user_id>', methods=['DELETE'], endpoint='delete_user')
 @admin_required
 def delete_user(current_user, user_id):
-    print(f"DELETE /user/{user_id} endpoint called")
-    print(f"Current user: {current_user}")
+    logger.debug("DELETE /user/%s called by %s", user_id, current_user)
     
     try:
         user = User.query.get(user_id)
@@ -141,7 +138,8 @@ def delete_user(current_user, user_id):
             
         db.session.delete(user)
         db.session.commit()
+        invalidate_user(user_id)
         return jsonify({'message': 'User deleted successfully'})
     except Exception as e:
-        print(f"Error in delete_user: {str(e)}")
+        logger.exception("Error in delete_user")
         return jsonify({'error': str(e)}), 500 
\ No newline at end of file
@@ -0,0 +1,76 @@
+from collections import Counter
+from sqlalchemy import func, select
+from models import db, upsert
+from models.project import Project
+from models.project_type import project_type_link
+from models.project_rollup import ProjectTypeDailyCount
+
+
+def rollup_keys(project):
+    """Return the (region, day, type_id) counters a project contributes to."""
+    db.session.flush()  # newly created types need their ids
+    return [(project.region, project.date, t.id) for t in project.types]
+
+
+def apply_rollup_delta(keys, delta):
+    """Add `delta` to each counter in `keys` within the current transaction."""
+    rows = [
+        {'region': region, 'day': day, 'type_id': type_id, 'count': delta * times}
+        for (region, day, type_id), times in Counter(keys).items()
+    ]
+    if not rows:
+        return
+    # One upsert, so concurrent writers creating the same counter add up
+    # instead of both inserting it
+    stmt = upsert(ProjectTypeDailyCount.__table__).values(rows)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['region', 'day', 'type_id'],
+        set_={'count': ProjectTypeDailyCount.__table__.c.count + stmt.excluded.count}
+    ))
+
+
+def update_rollup(old_keys, new_keys):
+    """Move a project's contribution from `old_keys` to `new_keys`."""
+    removed = Counter(old_keys) - Counter(new_keys)
+    added = Counter(new_keys) - Counter(old_keys)
+    apply_rollup_delta(list(removed.elements()), -1)
+    apply_rollup_delta(list(added.elements()), 1)
+
+
+def raw_counts_query():
+    """Count projects per (region, day, type_id) straight from the project tables."""
+    return select(
+        Project.region,
+        Project.date,
+        project_type_link.c.type_id,
+        func.count()
+    ).select_from(Project.__table__.join(
+        project_type_link, project_type_link.c.project_id == Project.id
+    )).group_by(Project.region, Project.date, project_type_link.c.type_id)
+
+
+def rebuild_rollups(conn=None):
+    """Replace the rollup table with counts recomputed from raw projects."""
+    conn = conn or db.session
+    table = ProjectTypeDailyCount.__table__
+    conn.execute(table.delete())
+    conn.execute(table.insert().from_select(
+        ['region', 'day', 'type_id', 'count'], raw_counts_query()
+    ))
+
+
+def rollup_mismatches():
+    """Compare the rollup table with raw counts and return the differing keys.
+
+    Each mismatch is (region, day, type_id, rollup_count, raw_count).
+    """
+    raw = {(r, d, t): c for r, d, t, c in db.session.execute(raw_counts_query())}
+    rolled = {
+        (row.region, row.day, row.type_id): row.count
+        for row in ProjectTypeDailyCount.query.filter(ProjectTypeDailyCount.count != 0)
+    }
+    return [
+        (*key, rolled.get(key, 0), raw.get(key, 0))
+        for key in sorted(set(raw) | set(rolled))
+        if rolled.get(key, 0) != raw.get(key, 0)
+    ]
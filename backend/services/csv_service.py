@@ -1,56 +1,176 @@
 import csv
+import logging
+from itertools import islice
+from sqlalchemy import bindparam, func, select
 from models import db
 from models.customer import Customer
+from services.region_export import record_full_export_rebuild
+from services.customer_search import invalidate_customer_index
+from services.customer_sync import record_customer_changes
+
+logger = logging.getLogger(__name__)
+
+# Rows read, resolved and written per batch
+CHUNK_SIZE = 5000
+
+# Columns an import may overwrite on an existing customer
+UPDATE_COLUMNS = ('name', 'first_name', 'last_name', 'email')
+
+
+def csv_field(row, *headers):
+    """Return the stripped value of the first header present in the row, or None."""
+    for header in headers:
+        value = row.get(header)
+        if value is not None:
+            return value.strip()
+    return None
+
+
+def customer_fields(row):
+    """Map a CSV row to customer columns, or None if it has no phone number.
+
+    Accepts both the QuickBooks export headers (Customer, First_Name,
+    Last_Name, Phone, Main_Email) and plain name/phone/email headers.
+    """
+    phone = csv_field(row, 'Phone', 'phone')
+    if not phone:
+        return None
+    first_name = csv_field(row, 'First_Name', 'first_name')
+    last_name = csv_field(row, 'Last_Name', 'last_name')
+    name = csv_field(row, 'Customer', 'name')
+    if not name:
+        name = f"{first_name or ''} {last_name or ''}".strip()
+    return {
+        'name': name,
+        'first_name': first_name,
+        'last_name': last_name,
+        'phone': phone,
+        'email': csv_field(row, 'Main_Email', 'email')
+    }
+
+
+def existing_customer_ids():
+    """Map each phone number to the id of its oldest customer record."""
+    rows = db.session.execute(
+        select(Customer.phone, func.min(Customer.id)).group_by(Customer.phone)
+    )
+    return dict(rows.all())
+
+
+def print_progress(processed):
+    logger.info("Processed %d customer rows", processed)
+
+
+def import_customers(file, update_existing=True, chunk_size=CHUNK_SIZE, progress=print_progress):
+    """Stream customers from an open CSV file into the database.
+
+    Existing phone numbers are loaded once up front, then the file is read in
+    chunks that are written with one batched INSERT and one batched UPDATE
+    each, so the number of queries grows with chunks rather than rows.
+    Customers are matched by phone; when `update_existing` is False, rows for
+    known phones are skipped instead of overwriting the customer. Rows that
+    would not change a known customer are skipped too, so re-importing the
+    same file writes nothing. `progress` is called with the running row count
+    after each chunk.
+    """
+    table = Customer.__table__
+    update_stmt = table.update().where(table.c.id == bindparam('customer_id')).values(
+        **{column: bindparam(f'new_{column}') for column in UPDATE_COLUMNS}
+    )
 
-def import_customers_from_csv(csv_path):
-    """Import customers from a CSV file."""
     try:
-        imported_count = 0
-        updated_count = 0
-        
-        with open(csv_path, 'r', encoding='utf-8') as file:
-            csv_data = csv.DictReader(file)
-            print(f"CSV Headers: {csv_data.fieldnames}")
-            
-            for row in csv_data:
-                if imported_count == 0:
-                    print(f"First row data: {row}")
-                
-                phone = row.get('Phone', '').strip()
-                if not phone:
+        reader = csv.DictReader(file)
+        logger.debug("CSV headers: %s", reader.fieldnames)
+        phone_ids = existing_customer_ids()
+        processed = imported_count = skipped_count = 0
+        updated_ids = set()
+
+        while True:
+            chunk = list(islice(reader, chunk_size))
+            if not chunk:
+                break
+            processed += len(chunk)
+
+            inserts, updates = {}, {}
+            for row in chunk:
+                fields = customer_fields(row)
+                if not fields:
+                    skipped_count += 1
                     continue
-                    
-                existing_customer = Customer.query.filter_by(phone=phone).first()
-                
-                if existing_customer:
-                    existing_customer.name = row.get('Customer', '')
-                    existing_customer.first_name = row.get('First_Name', '')
-                    existing_customer.last_name = row.get('Last_Name', '')
-                    existing_customer.email = row.get('Main_Email', '')
-                    updated_count += 1
+                customer_id = phone_ids.get(fields['phone'])
+                if customer_id is None:
+                    # A phone repeated within the chunk keeps its last row
+                    if fields['phone'] not in inserts:
+                        imported_count += 1
+                    inserts[fields['phone']] = fields
+                elif update_existing:
+                    # Like inserts, a phone repeated within the chunk keeps its last row
+                    updates[customer_id] = fields
                 else:
-                    customer = Customer(
-                        name=row.get('Customer', ''),
-                        first_name=row.get('First_Name', ''),
-                        last_name=row.get('Last_Name', ''),
-                        phone=phone,
-                        email=row.get('Main_Email', '')
-                    )
-                    db.session.add(customer)
-                    imported_count += 1
-        
+                    skipped_count += 1
+
+            if inserts:
+                last_id = db.session.execute(select(func.max(Customer.id))).scalar() or 0
+                db.session.execute(table.insert(), list(inserts.values()))
+                # Later chunks match these phones as existing customers
+                new_rows = db.session.execute(
+                    select(Customer.phone, Customer.id).where(Customer.id > last_id)
+                ).all()
+                phone_ids.update(new_rows)
+                record_customer_changes(db.session.connection(), [customer_id for _, customer_id in new_rows])
+            if updates:
+                current = db.session.execute(
+                    select(table.c.id, *(table.c[column] for column in UPDATE_COLUMNS))
+                    .where(table.c.id.in_(list(updates)))
+                )
+                unchanged = {row.id for row in current
+                             if all(row[column] == updates[row.id][column] for column in UPDATE_COLUMNS)}
+                skipped_count += len(unchanged)
+                updates = {customer_id: fields for customer_id, fields in updates.items()
+                           if customer_id not in unchanged}
+            if updates:
+                updated_ids.update(updates)
+                db.session.execute(update_stmt, [
+                    {'customer_id': customer_id, **{f'new_{c}': fields[c] for c in UPDATE_COLUMNS}}
+                    for customer_id, fields in updates.items()
+                ])
+                record_customer_changes(db.session.connection(), updates)
+            if progress:
+                progress(processed)
+
+        updated_count = len(updated_ids)
+        if updated_count:
+            # Renamed customers show up on export rows across every region
+            record_full_export_rebuild()
         db.session.commit()
+        if imported_count or updated_count:
+            # Bulk statements bypass the ORM hooks that keep the search index current
+            invalidate_customer_index()
         return {
             'imported': imported_count,
             'updated': updated_count,
+            'skipped': skipped_count,
             'success': True,
             'message': f'Successfully imported {imported_count} new customers and updated {updated_count} existing customers'
         }
-        
+
     except Exception as e:
         db.session.rollback()
-        print(f"Error importing customers: {str(e)}")
+        logger.exception("Error importing customers")
+        return {
+            'success': False,
+            'error': str(e)
+        }
+
+
+def import_customers_from_csv(csv_path, update_existing=True):
+    """Import customers from a CSV file on disk."""
+    try:
+        with open(csv_path, 'r', encoding='utf-8-sig', newline='') as file:
+            return import_customers(file, update_existing=update_existing)
+    except OSError as e:
+        logger.error("Error importing customers: %s", e)
         return {
             'success': False,
             'error': str(e)
-        } 
\ No newline at end of file
+        }
@@ -0,0 +1,90 @@
+import logging
+import threading
+import time
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from models import db
+from models.customer import Customer
+from shared.search_index import SearchIndex
+
+logger = logging.getLogger(__name__)
+
+# Rebuild from the database at least this often, to pick up writes made by
+# other processes or by bulk statements that bypass the ORM
+MAX_INDEX_AGE = 300
+
+customer_index = SearchIndex()
+_state = {'loaded_at': None}
+_load_lock = threading.Lock()
+
+
+def customer_record(customer_id, name, phone, email):
+    return {'id': customer_id, 'name': name, 'phone': phone, 'email': email}
+
+
+def index_customer(customer_id, name, phone, email):
+    customer_index.add(
+        customer_id, customer_record(customer_id, name, phone, email),
+        name=name, phone=phone, email=email
+    )
+
+
+def load_customer_index():
+    """Rebuild the search index from every customer in the database."""
+    rows = db.session.execute(select(Customer.id, Customer.name, Customer.phone, Customer.email)).all()
+    customer_index.clear()
+    for row in rows:
+        index_customer(*row)
+    _state['loaded_at'] = time.monotonic()
+    logger.info("Indexed %d customers for search", len(rows))
+
+
+def invalidate_customer_index():
+    """Force a rebuild on the next search, e.g. after a bulk import."""
+    _state['loaded_at'] = None
+
+
+def search_customers(term, limit=10):
+    """Fuzzy-search customers by name, email or phone digits."""
+    with _load_lock:
+        loaded_at = _state['loaded_at']
+        if loaded_at is None or time.monotonic() - loaded_at > MAX_INDEX_AGE:
+            load_customer_index()
+    return customer_index.search(term, limit)
+
+
+# Keep the index in step with ORM writes: changes are collected per session
+# and applied only once the transaction commits.
+
+def _pending_changes(session):
+    return session.info.setdefault('customer_index_changes', {})
+
+
+@event.listens_for(Customer, 'after_insert')
+@event.listens_for(Customer, 'after_update')
+def _customer_saved(mapper, connection, target):
+    _pending_changes(Session.object_session(target))[target.id] = (
+        target.id, target.name, target.phone, target.email
+    )
+
+
+@event.listens_for(Customer, 'after_delete')
+def _customer_deleted(mapper, connection, target):
+    _pending_changes(Session.object_session(target))[target.id] = None
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_customer_changes(session):
+    changes = session.info.pop('customer_index_changes', None)
+    if not changes or _state['loaded_at'] is None:
+        return
+    for customer_id, fields in changes.items():
+        if fields is None:
+            customer_index.remove(customer_id)
+        else:
+            index_customer(*fields)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_customer_changes(session):
+    session.info.pop('customer_index_changes', None)
@@ -0,0 +1,89 @@
+from sqlalchemy import event, func, select, text
+from sqlalchemy.orm import Session
+from models import db
+from models.customer import Customer
+from models.customer_change import CustomerChange
+
+# Customer columns sent to sync clients, after the id
+SYNC_COLUMNS = ('name', 'phone', 'email')
+
+
+def record_customer_changes(conn, customer_ids, deleted=False):
+    """Give each customer a new, higher change id, in the caller's transaction.
+
+    On PostgreSQL the changelog is locked against other writers until the
+    transaction ends, so change ids commit in the order they are drawn.
+    SQLite already allows one writer at a time.
+    """
+    customer_ids = list(customer_ids)
+    if not customer_ids:
+        return
+    table = CustomerChange.__table__
+    if conn.dialect.name == 'postgresql':
+        # Sequence values are handed out at insert but become visible at
+        # commit; without this, a client could read id N+1 before N commits
+        # and never see N. Readers are not blocked by this lock mode.
+        conn.execute(text(f'LOCK TABLE {table.name} IN EXCLUSIVE MODE'))
+    conn.execute(table.delete().where(table.c.customer_id.in_(customer_ids)))
+    conn.execute(table.insert(), [
+        {'customer_id': customer_id, 'deleted': deleted} for customer_id in customer_ids
+    ])
+
+
+def customer_version():
+    """The id of the most recent customer change, or 0."""
+    return db.session.execute(select(func.max(CustomerChange.id))).scalar() or 0
+
+
+def customer_changes_since(version):
+    """Customers changed after `version`, for clients keeping their own copy.
+
+    Returns {'version', 'customers', 'deleted'}: `customers` holds
+    [id, name, phone, email] lists for customers added or edited since, and
+    `deleted` the ids of customers removed since. Clients pass the returned
+    version back on their next call.
+
+    A client never misses a change only because change ids become visible in
+    the order they were drawn. SQLite guarantees that by allowing one writer
+    at a time; on PostgreSQL `record_customer_changes` locks the changelog
+    for the rest of the writing transaction. Other databases get no such
+    guarantee, and anything writing customer_change without going through
+    `record_customer_changes` must take the same lock.
+    """
+    rows = db.session.execute(
+        select(CustomerChange.id, CustomerChange.customer_id, CustomerChange.deleted,
+               *(getattr(Customer, column) for column in SYNC_COLUMNS))
+        .outerjoin(Customer, Customer.id == CustomerChange.customer_id)
+        .where(CustomerChange.id > version)
+        .order_by(CustomerChange.id)
+    ).all()
+    customers, deleted = [], []
+    for change_id, customer_id, is_deleted, *fields in rows:
+        if is_deleted:
+            deleted.append(customer_id)
+        else:
+            customers.append([customer_id, *fields])
+    return {
+        'version': rows[-1][0] if rows else version,
+        'customers': customers,
+        'deleted': deleted
+    }
+
+
+# ORM writes are numbered as they are flushed, in the same transaction
+
+@event.listens_for(Customer, 'after_insert')
+def _customer_inserted(mapper, connection, target):
+    record_customer_changes(connection, [target.id])
+
+
+@event.listens_for(Customer, 'after_update')
+def _customer_updated(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is None or session.is_modified(target, include_collections=False):
+        record_customer_changes(connection, [target.id])
+
+
+@event.listens_for(Customer, 'after_delete')
+def _customer_deleted(mapper, connection, target):
+    record_customer_changes(connection, [target.id], deleted=True)
@@ -0,0 +1,41 @@
+import os
+from jinja2 import Environment, FileSystemLoader
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates', 'email')
+
+# Every message is compiled up front; templates are never re-read from disk
+_environment = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=True,
+    trim_blocks=True,
+    lstrip_blocks=True,
+    auto_reload=False,
+    cache_size=-1
+)
+TEMPLATES = {
+    name: _environment.get_template(f'{name}.html')
+    for name in ('confirmation', 'update', 'reminder')
+}
+
+
+def format_type(type_str):
+    """Turn a stored type name like 'slab_on' into 'Slab On'."""
+    return type_str.replace('_', ' ').title()
+
+
+def display_types(types, formatted=True):
+    """Comma-separated type names for an email, or 'Not specified'."""
+    if isinstance(types, list):
+        return ", ".join(format_type(t) if formatted else t for t in types)
+    if types and not formatted:
+        return str(types)
+    return "Not specified"
+
+
+def render_email(name, job_cost_type=None, work_type=None, format_types=True, **context):
+    """Render the HTML body of the customer email `name` for one project."""
+    return TEMPLATES[name].render(
+        job_cost_types=display_types(job_cost_type, format_types),
+        work_types=display_types(work_type, format_types),
+        **context
+    )
@@ -0,0 +1,93 @@
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no other processes to coordinate with in development
+    fcntl = None
+
+
+@contextmanager
+def exclusive_lock(path):
+    """Hold an exclusive lock on `path`, waiting for other processes to release it."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a') as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class LeaderLock:
+    """Elects one process on this host to run the app's background jobs.
+
+    Every web worker imports the app, but only the one holding an exclusive
+    lock on `path` runs the scheduler and other single-instance jobs. The
+    operating system drops the lock when its holder exits, however it exits,
+    and the other processes retry every `retry_interval` seconds, so another
+    worker takes over after a crash or restart.
+
+    The lock must be taken after the server forks its workers (gunicorn's
+    default; do not use --preload), since forked children share the lock.
+    """
+
+    def __init__(self, path, retry_interval=30.0):
+        self.path = path
+        self.retry_interval = retry_interval
+        self._file = None
+        self._stopping = threading.Event()
+        self._thread = None
+
+    @property
+    def is_leader(self):
+        return self._file is not None
+
+    def try_acquire(self):
+        """Take the lock if it is free. Returns whether this process holds it."""
+        if self._file:
+            return True
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        f = open(self.path, 'a+')
+        if fcntl:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                f.close()
+                return False
+        f.seek(0)
+        f.truncate()
+        f.write(f'{os.getpid()}\n')
+        f.flush()
+        self._file = f
+        return True
+
+    def run_when_elected(self, on_elected):
+        """Call `on_elected()` once this process holds the lock.
+
+        Returns immediately; if the lock is taken, a background thread keeps
+        trying until it gets it or `release` is called.
+        """
+        if self.try_acquire():
+            on_elected()
+            return
+
+        def wait_for_lock():
+            while not self._stopping.wait(self.retry_interval):
+                if self.try_acquire():
+                    on_elected()
+                    return
+
+        self._thread = threading.Thread(target=wait_for_lock, name='leader-lock', daemon=True)
+        self._thread.start()
+
+    def release(self):
+        self._stopping.set()
+        if self._file:
+            if fcntl:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
@@ -0,0 +1,221 @@
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from models import db
+from models.outbox import OutboxMessage
+from shared.metrics import JOB_DURATION, timed
+
+logger = logging.getLogger(__name__)
+
+# Notification kinds understood by the default handlers
+PROJECT_CONFIRMATION_EMAIL = 'project_confirmation_email'
+PROJECT_UPDATE_EMAIL = 'project_update_email'
+PROJECT_SMS = 'project_sms'
+PROJECT_REMINDER_EMAIL = 'project_reminder_email'
+
+# Dedupe keys looked up per query when queueing a batch
+DEDUPE_LOOKUP_SIZE = 500
+
+
+def enqueue_notification(kind, **payload):
+    """Add a notification to the outbox as part of the current DB transaction.
+
+    Nothing is sent until the caller commits; call `wake_notification_workers`
+    afterwards so the message is picked up without waiting for the next poll.
+    """
+    message = OutboxMessage(kind=kind, payload=json.dumps(payload))
+    db.session.add(message)
+    return message
+
+
+def enqueue_notifications_once(kind, payloads):
+    """Queue one message per dedupe key, skipping keys that were queued before.
+
+    `payloads` maps each dedupe key to its payload. Like `enqueue_notification`
+    this joins the current transaction; returns the number of messages queued.
+    """
+    keys = list(payloads)
+    queued = set()
+    for i in range(0, len(keys), DEDUPE_LOOKUP_SIZE):
+        queued.update(key for (key,) in db.session.query(OutboxMessage.dedupe_key).filter(
+            OutboxMessage.dedupe_key.in_(keys[i:i + DEDUPE_LOOKUP_SIZE])
+        ))
+    now = datetime.utcnow()
+    rows = [{
+        'kind': kind,
+        'dedupe_key': key,
+        'payload': json.dumps(payload),
+        'status': OutboxMessage.PENDING,
+        'attempts': 0,
+        'next_attempt_at': now,
+        'created_at': now
+    } for key, payload in payloads.items() if key not in queued]
+    if rows:
+        db.session.execute(OutboxMessage.__table__.insert(), rows)
+    return len(rows)
+
+
+def wake_notification_workers():
+    """Nudge the app's notification workers, if any are running."""
+    queue = current_app.extensions.get('notification_queue')
+    if queue:
+        queue.wake()
+
+
+def default_handlers():
+    """Map each notification kind to the service call that delivers it."""
+    services = {}
+
+    def email_service():
+        if 'email' not in services:
+            from services.email_service import EmailService
+            services['email'] = EmailService()
+        return services['email']
+
+    def sms_service():
+        if 'sms' not in services:
+            from services.sms_service import SMSService
+            services['sms'] = SMSService()
+        return services['sms']
+
+    return {
+        PROJECT_CONFIRMATION_EMAIL: lambda payload: email_service().send_project_confirmation(**payload),
+        PROJECT_UPDATE_EMAIL: lambda payload: email_service().send_project_update(**payload),
+        PROJECT_SMS: lambda payload: sms_service().schedule_project_notification(**payload),
+        PROJECT_REMINDER_EMAIL: lambda payload: email_service().send_project_reminder(**payload),
+    }
+
+
+class NotificationQueue:
+    """Worker pool that drains the notification outbox with retries and backoff.
+
+    Handlers take the decoded payload and return a truthy value on success;
+    a falsy return or an exception schedules a retry with exponential backoff
+    until `max_attempts` is reached, after which the message is marked failed.
+    """
+
+    def __init__(self, app, handlers=None, workers=2, poll_interval=5.0,
+                 max_attempts=5, base_delay=30, max_delay=3600, lease=300):
+        self.app = app
+        self.handlers = handlers if handlers is not None else default_handlers()
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lease = lease
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        app.extensions['notification_queue'] = self
+
+    def start(self):
+        """Start the worker threads."""
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._run, name=f'notification-worker-{i}', daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        logger.info("Notification queue started with %d workers", self.workers)
+
+    def wake(self):
+        """Wake idle workers to check for new messages."""
+        self._wakeup.set()
+
+    def shutdown(self, timeout=10):
+        """Stop the workers, letting in-flight sends finish."""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        logger.info("Notification queue shut down")
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                with self.app.app_context():
+                    processed = self.process_next()
+            except Exception as e:
+                logger.exception("Notification worker error")
+                processed = False
+            if not processed:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def claim_next(self):
+        """Claim the next due message for this worker, or return None."""
+        while True:
+            now = datetime.utcnow()
+            message = OutboxMessage.query.filter(
+                OutboxMessage.status == OutboxMessage.PENDING,
+                OutboxMessage.next_attempt_at <= now
+            ).order_by(OutboxMessage.next_attempt_at).first()
+            if not message:
+                db.session.rollback()
+                return None
+
+            # Only one worker can move the lease forward from the value it read
+            claimed = OutboxMessage.query.filter_by(
+                id=message.id,
+                status=OutboxMessage.PENDING,
+                next_attempt_at=message.next_attempt_at
+            ).update({
+                'next_attempt_at': now + timedelta(seconds=self.lease),
+                'attempts': OutboxMessage.attempts + 1
+            }, synchronize_session=False)
+            db.session.commit()
+            if claimed:
+                db.session.refresh(message)
+                return message
+            # Another worker got there first; try the next due message
+
+    def process_next(self):
+        """Deliver one due message. Returns False when nothing was due."""
+        message = self.claim_next()
+        if not message:
+            return False
+
+        handler = self.handlers.get(message.kind)
+        try:
+            if not handler:
+                raise ValueError(f"No handler for notification kind '{message.kind}'")
+            with timed(JOB_DURATION, f'notification:{message.kind}'):
+                if not handler(json.loads(message.payload)):
+                    raise RuntimeError('Handler reported failure')
+            message.status = OutboxMessage.SENT
+            message.sent_at = datetime.utcnow()
+            message.last_error = None
+        except Exception as e:
+            message.last_error = f"{type(e).__name__}: {str(e)}"
+            if message.attempts >= self.max_attempts:
+                message.status = OutboxMessage.FAILED
+                logger.error("Giving up on notification %s after %d attempts: %s", message.id, message.attempts, message.last_error)
+            else:
+                delay = min(self.base_delay * 2 ** (message.attempts - 1), self.max_delay)
+                message.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+                logger.warning("Notification %s failed, retrying in %ss: %s", message.id, delay, message.last_error)
+        db.session.commit()
+        return True
+
+    def drain(self, concurrency=1):
+        """Deliver every message that is currently due. Returns the count processed.
+
+        With `concurrency` above 1, that many threads claim and send messages
+        side by side, e.g. to push out a large batch while the provider is slow.
+        """
+        def drain_one():
+            processed = 0
+            with self.app.app_context():
+                while self.process_next():
+                    processed += 1
+            return processed
+
+        if concurrency <= 1:
+            return drain_one()
+        with ThreadPoolExecutor(concurrency, thread_name_prefix='notification-drain') as pool:
+            return sum(pool.map(lambda _: drain_one(), range(concurrency)))
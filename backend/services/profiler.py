@@ -0,0 +1,178 @@
+"""Sampling profiler for individual requests, written as collapsed stacks.
+
+A profiled request has a helper thread read its stack every few
+milliseconds through `sys._current_frames()`, so the request itself runs
+untraced. When it finishes, each distinct stack and how many samples saw it
+are written to `<directory>/<endpoint>/<time>-<pid>.folded`, one
+`frame;frame;frame count` line per stack. That is the input format of
+flamegraph.pl and speedscope, and `merged_profile()` adds up every file for
+an endpoint. The helper thread needs the GIL to take a sample, so samples
+come no faster than the interpreter's switch interval (5 ms) while the
+request is running Python code.
+
+A request is profiled when an admin sends the `X-Profile: 1` header, or at
+random for PROFILE_SAMPLE_RATE of the requests to PROFILE_ENDPOINTS.
+"""
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from flask import g, request
+from flask_login import current_user
+from services.user_cache import load_user, token_identity
+import logging
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+DEFAULT_INTERVAL = 0.005
+# Oldest profiles per endpoint are deleted past this many
+MAX_PROFILES_PER_ENDPOINT = 200
+
+
+def frame_name(frame):
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def collapse(frame):
+    """A frame's stack as 'outermost;...;innermost'."""
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """Counts the stacks a thread is seen in, sampling every `interval` seconds."""
+
+    def __init__(self, thread_id, interval=DEFAULT_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop sampling and return the counts. Does not wait for the helper thread,
+        which would show up in the profile; it takes no samples after this."""
+        with self._lock:
+            self._stopping.set()
+            return Counter(self.samples)
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            with self._lock:
+                if self._stopping.is_set():
+                    break
+                if frame is not None:
+                    self.samples[collapse(frame)] += 1
+
+
+def write_profile(directory, endpoint, samples, keep=MAX_PROFILES_PER_ENDPOINT):
+    """Write one request's samples for `endpoint`, dropping its oldest profiles past `keep`."""
+    endpoint_dir = os.path.join(directory, endpoint)
+    os.makedirs(endpoint_dir, exist_ok=True)
+    path = os.path.join(endpoint_dir, f'{time.time_ns()}-{os.getpid()}.folded')
+    with open(path, 'w') as f:
+        for stack, count in samples.most_common():
+            f.write(f'{stack} {count}\n')
+    for old in sorted(os.listdir(endpoint_dir))[:-keep]:
+        try:
+            os.unlink(os.path.join(endpoint_dir, old))
+        except OSError:
+            pass
+    return path
+
+
+def profiled_endpoints(directory):
+    """Endpoints with profiles, with how many requests and samples each has."""
+    if not os.path.isdir(directory):
+        return []
+    summary = []
+    for endpoint in sorted(os.listdir(directory)):
+        samples = merged_profile(directory, endpoint)
+        summary.append({
+            'endpoint': endpoint,
+            'requests': len(os.listdir(os.path.join(directory, endpoint))),
+            'samples': sum(samples.values())
+        })
+    return summary
+
+
+def merged_profile(directory, endpoint):
+    """Every stack sampled for `endpoint` with its total count, or None if it has no profiles."""
+    if endpoint not in (os.listdir(directory) if os.path.isdir(directory) else ()):
+        return None
+    endpoint_dir = os.path.join(directory, endpoint)
+    merged = Counter()
+    for filename in os.listdir(endpoint_dir):
+        try:
+            with open(os.path.join(endpoint_dir, filename)) as f:
+                for line in f:
+                    stack, _, count = line.rstrip('\n').rpartition(' ')
+                    merged[stack] += int(count)
+        except (OSError, ValueError):
+            continue
+    return merged
+
+
+def _requested_by_admin():
+    """Whether the current request comes from an admin, by login session or API token."""
+    try:
+        if current_user.is_authenticated and current_user.is_admin():
+            return True
+    except Exception:
+        pass
+    try:
+        user = load_user(token_identity())
+        return bool(user and user.is_admin())
+    except Exception:
+        return False
+
+
+def init_profiler(app, directory):
+    """Profile requests as configured by PROFILE_SAMPLE_RATE, PROFILE_ENDPOINTS and PROFILE_INTERVAL.
+
+    PROFILE_ENDPOINTS limits sampled traffic to those endpoints, as a list or
+    a comma-separated string; the header works on any endpoint.
+    """
+    rate = float(app.config.get('PROFILE_SAMPLE_RATE') or 0)
+    endpoints = app.config.get('PROFILE_ENDPOINTS') or ()
+    if isinstance(endpoints, str):
+        endpoints = [name.strip() for name in endpoints.split(',') if name.strip()]
+    endpoints = set(endpoints)
+    interval = float(app.config.get('PROFILE_INTERVAL') or DEFAULT_INTERVAL)
+    app.extensions['profiler'] = directory
+
+    @app.before_request
+    def start_profiling():
+        if request.headers.get(PROFILE_HEADER) == '1':
+            if not _requested_by_admin():
+                return
+        elif not (rate and random.random() < rate and (not endpoints or request.endpoint in endpoints)):
+            return
+        g.profiler = StackSampler(threading.get_ident(), interval).start()
+
+    @app.teardown_request
+    def finish_profiling(exc):
+        sampler = g.pop('profiler', None)
+        if sampler is None:
+            return
+        samples = sampler.stop()
+        if not samples:
+            return
+        try:
+            path = write_profile(directory, request.endpoint or 'unmatched', samples)
+            logger.info("Profiled %s: %d samples", request.endpoint, sum(samples.values()), extra={'path': path})
+        except OSError:
+            logger.exception("Could not write profile for %s", request.endpoint)
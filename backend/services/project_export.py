@@ -0,0 +1,88 @@
+import csv
+from models.project import Project
+from services.project_listing import project_listing_query
+
+# Rows fetched from the database per batch while streaming an export
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_HEADERS = [
+    'Project ID',
+    'Customer Name',
+    'Customer Email',
+    'Customer Phone',
+    'Date',
+    'Region',
+    'PO',
+    'Address',
+    'City',
+    'Subdivision',
+    'Lot Number',
+    'Square Footage',
+    'Job Cost Type',
+    'Work Type',
+    'Notes',
+    'Created At',
+    'Updated At'
+]
+
+
+def format_timestamp(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else ''
+
+
+def export_query(region=None, start=None, end=None):
+    """Listing query plus timestamps, ordered by (date, id) and fetched in batches."""
+    return project_listing_query(region=region, start=start, end=end).add_columns(
+        Project.created_at,
+        Project.updated_at
+    ).order_by(Project.date, Project.id).yield_per(EXPORT_BATCH_SIZE)
+
+
+def export_row(row):
+    """Format an `export_query` row as CSV values matching EXPORT_HEADERS."""
+    has_customer = row.customer_name is not None
+    return [
+        row.id,
+        row.customer_name if has_customer else 'N/A',
+        row.customer_email if has_customer else 'N/A',
+        row.customer_phone if has_customer else 'N/A',
+        row.date.strftime('%Y-%m-%d'),
+        row.region,
+        row.po or 'N/A',
+        row.address,
+        row.city or 'N/A',
+        row.subdivision or 'N/A',
+        row.lot_number or 'N/A',
+        row.square_footage or 'N/A',
+        row.job_cost_type or 'N/A',
+        row.work_type or 'N/A',
+        row.notes or 'N/A',
+        format_timestamp(row.created_at),
+        format_timestamp(row.updated_at)
+    ]
+
+
+class _CSVLine:
+    """File-like target that hands back what csv.writer writes to it."""
+
+    def write(self, value):
+        return value
+
+
+def stream_projects_csv(region=None, start=None, end=None):
+    """Yield a projects CSV in chunks of EXPORT_BATCH_SIZE rows.
+
+    Rows are pulled from the database in batches as the response is sent,
+    so memory use stays flat however many projects are exported.
+    """
+    writer = csv.writer(_CSVLine())
+    yield writer.writerow(EXPORT_HEADERS)
+
+    chunk = []
+    for row in export_query(region=region, start=start, end=end):
+        chunk.append(writer.writerow(export_row(row)))
+        if len(chunk) >= EXPORT_BATCH_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
@@ -0,0 +1,149 @@
+import base64
+from datetime import datetime
+from sqlalchemy import and_, or_, select
+from models import db
+from models.project import Project
+from models.customer import Customer
+from models.project_type import ProjectType, project_type_link, WORK_TYPE, JOB_COST_TYPE
+
+# Columns needed to render a project listing. Selecting these directly (with the
+# customer joined in the same statement) avoids loading full ORM objects and the
+# lazy `project.customer` lookup that used to fire once per row.
+LISTING_COLUMNS = (
+    Project.id,
+    Project.date,
+    Project.po,
+    Project.address,
+    Project.city,
+    Project.subdivision,
+    Project.lot_number,
+    Project.square_footage,
+    Project.job_cost_type,
+    Project.work_type,
+    Project.notes,
+    Project.region,
+    Project.customer_id,
+    Customer.name.label('customer_name'),
+    Customer.phone.label('customer_phone'),
+    Customer.email.label('customer_email'),
+)
+
+# Upper bound on a single page of a paginated listing
+MAX_PAGE_SIZE = 1000
+
+
+def split_types(value):
+    """Turn a stored comma-joined type string into a list."""
+    return value.split(',') if value else []
+
+
+def encode_cursor(row):
+    """Encode the (date, id) position of a listing row as an opaque cursor."""
+    raw = f"{row.date.strftime('%Y-%m-%d')}|{row.id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor from `encode_cursor` back into a (date, id) tuple."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        date_str, project_id = raw.split('|', 1)
+        return datetime.strptime(date_str, '%Y-%m-%d').date(), project_id
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def projects_with_type(category, name):
+    """Select ids of projects tagged with a type, via the type link index."""
+    return select(project_type_link.c.project_id).join(
+        ProjectType, ProjectType.id == project_type_link.c.type_id
+    ).where(ProjectType.category == category, ProjectType.name == name)
+
+
+def project_listing_query(region=None, date=None, start=None, end=None, after=None,
+                          work_type=None, job_cost_type=None):
+    """Build the single-statement listing query.
+
+    `start`/`end` select the half-open date window [start, end), and `after`
+    is a (date, id) position to continue a keyset-paginated listing from.
+    `work_type`/`job_cost_type` keep only projects tagged with that type.
+    """
+    query = db.session.query(*LISTING_COLUMNS).outerjoin(
+        Customer, Project.customer_id == Customer.id
+    )
+    if region is not None:
+        query = query.filter(Project.region == region)
+    if date is not None:
+        query = query.filter(Project.date == date)
+    if start is not None:
+        query = query.filter(Project.date >= start)
+    if end is not None:
+        query = query.filter(Project.date < end)
+    if work_type is not None:
+        query = query.filter(Project.id.in_(projects_with_type(WORK_TYPE, work_type)))
+    if job_cost_type is not None:
+        query = query.filter(Project.id.in_(projects_with_type(JOB_COST_TYPE, job_cost_type)))
+    if after is not None:
+        after_date, after_id = after
+        query = query.filter(or_(
+            Project.date > after_date,
+            and_(Project.date == after_date, Project.id > after_id)
+        ))
+    return query
+
+
+def project_row_to_dict(row):
+    """Format a listing row the way the projects API has always returned it."""
+    return {
+        'id': row.id,
+        'date': row.date.strftime('%Y-%m-%d'),
+        'po': row.po,
+        'customer_name': row.customer_name if row.customer_name is not None else "Unknown",
+        'customer_phone': row.customer_phone or "",
+        'customer_email': row.customer_email or "",
+        'address': row.address,
+        'city': row.city,
+        'subdivision': row.subdivision,
+        'lot_number': row.lot_number,
+        'square_footage': row.square_footage,
+        'job_cost_type': split_types(row.job_cost_type),
+        'work_type': split_types(row.work_type),
+        'notes': row.notes,
+        'region': row.region
+    }
+
+
+def list_projects(region=None, date=None, start=None, end=None, work_type=None, job_cost_type=None):
+    """Return formatted projects ordered by date, in one query.
+
+    For example, all basement jobs in North next week:
+    list_projects(region='North', start=monday, end=monday + timedelta(weeks=1), work_type='basement')
+    """
+    rows = project_listing_query(
+        region=region, date=date, start=start, end=end,
+        work_type=work_type, job_cost_type=job_cost_type
+    ).order_by(Project.date, Project.id).all()
+    return [project_row_to_dict(row) for row in rows]
+
+
+def list_projects_page(region=None, start=None, end=None, cursor=None, limit=MAX_PAGE_SIZE,
+                       work_type=None, job_cost_type=None):
+    """Return one keyset page of formatted projects and the cursor for the next one.
+
+    The next cursor is None once the listing is exhausted.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    after = decode_cursor(cursor) if cursor else None
+    rows = project_listing_query(
+        region=region, start=start, end=end, after=after,
+        work_type=work_type, job_cost_type=job_cost_type
+    ).order_by(Project.date, Project.id).limit(limit + 1).all()
+
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return [project_row_to_dict(row) for row in rows[:limit]], next_cursor
+
+
+def latest_project(region):
+    """Return the most recently created project in a region, or None."""
+    row = project_listing_query(region=region).order_by(Project.created_at.desc()).first()
+    return project_row_to_dict(row) if row else None
@@ -0,0 +1,212 @@
+import csv
+import logging
+import os
+import threading
+from flask import current_app
+from sqlalchemy import select
+from models import db
+from models.project import Project
+from models.export_change import ExportChange
+from shared.metrics import JOB_DURATION, timed
+from services.project_export import EXPORT_HEADERS, export_query, export_row, stream_projects_csv
+
+logger = logging.getLogger(__name__)
+
+# Directory holding one projects_<region>.csv per region
+EXPORT_DIR = 'exports'
+
+# Changelog rows compacted per pass
+MAX_CHANGES_PER_PASS = 5000
+
+ID_COLUMN = EXPORT_HEADERS.index('Project ID')
+DATE_COLUMN = EXPORT_HEADERS.index('Date')
+
+
+def record_export_change(region, project_id):
+    """Log a project's export row as stale, in the current DB transaction."""
+    db.session.add(ExportChange(region=region, project_id=project_id))
+
+
+def record_customer_export_changes(customer_id):
+    """Log every project of a customer as stale, e.g. after the customer is edited."""
+    db.session.execute(ExportChange.__table__.insert().from_select(
+        ['region', 'project_id'],
+        select(Project.region, Project.id).where(Project.customer_id == customer_id)
+    ))
+
+
+def record_full_export_rebuild(region=None):
+    """Mark one region's export file, or all of them, for a full rebuild."""
+    db.session.add(ExportChange(region=region, project_id=None))
+
+
+def wake_export_worker():
+    """Nudge the app's region export worker, if one is running."""
+    worker = current_app.extensions.get('region_export')
+    if worker:
+        worker.wake()
+
+
+def region_export_path(region, export_dir=EXPORT_DIR):
+    return os.path.join(export_dir, f'projects_{region}.csv')
+
+
+def write_atomically(path, write):
+    """Call `write(file)` on a temporary file, then move it over `path`."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def rebuild_region_export(region, export_dir=EXPORT_DIR):
+    """Rewrite a region's export file from the database."""
+    def write(f):
+        for chunk in stream_projects_csv(region=region):
+            f.write(chunk)
+    write_atomically(region_export_path(region, export_dir), write)
+
+
+def has_current_header(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return next(csv.reader(f), None) == EXPORT_HEADERS
+
+
+def compact_region_export(region, project_ids, export_dir=EXPORT_DIR):
+    """Bring the rows for `project_ids` in a region's export file up to date.
+
+    The file is kept sorted by (date, id), like a full export, so the stale
+    rows are dropped and the current ones merged back in a single streaming
+    pass; only the changed projects are read from the database. Files that
+    are missing or in an older format are rebuilt in full.
+    """
+    path = region_export_path(region, export_dir)
+    if not os.path.exists(path) or not has_current_header(path):
+        rebuild_region_export(region, export_dir)
+        return
+
+    project_ids = set(project_ids)
+    fresh = iter([
+        export_row(row)
+        for row in export_query(region=region).filter(Project.id.in_(project_ids))
+    ])
+
+    def sort_key(values):
+        return (values[DATE_COLUMN], values[ID_COLUMN])
+
+    def write(f):
+        writer = csv.writer(f)
+        writer.writerow(EXPORT_HEADERS)
+        pending = next(fresh, None)
+        with open(path, newline='', encoding='utf-8') as old:
+            reader = csv.reader(old)
+            next(reader)
+            for values in reader:
+                if values[ID_COLUMN] in project_ids:
+                    continue
+                while pending and sort_key(pending) < sort_key(values):
+                    writer.writerow(pending)
+                    pending = next(fresh, None)
+                writer.writerow(values)
+        while pending:
+            writer.writerow(pending)
+            pending = next(fresh, None)
+
+    write_atomically(path, write)
+
+
+def export_regions(export_dir=EXPORT_DIR):
+    """Regions with projects, plus regions that already have an export file."""
+    regions = {region for (region,) in db.session.query(Project.region).distinct()}
+    if os.path.isdir(export_dir):
+        regions.update(
+            name[len('projects_'):-len('.csv')] for name in os.listdir(export_dir)
+            if name.startswith('projects_') and name.endswith('.csv')
+        )
+    return regions
+
+
+def process_export_changes(export_dir=EXPORT_DIR, limit=MAX_CHANGES_PER_PASS):
+    """Apply one batch of logged changes to the export files.
+
+    Returns the number of changelog rows consumed; they are only removed
+    once their files have been written, so a failed pass is retried.
+    """
+    changes = db.session.query(ExportChange.id, ExportChange.region, ExportChange.project_id).order_by(
+        ExportChange.id
+    ).limit(limit).all()
+    if not changes:
+        db.session.rollback()
+        return 0
+
+    rebuild_all = any(c.region is None for c in changes)
+    rebuild = export_regions(export_dir) if rebuild_all else {c.region for c in changes if c.project_id is None}
+    by_region = {}
+    for change in changes:
+        if change.region not in rebuild and change.project_id is not None:
+            by_region.setdefault(change.region, set()).add(change.project_id)
+
+    for region in sorted(rebuild):
+        rebuild_region_export(region, export_dir)
+    for region, project_ids in sorted(by_region.items()):
+        compact_region_export(region, project_ids, export_dir)
+
+    ExportChange.query.filter(ExportChange.id.in_([c.id for c in changes])).delete(synchronize_session=False)
+    db.session.commit()
+    logger.info("Applied %d export changes to %d region files", len(changes), len(rebuild) + len(by_region))
+    return len(changes)
+
+
+class RegionExportWorker:
+    """Background thread that keeps the per-region export files current.
+
+    Project writes only log an `ExportChange`; this worker folds the log into
+    the files shortly after each commit (when woken) or every `interval`
+    seconds, so exports never slow down the request that caused them.
+    """
+
+    def __init__(self, app, export_dir=EXPORT_DIR, interval=30.0):
+        self.app = app
+        self.export_dir = export_dir
+        self.interval = interval
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        app.extensions['region_export'] = self
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='region-export', daemon=True)
+        self._thread.start()
+        logger.info("Region export worker started, writing to %s", self.export_dir)
+
+    def wake(self):
+        self._wakeup.set()
+
+    def shutdown(self, timeout=10):
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        logger.info("Region export worker shut down")
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                processed = self.run_once()
+            except Exception as e:
+                logger.exception("Region export error")
+                processed = 0
+            if not processed:
+                self._wakeup.wait(self.interval)
+                self._wakeup.clear()
+
+    def run_once(self):
+        """Apply one batch of pending changes. Returns the number applied."""
+        with self.app.app_context(), timed(JOB_DURATION, 'region_export'):
+            try:
+                return process_export_changes(self.export_dir)
+            except Exception:
+                db.session.rollback()
+                raise
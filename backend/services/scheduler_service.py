@@ -1,17 +1,66 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from datetime import datetime, timedelta
+import logging
 from models import db
-from models.project import Project
-from models.customer import Customer
-from services.email_service import EmailService
-import pytz
+from services.notification_queue import PROJECT_REMINDER_EMAIL, enqueue_notifications_once
+from services.project_listing import project_listing_query, split_types
+from shared.metrics import JOB_DURATION, timed
+
+logger = logging.getLogger(__name__)
+
+# Reminder emails sent side by side while the daily batch is delivered
+REMINDER_CONCURRENCY = 8
+
+
+def reminder_payload(project):
+    """Keyword arguments for `EmailService.send_project_reminder` from a listing row."""
+    return {
+        'customer_email': project.customer_email,
+        'customer_name': project.customer_name,
+        'project_date': project.date.strftime('%Y-%m-%d'),
+        'address': project.address,
+        'customer_phone': project.customer_phone,
+        'po': project.po,
+        'city': project.city,
+        'subdivision': project.subdivision,
+        'lot_number': project.lot_number,
+        'square_footage': project.square_footage,
+        'job_cost_type': split_types(project.job_cost_type),
+        'work_type': split_types(project.work_type),
+        'notes': project.notes,
+        'region': project.region
+    }
+
+
+def queue_project_reminders(day):
+    """Queue a reminder email for every project on `day` whose customer has an email.
+
+    Projects and customers come from one query, and the messages are written
+    to the notification outbox in one transaction, each keyed by project and
+    date: running this again for the same day, e.g. after a crash, only
+    queues reminders that are not already queued or sent. Returns the number
+    queued.
+    """
+    projects = project_listing_query(date=day).all()
+    payloads = {
+        f'reminder:{project.id}:{day.isoformat()}': reminder_payload(project)
+        for project in projects if project.customer_email
+    }
+    skipped = len(projects) - len(payloads)
+    if skipped:
+        logger.info("Skipping %d projects with no customer email", skipped)
+    queued = enqueue_notifications_once(PROJECT_REMINDER_EMAIL, payloads)
+    db.session.commit()
+    logger.info("Queued %d of %d reminders for %s", queued, len(payloads), day)
+    return queued
+
 
 class SchedulerService:
-    def __init__(self, app):
+    def __init__(self, app, concurrency=REMINDER_CONCURRENCY):
         self.app = app
+        self.concurrency = concurrency
         self.scheduler = BackgroundScheduler()
-        self.email_service = EmailService()
         
         # Add job to check for upcoming projects and send reminders
         self.scheduler.add_job(
@@ -24,68 +73,32 @@ class SchedulerService:
         
         # Start the scheduler
         self.scheduler.start()
-        print("\n=== Scheduler Service Initialized ===")
-        print("Production mode: checking for upcoming projects daily at 9:00 AM")
-        print("Next check scheduled for: 9:00 AM tomorrow")
-        print("=======================================\n")
+        logger.info("Scheduler started: checking for upcoming projects daily at 9:00 AM")
 
     def check_upcoming_projects(self):
-        """Check for projects scheduled for tomorrow and send reminder emails."""
+        """Queue reminder emails for tomorrow's projects, then deliver them."""
+        with timed(JOB_DURATION, 'check_upcoming_projects'):
+            self._check_upcoming_projects()
+
+    def _check_upcoming_projects(self):
         with self.app.app_context():
             try:
-                # Get tomorrow's date
                 tomorrow = datetime.now().date() + timedelta(days=1)
-                print(f"\n=== Checking Projects [{datetime.now()}] ===")
-                print(f"Looking for projects scheduled for: {tomorrow}")
-
-                # Query for projects scheduled for tomorrow
-                projects = Project.query.filter_by(date=tomorrow).all()
-                print(f"Found {len(projects)} projects scheduled for tomorrow")
-
-                # Send reminders for each project
-                for project in projects:
-                    try:
-                        # Get customer details
-                        customer = Customer.query.get(project.customer_id)
-                        if not customer or not customer.email:
-                            print(f"No customer or email found for project {project.id}")
-                            continue
-
-                        print(f"Sending reminder for project {project.id}")
-                        print(f"Customer: {customer.name}")
-                        print(f"Email: {customer.email}")
-                        print(f"Project Date: {project.date}")
-                        print(f"Address: {project.address}")
-                        
-                        # Send reminder email
-                        self.email_service.send_project_reminder(
-                            customer_email=customer.email,
-                            customer_name=customer.name,
-                            project_date=project.date.strftime('%Y-%m-%d'),
-                            address=project.address,
-                            customer_phone=customer.phone,
-                            po=project.po,
-                            city=project.city,
-                            subdivision=project.subdivision,
-                            lot_number=project.lot_number,
-                            square_footage=project.square_footage,
-                            job_cost_type=project.job_cost_type.split(',') if project.job_cost_type else [],
-                            work_type=project.work_type.split(',') if project.work_type else [],
-                            notes=project.notes,
-                            region=project.region
-                        )
-                        print(f"✓ Reminder sent successfully for project {project.id}")
-
-                    except Exception as e:
-                        print(f"Error sending reminder for project {project.id}: {str(e)}")
-                        continue
-
-                print("=== Check Complete ===\n")
-
+                logger.info("Checking projects for %s", tomorrow)
+                queue_project_reminders(tomorrow)
             except Exception as e:
-                print(f"Error checking upcoming projects: {str(e)}")
+                db.session.rollback()
+                logger.exception("Error checking upcoming projects")
+                return
+
+        # Send the batch from a bounded pool rather than one at a time; the
+        # outbox retries failures and anything still due is left to the workers
+        queue = self.app.extensions.get('notification_queue')
+        if queue:
+            sent = queue.drain(concurrency=self.concurrency)
+            logger.info("Check complete: %d notifications delivered", sent)
 
     def shutdown(self):
         """Shut down the scheduler."""
         self.scheduler.shutdown()
-        print("Scheduler shut down") 
\ No newline at end of file
+        logger.info("Scheduler shut down") 
\ No newline at end of file
@@ -0,0 +1,209 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter, deque
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+from shared.metrics import OUTBOUND_LATENCY
+
+logger = logging.getLogger(__name__)
+
+SENDGRID_SEND_URL = 'https://api.sendgrid.com/v3/mail/send'
+
+# Sends per second allowed from this process, and how many may go out at once
+# after an idle spell. Overridable with SENDGRID_RATE_LIMIT / SENDGRID_BURST.
+DEFAULT_RATE = 100.0
+DEFAULT_BURST = 100
+
+# Latencies kept for the send-time percentiles
+LATENCY_SAMPLES = 1000
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens a second, holding at most `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, sleeping until one is available. Returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds):
+        """Hold every caller back for `seconds`, e.g. after the API rate-limits us."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0
+
+
+def retry_after_seconds(response, default=1.0):
+    """Seconds to wait before retrying a 429, from Retry-After or SendGrid's reset header."""
+    value = response.headers.get('Retry-After')
+    if value:
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            try:
+                return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+            except (TypeError, ValueError):
+                pass
+    reset = response.headers.get('X-RateLimit-Reset')
+    if reset:
+        try:
+            return max(float(reset) - time.time(), 0.0)
+        except ValueError:
+            pass
+    return default
+
+
+class SendGridTransport:
+    """Posts mail to the SendGrid API over a pooled, keep-alive session.
+
+    Shared by every EmailService in the process (see `get_transport`), so all
+    sends reuse the same TLS connections and draw from one rate limit. A 429
+    pauses every sender for the Retry-After period, but never longer than
+    `max_retry_wait` seconds, and the send is retried up to `max_retries`
+    times if the Retry-After fits in that wait. Otherwise the 429 response is
+    returned and the caller's own retry (the notification outbox) takes over.
+    Keep `max_retry_wait` well under the outbox lease: senders held past it
+    would have their messages claimed and sent again by another worker.
+    """
+
+    def __init__(self, api_key, api_url=SENDGRID_SEND_URL, rate=DEFAULT_RATE, burst=DEFAULT_BURST,
+                 pool_size=10, timeout=(5, 30), max_retries=3, max_retry_wait=60):
+        self.api_key = api_key
+        self.api_url = api_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_retry_wait = max_retry_wait
+        self.bucket = TokenBucket(rate, burst)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        })
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._statuses = Counter()
+        self._errors = 0
+        self._rate_limited = 0
+        self._throttled_seconds = 0.0
+
+    def send(self, data):
+        """Post one mail/send payload. Returns the final response; raises on connection errors."""
+        for attempt in range(self.max_retries + 1):
+            waited = self.bucket.acquire()
+            started = time.perf_counter()
+            try:
+                response = self.session.post(self.api_url, json=data, timeout=self.timeout)
+            except requests.RequestException:
+                self._record(started, waited, None)
+                raise
+            self._record(started, waited, response.status_code)
+            if response.status_code != 429:
+                return response
+            delay = retry_after_seconds(response)
+            # Hold back every thread sharing the transport, even when this
+            # send gives up rather than waiting that long itself. Capped so a
+            # reset an hour away cannot stall senders holding outbox leases.
+            self.bucket.pause(min(delay, self.max_retry_wait))
+            if attempt == self.max_retries or delay > self.max_retry_wait:
+                return response
+            logger.warning("SendGrid rate limit hit, retrying in %.1fs", delay)
+        return response
+
+    def _record(self, started, waited, status):
+        elapsed = time.perf_counter() - started
+        OUTBOUND_LATENCY.observe(elapsed, 'sendgrid', status or 'error')
+        with self._lock:
+            self._latencies.append(elapsed)
+            self._throttled_seconds += waited
+            if status is None:
+                self._errors += 1
+            else:
+                self._statuses[status] += 1
+                if status == 429:
+                    self._rate_limited += 1
+
+    def stats(self):
+        """Send counts by status and recent send latencies (seconds)."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            statuses = dict(self._statuses)
+            errors, rate_limited, throttled = self._errors, self._rate_limited, self._throttled_seconds
+
+        def percentile(p):
+            return latencies[min(int(len(latencies) * p), len(latencies) - 1)] if latencies else 0.0
+
+        return {
+            'requests': sum(statuses.values()) + errors,
+            'statuses': statuses,
+            'connection_errors': errors,
+            'rate_limited': rate_limited,
+            'throttled_seconds': throttled,
+            'latency_p50': percentile(0.5),
+            'latency_p95': percentile(0.95),
+            'latency_p99': percentile(0.99)
+        }
+
+    def close(self):
+        self.session.close()
+
+
+_transports = {}
+_transports_lock = threading.Lock()
+
+
+def get_transport(api_key, api_url=None):
+    """The process-wide transport for these credentials, created on first use.
+
+    The endpoint defaults to SENDGRID_API_URL from the environment (e.g. a
+    local stub server in benchmarks), else the real API.
+    """
+    api_url = api_url or os.environ.get('SENDGRID_API_URL') or SENDGRID_SEND_URL
+    key = (api_key, api_url)
+    with _transports_lock:
+        if key not in _transports:
+            _transports[key] = SendGridTransport(
+                api_key, api_url,
+                rate=float(os.environ.get('SENDGRID_RATE_LIMIT') or DEFAULT_RATE),
+                burst=int(os.environ.get('SENDGRID_BURST') or DEFAULT_BURST)
+            )
+        return _transports[key]
+
+
+def set_transport(transport):
+    """Use `transport` for its credentials and endpoint from now on (e.g. one with other limits)."""
+    with _transports_lock:
+        previous = _transports.pop((transport.api_key, transport.api_url), None)
+        _transports[(transport.api_key, transport.api_url)] = transport
+    if previous and previous is not transport:
+        previous.close()
+
+
+def transport_stats():
+    """Combined stats of every transport in this process, by endpoint."""
+    with _transports_lock:
+        transports = list(_transports.values())
+    return {t.api_url: t.stats() for t in transports}
@@ -1,13 +1,23 @@
 from twilio.rest import Client
 from flask import current_app
 from datetime import datetime, timedelta
+import logging
+from shared.metrics import OUTBOUND_LATENCY, timed
+
+logger = logging.getLogger(__name__)
 
 class SMSService:
+    # Twilio clients keyed by credentials, shared so each send reuses one client
+    _clients = {}
+
     def __init__(self):
-        self.client = Client(
+        credentials = (
             current_app.config['TWILIO_ACCOUNT_SID'],
             current_app.config['TWILIO_AUTH_TOKEN']
         )
+        if credentials not in SMSService._clients:
+            SMSService._clients[credentials] = Client(*credentials)
+        self.client = SMSService._clients[credentials]
 
     def schedule_project_notification(self, phone_number, customer_name, project_date, address):
         try:
@@ -25,20 +35,19 @@ class SMSService:
                 f"If you have any questions, please contact us."
             )
 
-            print(f"Attempting to send SMS to {phone_number}")  # Debug log
-            print(f"Message content: {message}")  # Debug log
-            print(f"Scheduled for: {notification_date}")  # Debug log
+            logger.debug("Sending SMS to %s for %s: %s", phone_number, notification_date, message)
 
             # Send message immediately for testing
-            message = self.client.messages.create(
-                to=phone_number,
-                from_=current_app.config['TWILIO_PHONE_NUMBER'],
-                body=message
-            )
+            with timed(OUTBOUND_LATENCY, 'twilio'):
+                message = self.client.messages.create(
+                    to=phone_number,
+                    from_=current_app.config['TWILIO_PHONE_NUMBER'],
+                    body=message
+                )
             
-            print(f"Message SID: {message.sid}")  # Debug log
+            logger.info("Sent SMS", extra={'message_sid': message.sid})
             return True
 
         except Exception as e:
-            print(f"Error sending SMS: {str(e)}")  # Debug log
+            logger.error("Error sending SMS: %s", e)
             raise e 
\ No newline at end of file
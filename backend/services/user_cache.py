@@ -0,0 +1,87 @@
+import time
+from collections import namedtuple
+from flask import request
+from flask_jwt_extended import verify_jwt_in_request, get_jwt, get_jwt_identity
+from sqlalchemy.orm import joinedload
+from models.user import User
+from shared.ttl_cache import TTLCache
+
+# Short TTLs bound how stale a cached entry can be in other worker processes,
+# which do not see this process's invalidations.
+token_cache = TTLCache(maxsize=4096, ttl=60)
+user_cache = TTLCache(maxsize=1024, ttl=60)
+
+
+def token_identity():
+    """Return the JWT identity of the current request, verifying each token once.
+
+    A token that verified recently is trusted until the cache entry or the
+    token itself expires, whichever is first.
+    """
+    header = request.headers.get('Authorization', '')
+    cached = token_cache.get(header)
+    if cached and cached[1] > time.time():
+        return cached[0]
+
+    verify_jwt_in_request()
+    identity = get_jwt_identity()
+    expires_at = get_jwt().get('exp', time.time() + token_cache.ttl)
+    token_cache.set(header, (identity, expires_at), ttl=expires_at - time.time())
+    return identity
+
+
+class CachedRole(namedtuple('CachedRole', 'id name permissions')):
+    """Read-only copy of a role."""
+    __slots__ = ()
+
+
+class CachedUser(namedtuple('CachedUser', 'id username email is_active role')):
+    """Read-only copy of a user and its role, shared by every request and thread.
+
+    Offers the fields and permission checks of `User` that token-authenticated
+    routes read. It is not an ORM instance, so routes that change a user must
+    query the `User` itself.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_user(cls, user):
+        role = None
+        if user.role is not None:
+            role = CachedRole(user.role.id, user.role.name, user.role.permissions)
+        return cls(user.id, user.username, user.email, user.is_active, role)
+
+    def has_permission(self, permission):
+        if not self.role:
+            return False
+        return bool(self.role.permissions & permission)
+
+    def is_admin(self):
+        return bool(self.role and self.role.name == 'admin')
+
+    def __repr__(self):
+        return f'<User {self.username}>'
+
+
+def load_user(user_id):
+    """Return a `CachedUser` snapshot of the user, from cache when possible.
+
+    Snapshots can lag changes by up to the cache TTL in other processes, or
+    in this one when the change skipped `invalidate_user`.
+    """
+    user_id = int(user_id)
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+
+    user = User.query.options(joinedload(User.role)).get(user_id)
+    if user is None:
+        return None
+    snapshot = CachedUser.from_user(user)
+    user_cache.set(user_id, snapshot)
+    return snapshot
+
+
+def invalidate_user(user_id):
+    """Forget a cached user after it is changed or deleted."""
+    user_cache.pop(int(user_id))
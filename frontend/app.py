@@ -1,36 +1,57 @@
 from flask import Flask, render_template, request, redirect, url_for, session, jsonify, flash
 from flask_login import login_required
 import requests
+from backend_client import BackendClient
+from shared.ttl_cache import TTLCache
+from customer_cache import CustomerCache
+from shared.metrics import init_metrics
+import atexit
 import json
-import csv
+import os
+from datetime import date, datetime, timedelta
 
 app = Flask(__name__)
 app.secret_key = 'your_secret_key'
 
-# Global cache for customer data
-CUSTOMER_CACHE = []
-def load_customer_cache():
-    global CUSTOMER_CACHE
-    try:
-        with open('../sav_schedule_back/data/cust_list.csv', 'r') as file:
-            reader = csv.reader(file)
-            headers = next(reader)
-            customer_idx = headers.index('Customer')
-            last_name_idx = headers.index('Last_Name')
-            phone_idx = headers.index('Phone')
-            email_idx = headers.index('Main_Email')
-            
-            CUSTOMER_CACHE = [{
-                'name': f"{row[customer_idx]} {row[last_name_idx]}".strip(),
-                'phone': row[phone_idx].strip(),
-                'email': row[email_idx].strip()
-            } for row in reader if len(row) >= max(customer_idx, last_name_idx, phone_idx, email_idx) + 1]
-    except Exception as e:
-        print(f"Error loading customer cache: {str(e)}")
-        CUSTOMER_CACHE = []
+# Per-page latency and backend call timings at /metrics; each worker writes its
+# figures to data/metrics so a scrape covers them all
+metrics_writer = init_metrics(app, directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'metrics'))
+atexit.register(metrics_writer.shutdown)
 
 BACKEND_URL = 'http://localhost:5001'
 
+# Pooled, keep-alive client used for every call to the backend
+backend = BackendClient(BACKEND_URL)
+
+# Customers for autocomplete, synced from the backend as users search
+CUSTOMER_CACHE = CustomerCache(backend)
+
+# Tokens the backend recently confirmed as valid, mapped to their user record
+VALIDATED_TOKENS = TTLCache(maxsize=1024, ttl=60)
+
+def validate_token(token):
+    """Return the backend's user record for a token, or None if it is not valid.
+
+    Successful validations are cached briefly so page views do not each make
+    a round trip to /auth/validate.
+    """
+    user = VALIDATED_TOKENS.get(token)
+    if user is not None:
+        return user
+    response = backend.get('/auth/validate', headers={'Authorization': f"Bearer {token}"})
+    if not response.ok:
+        return None
+    user = response.json().get('user') or {}
+    VALIDATED_TOKENS.set(token, user)
+    return user
+
+def forget_validated_user(user_id):
+    """Drop cached validations for a user whose account was changed."""
+    VALIDATED_TOKENS.discard_where(lambda user: user.get('id') == user_id)
+
+# Projects requested per page when loading a calendar window
+CALENDAR_PAGE_SIZE = 500
+
 JOB_COST_TYPES = [
     'standard',
     'time_and_material',
@@ -68,16 +89,7 @@ def index():
                 session.clear()
                 return render_template('index.html')
                 
-            print(f"Validating token at index: {token[:10]}...")
-            response = requests.get(
-                f'{BACKEND_URL}/auth/validate',
-                headers={'Authorization': f"Bearer {token}"}
-            )
-            
-            print(f"Validation response status: {response.status_code}")
-            print(f"Validation response content: {response.text}")
-            
-            if response.ok:
+            if validate_token(token):
                 return redirect(url_for('dashboard'))
             else:
                 print("Token validation failed, clearing session")
@@ -94,8 +106,8 @@ def login():
     if request.method == 'POST':
         try:
             print(f"Attempting login...")
-            response = requests.post(
-                f'{BACKEND_URL}/auth/login',
+            response = backend.post(
+                f'/auth/login',
                 data={
                     'username': request.form.get('username'),
                     'password': request.form.get('password')
@@ -147,8 +159,8 @@ def signup():
     if request.method == 'POST':
         try:
             # Forward the request to the backend
-            response = requests.post(
-                f'{BACKEND_URL}/auth/signup',
+            response = backend.post(
+                f'/auth/signup',
                 json=request.get_json(),
                 headers={'Content-Type': 'application/json'}
             )
@@ -187,13 +199,15 @@ def create_project(region):
     if request.method == 'POST':
         try:
             data = request.get_json()
-            response = requests.post(
-                f'{BACKEND_URL}/projects/{region}',
+            response = backend.post(
+                f'/projects/{region}',
                 headers={'Authorization': f"Bearer {session['user']['token']}"},
                 json=data
             )
             
             if response.ok:
+                # The project may have added or edited a customer
+                CUSTOMER_CACHE.mark_stale()
                 # Store the project data in session for confirmation page
                 session['latest_project'] = data
                 session['latest_project']['region'] = region
@@ -234,8 +248,8 @@ def confirmation(region):
         
         # Fallback to API call if not in session
         print("Fetching latest project for confirmation...")
-        response = requests.get(
-            f'{BACKEND_URL}/projects/{region}/latest',
+        response = backend.get(
+            f'/projects/{region}/latest',
             headers={'Authorization': f"Bearer {session['user']['token']}"}
         )
         
@@ -268,9 +282,37 @@ def import_customers():
 
 @app.route('/logout')
 def logout():
+    if 'user' in session and session['user'].get('token'):
+        VALIDATED_TOKENS.pop(session['user']['token'])
     session.clear()
     return redirect(url_for('index'))
 
+def calendar_window(month=None):
+    """Return the [start, end) date range of the month grid for a YYYY-MM month.
+
+    FullCalendar's month view shows six Sunday-first weeks around the month,
+    so the window covers the whole grid, not only the month itself.
+    """
+    try:
+        first = datetime.strptime(month, '%Y-%m').date() if month else date.today().replace(day=1)
+    except ValueError:
+        first = date.today().replace(day=1)
+    start = first - timedelta(days=(first.weekday() + 1) % 7)
+    return first, start, start + timedelta(weeks=6)
+
+def fetch_region_projects(region, headers, start, end):
+    """Fetch every project in [start, end) for a region, following page cursors."""
+    projects = []
+    params = {'start': start.isoformat(), 'end': end.isoformat(), 'limit': CALENDAR_PAGE_SIZE}
+    while True:
+        response = backend.get(f'/projects/{region}', headers=headers, params=params)
+        response.raise_for_status()
+        projects.extend(response.json())
+        next_cursor = response.headers.get('X-Next-Cursor')
+        if not next_cursor:
+            return projects
+        params['cursor'] = next_cursor
+
 @app.route('/calendar/<region>')
 def calendar(region):
     if 'user' not in session:
@@ -281,27 +323,43 @@ def calendar(region):
             return redirect(url_for('login'))
             
         headers = {'Authorization': f"Bearer {token}"}
-        response = requests.get(f'{BACKEND_URL}/projects/{region}', headers=headers)
+        first, start, end = calendar_window(request.args.get('month'))
+        try:
+            projects = fetch_region_projects(region, headers, start, end)
+        except requests.RequestException as e:
+            print(f"Error fetching calendar projects: {str(e)}")
+            projects = []
         
-        if response.status_code == 200:
-            projects = response.json()
-            return render_template('calendar.html',
-                                region=region,
-                                username=session['user']['username'],
-                                role=session['user']['role'],
-                                projects=projects,
-                                projects_json=json.dumps(projects))
-        else:
-            return render_template('calendar.html',
-                                region=region,
-                                username=session['user']['username'],
-                                role=session['user']['role'],
-                                projects=[],
-                                projects_json='[]')
+        return render_template('calendar.html',
+                            region=region,
+                            username=session['user']['username'],
+                            role=session['user']['role'],
+                            projects=projects,
+                            projects_json=json.dumps(projects),
+                            initial_date=first.isoformat(),
+                            window_start=start.isoformat(),
+                            window_end=end.isoformat())
     except Exception as e:
         print(f"Error in calendar route: {str(e)}")
         return redirect(url_for('login'))
 
+@app.route('/calendar/<region>/events')
+def calendar_events(region):
+    """JSON feed of projects in [start, end) for calendar navigation."""
+    if 'user' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    try:
+        start = datetime.strptime(request.args.get('start', ''), '%Y-%m-%d').date()
+        end = datetime.strptime(request.args.get('end', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'error': 'start and end must be YYYY-MM-DD'}), 400
+    try:
+        headers = {'Authorization': f"Bearer {session['user'].get('token')}"}
+        return jsonify(fetch_region_projects(region, headers, start, end))
+    except Exception as e:
+        print(f"Error fetching calendar events: {str(e)}")
+        return jsonify({'error': 'Failed to fetch projects'}), 502
+
 @app.route('/user-management')
 def user_management():
     print("Accessing user management route...")
@@ -328,17 +386,14 @@ def user_management():
         print("Validating token before making user management request...")
         # Validate token
         headers = {'Authorization': f'Bearer {token}'}
-        validate_response = requests.get(f'{BACKEND_URL}/auth/validate', headers=headers)
-        print(f"Validation response: {validate_response.status_code}")
-        
-        if validate_response.status_code != 200:
+        if not validate_token(token):
             print("Token validation failed, redirecting to login")
             session.clear()
             return redirect(url_for('login'))
 
         # Make request to get users
         print("Getting users list...")
-        response = requests.get(f'{BACKEND_URL}/auth/users', headers=headers)
+        response = backend.get(f'/auth/users', headers=headers)
         print(f"Users response: {response.status_code}")
         print(f"Users response content: {response.text}")
         
@@ -393,12 +448,14 @@ def update_user_role(user_id):
         headers = {'Authorization': f'Bearer {token}'}
         data = request.get_json()
         
-        response = requests.put(
-            f'{BACKEND_URL}/auth/user/{user_id}/role',
+        response = backend.put(
+            f'/auth/user/{user_id}/role',
             headers=headers,
             json=data
         )
         
+        if response.ok:
+            forget_validated_user(user_id)
         return jsonify(response.json()), response.status_code
     except Exception as e:
         print(f"Error updating user role: {str(e)}")
@@ -418,11 +475,13 @@ def delete_user(user_id):
             return jsonify({'error': 'No token found'}), 401
 
         headers = {'Authorization': f'Bearer {token}'}
-        response = requests.delete(
-            f'{BACKEND_URL}/auth/user/{user_id}',
+        response = backend.delete(
+            f'/auth/user/{user_id}',
             headers=headers
         )
         
+        if response.ok:
+            forget_validated_user(user_id)
         return jsonify(response.json()), response.status_code
     except Exception as e:
         print(f"Error deleting user: {str(e)}")
@@ -442,8 +501,8 @@ def analytics():
         if not token:
             return redirect(url_for('login'))
             
-        response = requests.get(
-            f'{BACKEND_URL}/analytics/monthly',
+        response = backend.get(
+            f'/analytics/monthly',
             headers={'Authorization': f"Bearer {token}"}
         )
         
@@ -469,8 +528,8 @@ def day_view(region, date):
             
         headers = {'Authorization': f"Bearer {token}"}
         print(f"Fetching projects for {region} on {date}")
-        response = requests.get(
-            f'{BACKEND_URL}/projects/{region}/date/{date}',
+        response = backend.get(
+            f'/projects/{region}/date/{date}',
             headers=headers
         )
         
@@ -511,13 +570,14 @@ def edit_project(region, project_id):
         
         if request.method == 'PUT':
             data = request.get_json()
-            response = requests.put(
-                f'{BACKEND_URL}/projects/{region}/{project_id}',
+            response = backend.put(
+                f'/projects/{region}/{project_id}',
                 headers=headers,
                 json=data
             )
             
             if response.ok:
+                CUSTOMER_CACHE.mark_stale()
                 # Store the project data and update flag in session for confirmation page
                 session['latest_project'] = data
                 session['latest_project']['region'] = region
@@ -528,8 +588,8 @@ def edit_project(region, project_id):
                 return jsonify({'error': error_message}), response.status_code
         
         # GET request
-        response = requests.get(
-            f'{BACKEND_URL}/projects/{region}/{project_id}',
+        response = backend.get(
+            f'/projects/{region}/{project_id}',
             headers=headers
         )
         
@@ -550,17 +610,15 @@ def edit_project(region, project_id):
 @app.route('/search-customers', methods=['GET'])
 def search_customers():
     try:
-        query = request.args.get('q', '').lower()
-        if not query:
+        if 'user' not in session:
             return jsonify([])
-            
-        # Search in memory cache
-        results = [
-            customer for customer in CUSTOMER_CACHE
-            if query in customer['name'].lower() or query in customer['phone'].lower()
-        ][:10]  # Limit to 10 results
-        
-        return jsonify(results)
+        try:
+            CUSTOMER_CACHE.refresh_if_stale(session['user']['token'])
+        except Exception as e:
+            # Keep answering from the copy we have until the backend is back
+            print(f"Error refreshing customer cache: {str(e)}")
+        # Typo-tolerant lookup by name, email or phone digits
+        return jsonify(CUSTOMER_CACHE.search(request.args.get('q', ''), limit=10))
     except Exception as e:
         print(f"Error searching customers: {str(e)}")
         return jsonify([])
@@ -581,17 +639,18 @@ def update_user(user_id):
         headers = {'Authorization': f'Bearer {token}'}
         data = request.get_json()
         
-        response = requests.put(
-            f'{BACKEND_URL}/auth/user/{user_id}',
+        response = backend.put(
+            f'/auth/user/{user_id}',
             headers=headers,
             json=data
         )
         
+        if response.ok:
+            forget_validated_user(user_id)
         return jsonify(response.json()), response.status_code
     except Exception as e:
         print(f"Error updating user: {str(e)}")
         return jsonify({'error': 'Failed to update user'}), 500
 
 if __name__ == '__main__':
-    load_customer_cache()  # Load customers when app starts
     app.run(port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,66 @@
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from shared.metrics import OUTBOUND_LATENCY
+
+
+class BackendClient:
+    """Shared HTTP client for calls from the frontend to the backend API.
+
+    Keeps a pool of keep-alive connections to the backend, applies a default
+    (connect, read) timeout to every call and retries a bounded number of
+    times. Every method is retried on connection errors, where the request
+    never reached the backend. GET, HEAD and OPTIONS are also retried on read
+    timeouts and 502/503/504 responses; writes are not, since the backend may
+    already have applied them.
+    Paths are relative to `base_url`; any other `requests` keyword argument
+    (headers, json, data, params, timeout) is passed through. Each call's time,
+    retries included, is recorded by status in OUTBOUND_LATENCY.
+    """
+
+    def __init__(self, base_url, timeout=(3.05, 15), retries=2, backoff_factor=0.2, pool_size=20):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504),
+            # urllib3 retries connection errors for any method; read and
+            # status retries are limited to these
+            allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS']),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        started = time.perf_counter()
+        status = 'error'
+        try:
+            response = self.session.request(method, f'{self.base_url}{path}', **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            OUTBOUND_LATENCY.observe(time.perf_counter() - started, 'backend', status)
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request('PUT', path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request('DELETE', path, **kwargs)
+
+    def close(self):
+        self.session.close()
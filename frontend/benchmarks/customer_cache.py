@@ -0,0 +1,136 @@
+"""Measure the frontend customer cache against a stub of /customers/sync.
+
+Loads a synthetic customer list through the sync protocol, then times the
+polls made while searching: a 304 when nothing changed and a small batch of
+edits, inserts and deletes applied in place. Also checks the changes show up
+in search and in the phone index.
+
+Run from the frontend directory:
+
+    python -m benchmarks.customer_cache [customers]
+"""
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from backend_client import BackendClient
+from customer_cache import CustomerCache
+
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis']
+POLLS = 200
+
+
+class SyncLog:
+    """The backend's customer changelog: the latest change number per customer."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = 0
+        self.changes = {}  # customer id -> (version, row or None when deleted)
+
+    def put(self, row):
+        with self.lock:
+            self.version += 1
+            self.changes[row[0]] = (self.version, row)
+
+    def delete(self, customer_id):
+        with self.lock:
+            self.version += 1
+            self.changes[customer_id] = (self.version, None)
+
+    def since(self, version):
+        with self.lock:
+            changed = sorted(c for c in self.changes.values() if c[0] > version)
+            return {
+                'version': self.version,
+                'customers': [row for _, row in changed if row],
+                'deleted': [customer_id for customer_id, (v, row) in self.changes.items()
+                            if v > version and row is None],
+                'full': version == 0
+            }
+
+
+class StubBackend(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    log = SyncLog()
+
+    def do_GET(self):
+        since = int(parse_qs(urlparse(self.path).query).get('since', ['0'])[0])
+        etag = f'"{self.log.version}"'
+        if since == self.log.version or self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        payload = json.dumps(self.log.since(since)).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def customer_row(i):
+    first = FIRST_NAMES[i % len(FIRST_NAMES)]
+    last = LAST_NAMES[i // len(FIRST_NAMES) % len(LAST_NAMES)]
+    return [i, f'{first} {last}', f'(801) {i // 10000 % 1000:03d}-{i % 10000:04d}', f'{first.lower()}.{last.lower()}{i}@example.com']
+
+
+def timed_polls(cache, log, changes_per_poll):
+    timings = []
+    next_id = max(log.changes) + 1
+    for n in range(POLLS):
+        for k in range(changes_per_poll):
+            if k % 3 == 0:
+                log.put(customer_row(next_id))
+                next_id += 1
+            elif k % 3 == 1:
+                row = customer_row(n * changes_per_poll + k + 1)
+                log.put([row[0], row[1] + ' Jr', row[2], row[3]])
+            else:
+                log.delete(n * changes_per_poll + k + 1)
+        started = time.perf_counter()
+        cache.refresh('bench-token')
+        timings.append(1000 * (time.perf_counter() - started))
+    timings.sort()
+    return timings[len(timings) // 2], timings[int(len(timings) * 0.99)]
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    log = StubBackend.log
+    for i in range(1, total + 1):
+        log.put(customer_row(i))
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubBackend)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    cache = CustomerCache(BackendClient(f'http://127.0.0.1:{server.server_address[1]}'))
+
+    started = time.perf_counter()
+    cache.refresh_if_stale('bench-token')
+    print(f"Full load of {len(cache)} customers: {time.perf_counter() - started:.2f}s")
+
+    for label, changes in (('no changes (304)', 0), ('30 changes', 30)):
+        p50, p99 = timed_polls(cache, log, changes)
+        print(f"poll, {label:<16} p50 {p50:.2f} ms  p99 {p99:.2f} ms")
+
+    assert len(cache) == len([c for c in log.changes.values() if c[1]])
+    assert cache.version == log.version
+    edited = customer_row(2)
+    assert [c['name'] for c in cache.find_by_phone('+1 ' + edited[2])] == [edited[1] + ' Jr']
+    assert not cache.find_by_phone(customer_row(3)[2])
+    assert cache.search(edited[2].replace('(', '').replace(')', ''))[0]['id'] == 2
+    print("Edits, inserts and deletes reach search and the phone index")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
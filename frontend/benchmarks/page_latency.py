@@ -0,0 +1,97 @@
+"""Compare frontend page latency with and without pooled backend connections.
+
+Starts a local stub of the backend API, then renders pages through the
+frontend's test client, first with one fresh connection per backend call
+(the old module-level `requests.get` behaviour) and then with the shared
+`BackendClient`.
+
+Run from the frontend directory:
+
+    python -m benchmarks.page_latency
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+import app as frontend
+from backend_client import BackendClient
+
+PAGES = ['/calendar/North', '/day-view/North/2030-01-15', '/analytics']
+ROUNDS = 200
+
+PROJECTS = [{
+    'id': str(i),
+    'date': '2030-01-15',
+    'customer_name': f'Customer {i}',
+    'address': f'{i} Main St',
+    'work_type': ['basement'],
+    'job_cost_type': ['standard'],
+} for i in range(20)]
+
+
+class StubBackend(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    connections = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with StubBackend.lock:
+            StubBackend.connections += 1
+
+    def do_GET(self):
+        if self.path.startswith('/analytics'):
+            body = {'north': {}, 'south': {}}
+        else:
+            body = PROJECTS
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class UnpooledClient(BackendClient):
+    """Opens a new connection for every call, like bare `requests.get`."""
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return requests.request(method, f'{self.base_url}{path}', **kwargs)
+
+
+def measure(client):
+    frontend.backend = client
+    test_client = frontend.app.test_client()
+    with test_client.session_transaction() as session:
+        session['user'] = {'username': 'bench', 'role': 'admin', 'token': 'bench-token'}
+
+    StubBackend.connections = 0
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        for page in PAGES:
+            response = test_client.get(page)
+            assert response.status_code == 200, page
+    elapsed = time.perf_counter() - started
+    return 1000 * elapsed / (ROUNDS * len(PAGES)), StubBackend.connections
+
+
+def main():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubBackend)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_address[1]}'
+
+    print(f"{'client':<10} {'ms/page':>8} {'connections':>12}")
+    for name, client in (('unpooled', UnpooledClient(base_url)), ('pooled', BackendClient(base_url))):
+        per_page, connections = measure(client)
+        print(f"{name:<10} {per_page:>8.2f} {connections:>12}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
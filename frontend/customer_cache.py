@@ -0,0 +1,168 @@
+import threading
+import time
+from array import array
+from shared.search_index import SearchIndex, phone_digits
+
+
+def normalize_phone(phone):
+    """Digits of a phone number without a leading US country code.
+
+    "(801) 555-1234", "801.555.1234" and "+1 801 555 1234" all become
+    "8015551234".
+    """
+    digits = phone_digits(phone)
+    if len(digits) == 11 and digits.startswith('1'):
+        return digits[1:]
+    return digits
+
+
+class CustomerCache:
+    """Local copy of the backend's customers for autocomplete, kept current by polling.
+
+    The first search loads every customer from the backend's /customers/sync
+    endpoint; after that, at most every `interval` seconds, a search asks for
+    the changes since the last version seen (a 304 when there are none) and
+    applies them in place. Customers are held in parallel arrays indexed by
+    slot, with a fuzzy `SearchIndex` and an exact index on normalized phone
+    digits pointing at the customer ids.
+    """
+
+    def __init__(self, client, path='/customers/sync', interval=30):
+        self.client = client
+        self.path = path
+        self.interval = interval
+        self.version = 0
+        self.index = SearchIndex()
+        self._ids = array('q')
+        self._names = []
+        self._phones = []
+        self._emails = []
+        self._slots = {}  # customer id -> slot in the arrays
+        self._free = []  # slots left by deleted customers
+        self._by_phone = {}  # normalized digits -> customer ids
+        self._checked_at = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._slots)
+
+    def mark_stale(self):
+        """Check for changes on the next search, e.g. after saving a customer."""
+        self._checked_at = None
+
+    def refresh_if_stale(self, token):
+        """Poll the backend if the last check is older than `interval`.
+
+        Only the very first load makes searches wait; later polls are skipped
+        while another request is already making one.
+        """
+        checked_at = self._checked_at
+        if checked_at is not None and time.monotonic() - checked_at < self.interval:
+            return
+        if not self._refresh_lock.acquire(blocking=self.version == 0):
+            return
+        try:
+            if self._checked_at == checked_at:
+                self.refresh(token)
+        finally:
+            self._refresh_lock.release()
+
+    def refresh(self, token):
+        """Fetch and apply the changes since the current version."""
+        response = self.client.get(
+            self.path,
+            params={'since': self.version},
+            headers={'Authorization': f'Bearer {token}', 'If-None-Match': f'"{self.version}"'}
+        )
+        if response.status_code == 304:
+            self._checked_at = time.monotonic()
+            return
+        response.raise_for_status()
+        changes = response.json()
+        if changes.get('full'):
+            self.clear()
+        for customer_id in changes['deleted']:
+            self.remove(customer_id)
+        for customer_id, name, phone, email in changes['customers']:
+            self.put(customer_id, name or '', phone or '', email or '')
+        self.version = changes['version']
+        self._checked_at = time.monotonic()
+        print(f"Customer cache at version {self.version}: {len(self)} customers")
+
+    def put(self, customer_id, name, phone, email):
+        with self._lock:
+            slot = self._slots.get(customer_id)
+            if slot is None:
+                if self._free:
+                    slot = self._free.pop()
+                    self._ids[slot] = customer_id
+                else:
+                    slot = len(self._ids)
+                    self._ids.append(customer_id)
+                    self._names.append(name)
+                    self._phones.append(phone)
+                    self._emails.append(email)
+                self._slots[customer_id] = slot
+            else:
+                self._unindex_phone(customer_id, self._phones[slot])
+            self._names[slot] = name
+            self._phones[slot] = phone
+            self._emails[slot] = email
+            digits = normalize_phone(phone)
+            if digits:
+                self._by_phone.setdefault(digits, []).append(customer_id)
+        # Records in the search index are just the id; results are built from the arrays
+        self.index.add(customer_id, customer_id, name=name, phone=phone, email=email)
+
+    def remove(self, customer_id):
+        with self._lock:
+            slot = self._slots.pop(customer_id, None)
+            if slot is None:
+                return
+            self._unindex_phone(customer_id, self._phones[slot])
+            self._names[slot] = self._phones[slot] = self._emails[slot] = ''
+            self._free.append(slot)
+        self.index.remove(customer_id)
+
+    def clear(self):
+        with self._lock:
+            del self._ids[:]
+            self._names.clear()
+            self._phones.clear()
+            self._emails.clear()
+            self._slots.clear()
+            self._free.clear()
+            self._by_phone.clear()
+        self.index.clear()
+
+    def _unindex_phone(self, customer_id, phone):
+        digits = normalize_phone(phone)
+        ids = self._by_phone.get(digits)
+        if ids and customer_id in ids:
+            ids.remove(customer_id)
+            if not ids:
+                del self._by_phone[digits]
+
+    def _records(self, customer_ids):
+        with self._lock:
+            return [{
+                'id': customer_id,
+                'name': self._names[slot],
+                'phone': self._phones[slot],
+                'email': self._emails[slot]
+            } for customer_id, slot in ((i, self._slots.get(i)) for i in customer_ids) if slot is not None]
+
+    def find_by_phone(self, phone):
+        """Customers whose phone has exactly these digits, however it is formatted."""
+        digits = normalize_phone(phone)
+        with self._lock:
+            customer_ids = list(self._by_phone.get(digits, ()))
+        return self._records(customer_ids)
+
+    def search(self, query, limit=10):
+        """Exact phone matches first when `query` is a full number, then fuzzy matches."""
+        exact = self.find_by_phone(query) if len(normalize_phone(query)) >= 10 else []
+        seen = {customer['id'] for customer in exact}
+        fuzzy = [i for i in self.index.search(query, limit) if i not in seen]
+        return (exact + self._records(fuzzy))[:limit]
@@ -0,0 +1,2 @@
+"""Modules used by both the backend and the frontend: metrics, the fuzzy
+customer search index and the TTL cache."""
@@ -0,0 +1,335 @@
+"""In-process metrics exposed in the Prometheus text format.
+
+Counters and histograms are kept in plain dicts under a lock per metric, so
+recording a value costs a dict lookup and an addition. `init_metrics(app)`
+times every request per endpoint, optionally counts the SQL statements each
+request runs, and serves everything at /metrics.
+
+Under several worker processes each one only sees its own requests. Given a
+`directory`, every process writes a snapshot of its metrics there every few
+seconds and /metrics adds up the snapshots of the processes still running.
+A worker that exits takes its counts with it, which Prometheus treats as a
+counter reset.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Seconds; the Prometheus client defaults
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+# Statements per request
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+# Background jobs run for longer than requests
+JOB_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+
+SNAPSHOT_INTERVAL = 5.0
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> per-bucket counts (last is +Inf), then the sum
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = [0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        """Observe how long the block takes, in seconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def samples(self):
+        with self._lock:
+            return [[list(labels), list(counts)] for labels, counts in self._values.items()]
+
+
+class Registry:
+    """A named set of metrics, rendered together."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, *args, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, *args, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get(Counter, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, documentation, labelnames, buckets)
+
+    def snapshot(self):
+        """Every metric's current values, as JSON-serializable data."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {m.name: {
+            'kind': m.kind,
+            'help': m.documentation,
+            'labelnames': list(m.labelnames),
+            'buckets': list(getattr(m, 'buckets', ())),
+            'samples': m.samples()
+        } for m in metrics}
+
+
+REGISTRY = Registry()
+
+
+def merge_snapshots(snapshots):
+    """Add up snapshots from several processes into one."""
+    merged = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, dict(metric, samples={}))
+            for labels, value in metric['samples']:
+                key = tuple(labels)
+                if key not in target['samples']:
+                    target['samples'][key] = value
+                elif metric['kind'] == 'counter':
+                    target['samples'][key] += value
+                else:
+                    target['samples'][key] = [a + b for a, b in zip(target['samples'][key], value)]
+    return merged
+
+
+def _label_text(names, values, extra=''):
+    pairs = [
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def render(merged):
+    """Format merged snapshots in the Prometheus text exposition format."""
+    lines = []
+    for name in sorted(merged):
+        metric = merged[name]
+        names = metric['labelnames']
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        for labels, value in sorted(metric['samples'].items()):
+            if metric['kind'] == 'counter':
+                lines.append(f"{name}{_label_text(names, labels)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(list(metric['buckets']) + ['+Inf'], value[:-1]):
+                cumulative += count
+                le = 'le="{}"'.format(bound)
+                lines.append(f"{name}_bucket{_label_text(names, labels, le)} {cumulative}")
+            lines.append(f"{name}_sum{_label_text(names, labels)} {value[-1]}")
+            lines.append(f"{name}_count{_label_text(names, labels)} {cumulative}")
+    return '\n'.join(lines) + '\n'
+
+
+class SnapshotWriter:
+    """Writes this process's metrics to `directory`/<pid>.json every few seconds."""
+
+    def __init__(self, registry, directory, interval=SNAPSHOT_INTERVAL):
+        self.registry = registry
+        self.directory = directory
+        self.interval = interval
+        self._stopping = threading.Event()
+        self._thread = None
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def path(self):
+        # Looked up on each write, so a forked worker writes its own file
+        return os.path.join(self.directory, f'{os.getpid()}.json')
+
+    def write(self):
+        path = self.path
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.registry.snapshot(), f)
+        os.replace(path + '.tmp', path)
+
+    def start(self):
+        def run():
+            while not self._stopping.wait(self.interval):
+                try:
+                    self.write()
+                except OSError:
+                    pass
+        self._thread = threading.Thread(target=run, name='metrics-snapshot', daemon=True)
+        self._thread.start()
+
+    def shutdown(self):
+        self._stopping.set()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def collect(self):
+        """Snapshots of every process still running, this one freshly written."""
+        self.write()
+        snapshots = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.json'):
+                continue
+            path = os.path.join(self.directory, filename)
+            if not _process_alive(int(filename[:-len('.json')])):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def track_sql(engine, registry=REGISTRY):
+    """Count the statements and time spent in SQL on `engine` per request."""
+    from flask import g, has_request_context
+    from sqlalchemy import event
+
+    # Kept on the execution context rather than the connection, so a statement
+    # that raises (and never reaches after_cursor_execute) leaves nothing behind
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.metrics_started = time.perf_counter()
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, 'metrics_started', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        if has_request_context():
+            sql = g.get('metrics_sql')
+            if sql is not None:
+                sql[0] += 1
+                sql[1] += elapsed
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+
+
+def init_metrics(app, registry=REGISTRY, engine=None, directory=None):
+    """Time each request by endpoint and serve the metrics at /metrics.
+
+    With `engine`, also records SQL statements and SQL time per request. With
+    `directory`, /metrics covers every worker process (see module docstring).
+    """
+    from flask import g, request
+
+    latency = registry.histogram(
+        'http_request_duration_seconds', 'Time to handle a request, by endpoint',
+        ('method', 'endpoint', 'status'))
+    statements = registry.histogram(
+        'http_request_sql_statements', 'SQL statements run per request', ('endpoint',), COUNT_BUCKETS)
+    sql_time = registry.histogram(
+        'http_request_sql_duration_seconds', 'Time spent in SQL per request', ('endpoint',))
+    writer = SnapshotWriter(registry, directory) if directory else None
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+        if engine is not None:
+            g.metrics_sql = [0, 0.0]
+
+    @app.after_request
+    def record_request(response):
+        started = g.get('metrics_started')
+        if started is not None:
+            endpoint = request.endpoint or 'unmatched'
+            latency.observe(time.perf_counter() - started, request.method, endpoint, response.status_code)
+            sql = g.get('metrics_sql')
+            if sql is not None:
+                statements.observe(sql[0], endpoint)
+                sql_time.observe(sql[1], endpoint)
+        return response
+
+    def metrics_view():
+        snapshots = writer.collect() if writer else [registry.snapshot()]
+        return app.response_class(render(merge_snapshots(snapshots)),
+                                  mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+    if engine is not None:
+        track_sql(engine, registry)
+    if writer:
+        writer.start()
+    app.extensions['metrics'] = writer
+    return writer
+
+
+# Shared by the outbound clients and background jobs
+OUTBOUND_LATENCY = REGISTRY.histogram(
+    'outbound_request_duration_seconds', 'Calls to other services, by service and outcome',
+    ('service', 'outcome'))
+JOB_DURATION = REGISTRY.histogram(
+    'background_job_duration_seconds', 'Background job runs, by job and outcome',
+    ('job', 'outcome'), JOB_BUCKETS)
+
+
+@contextmanager
+def timed(histogram, name):
+    """Observe how long the block takes in `histogram`, labelled `name` and ok or error.
+
+    e.g. `with timed(JOB_DURATION, 'check_upcoming_projects'): ...`
+    """
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        histogram.observe(time.perf_counter() - started, name, outcome)
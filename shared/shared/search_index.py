@@ -0,0 +1,328 @@
+import heapq
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+
+# Weight of a word matched in the email rather than the name
+EMAIL_WEIGHT = 0.8
+
+# Word prefixes up to this length are indexed with each letter deleted in turn
+PREFIX_LENGTH = 8
+
+_WORDS = re.compile(r'[a-z]+|[0-9]+')
+_PHONE_QUERY = re.compile(r'^[0-9\s().+-]+$')
+_NON_DIGITS = re.compile(r'[^0-9]+')
+
+
+def normalize_text(value):
+    """Lowercase and split into runs of letters and runs of digits.
+
+    "J.Smith42@example.com" becomes ['j', 'smith', '42', 'example', 'com'],
+    so numbered emails and names share words instead of each adding a new one.
+    """
+    return _WORDS.findall((value or '').lower())
+
+
+def phone_digits(value):
+    return _NON_DIGITS.sub('', value or '')
+
+
+def token_trigrams(token, partial=False):
+    """Trigrams of a space-padded token; `partial` leaves the end open for prefixes."""
+    padded = f' {token}' if partial else f' {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def deletions(token):
+    """The token itself and every way of deleting one of its characters.
+
+    Two strings within one edit (including a swap of adjacent letters)
+    always share at least one of these, wherever the edit is.
+    """
+    return {token} | {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+def prefix_deletions(token):
+    """`deletions` of every prefix of the token, up to PREFIX_LENGTH."""
+    keys = set()
+    for size in range(1, min(len(token), PREFIX_LENGTH) + 1):
+        keys |= deletions(token[:size])
+    return keys
+
+
+def typo_allowance(token):
+    """Number of typos tolerated in a query word of this length."""
+    if len(token) >= 8:
+        return 2
+    return 1 if len(token) >= 4 else 0
+
+
+def edit_distance(a, b, limit):
+    """Edit distance counting adjacent transpositions as one edit.
+
+    Returns limit + 1 as soon as the distance is known to exceed `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if before is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+def token_score(query_token, token, partial):
+    """How well an indexed word matches a query word, from 0 to 1.
+
+    Exact matches beat prefixes, which beat words within the typo allowance.
+    A `partial` query word (still being typed) only has to match the start
+    of the indexed word.
+    """
+    if token == query_token:
+        return 1.0
+    if token.startswith(query_token):
+        return 0.9
+    allowed = typo_allowance(query_token)
+    if not allowed:
+        return 0.0
+    if partial:
+        size = len(query_token)
+        distance = min(
+            edit_distance(query_token, token[:n], allowed)
+            for n in range(max(1, size - allowed), size + allowed + 1)
+        )
+    else:
+        distance = edit_distance(query_token, token, allowed)
+    return 0.6 - 0.1 * distance if distance <= allowed else 0.0
+
+
+class SearchIndex:
+    """In-memory fuzzy search over name, email and phone, for autocomplete.
+
+    Each distinct word is indexed by its trigrams and by its prefixes with
+    one letter deleted, so the words close to a query word are found without
+    scanning every record and near misses ("jon smtih", "lpoez") still
+    match. Records must match every query word that matched anything
+    (falling back to the most selective one when that finds too little) and
+    are ranked by how well each word matches: exact, then prefix, then
+    within a typo or two, with name words ahead of email words. Queries made
+    only of phone characters match the phone digits, prefixes first, e.g.
+    "801-555" or "5512".
+
+    Records are plain dicts returned as-is from `search`; keys are any
+    hashable id. Safe to read and update from multiple threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records = {}
+        self._names = {}  # key -> name words, also the tie-break sort key
+        self._emails = {}  # key -> email words not already in the name
+        self._digits = {}
+        self._name_postings = defaultdict(set)  # word -> keys with it in the name
+        self._email_postings = defaultdict(set)  # word -> keys with it in the email
+        self._word_grams = defaultdict(set)  # trigram -> indexed words containing it
+        self._word_prefixes = defaultdict(set)  # prefix deletion -> words of letters
+        self._digit_grams = defaultdict(set)
+        self._sorted_phones = []  # (digits, key), for prefix lookups by bisection
+
+    def __len__(self):
+        return len(self._records)
+
+    def add(self, key, record, name='', phone='', email=''):
+        """Index (or re-index) a record under `key`."""
+        names = tuple(dict.fromkeys(normalize_text(name)))
+        emails = tuple(t for t in dict.fromkeys(normalize_text(email)) if t not in names)
+        digits = phone_digits(phone)
+        with self._lock:
+            self._remove(key)
+            self._records[key] = record
+            self._names[key] = names
+            self._emails[key] = emails
+            self._digits[key] = digits
+            for tokens, postings in ((names, self._name_postings), (emails, self._email_postings)):
+                for token in tokens:
+                    if token not in self._name_postings and token not in self._email_postings:
+                        self._add_word(token)
+                    postings[token].add(key)
+            for i in range(len(digits) - 2):
+                self._digit_grams[digits[i:i + 3]].add(key)
+            if digits:
+                insort(self._sorted_phones, (digits, key))
+
+    def remove(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+            self._names.clear()
+            self._emails.clear()
+            self._digits.clear()
+            self._name_postings.clear()
+            self._email_postings.clear()
+            self._word_grams.clear()
+            self._word_prefixes.clear()
+            self._digit_grams.clear()
+            self._sorted_phones.clear()
+
+    def _add_word(self, token):
+        for gram in token_trigrams(token):
+            self._word_grams[gram].add(token)
+        if not token.isdigit():
+            for prefix in prefix_deletions(token):
+                self._word_prefixes[prefix].add(token)
+
+    def _remove_word(self, token):
+        for gram in token_trigrams(token):
+            self._word_grams[gram].discard(token)
+            if not self._word_grams[gram]:
+                del self._word_grams[gram]
+        if not token.isdigit():
+            for prefix in prefix_deletions(token):
+                self._word_prefixes[prefix].discard(token)
+                if not self._word_prefixes[prefix]:
+                    del self._word_prefixes[prefix]
+
+    def _remove(self, key):
+        if key not in self._records:
+            return
+        del self._records[key]
+        for tokens, postings in ((self._names.pop(key), self._name_postings),
+                                 (self._emails.pop(key), self._email_postings)):
+            for token in tokens:
+                postings[token].discard(key)
+                if not postings[token]:
+                    del postings[token]
+                    if token not in self._name_postings and token not in self._email_postings:
+                        self._remove_word(token)
+        digits = self._digits.pop(key)
+        for i in range(len(digits) - 2):
+            gram = digits[i:i + 3]
+            self._digit_grams[gram].discard(key)
+            if not self._digit_grams[gram]:
+                del self._digit_grams[gram]
+        if digits:
+            del self._sorted_phones[bisect_left(self._sorted_phones, (digits, key))]
+
+    def search(self, query, limit=10):
+        """Return up to `limit` records best matching `query`, best first."""
+        query = (query or '').strip()
+        with self._lock:
+            digits = phone_digits(query)
+            if len(digits) >= 3 and _PHONE_QUERY.match(query):
+                return self._search_phone(digits, limit)
+            return self._search_text(normalize_text(query), limit)
+
+    def _search_phone(self, digits, limit):
+        # Numbers starting with the digits come first, straight from the sorted list
+        matches = []
+        i = bisect_left(self._sorted_phones, (digits,))
+        while len(matches) < limit and i < len(self._sorted_phones):
+            phone, key = self._sorted_phones[i]
+            if not phone.startswith(digits):
+                break
+            matches.append(key)
+            i += 1
+        if len(matches) < limit:
+            postings = sorted(
+                (self._digit_grams.get(digits[i:i + 3], set()) for i in range(len(digits) - 2)),
+                key=len
+            )
+            candidates = set.intersection(*postings) - set(matches)
+            positions = ((self._digits[key].find(digits), self._digits[key], key) for key in candidates)
+            matches.extend(key for position, _, key in heapq.nsmallest(
+                limit - len(matches), (p for p in positions if p[0] > 0)
+            ))
+        return [self._records[key] for key in matches]
+
+    def _word_levels(self, query_token, partial):
+        """Group the records matching a query word by score.
+
+        Returns a list of (score, keys) pairs, best score first.
+        """
+        allowance = typo_allowance(query_token)
+        candidates = set()
+        if query_token.isdigit() or allowance > 1:
+            grams = token_trigrams(query_token, partial)
+            # Each edit changes at most three trigrams, or four for a transposition
+            needed = max(1, len(grams) - 4 * allowance)
+            overlap = Counter()
+            for gram in grams:
+                overlap.update(self._word_grams.get(gram, ()))
+            candidates.update(token for token, count in overlap.items() if count >= needed)
+        if not query_token.isdigit():
+            # Words starting within one edit of the query's start, wherever
+            # the edit is; trigrams miss typos near the start of short words
+            head = query_token[:PREFIX_LENGTH]
+            for prefix in (deletions(head) if allowance else (head,)):
+                candidates.update(self._word_prefixes.get(prefix, ()))
+
+        # Longer words only matter up to the typo allowance past the query's
+        # length, so each distinct start is only scored once
+        longest = len(query_token) + allowance
+        scored = {}
+        levels = defaultdict(set)
+        for token in candidates:
+            if token.startswith(query_token):
+                score = 1.0 if token == query_token else 0.9
+            else:
+                start = token if len(token) <= longest else token[:longest]
+                if start not in scored:
+                    scored[start] = token_score(query_token, start, partial)
+                score = scored[start]
+            if score:
+                levels[score].update(self._name_postings.get(token, ()))
+                levels[round(score * EMAIL_WEIGHT, 6)].update(self._email_postings.get(token, ()))
+        return sorted(((s, keys) for s, keys in levels.items() if keys), key=lambda level: -level[0])
+
+    def _search_text(self, query_tokens, limit):
+        if not query_tokens or sum(len(t) for t in query_tokens) < 2:
+            return []
+
+        # The last word may still be being typed, so it is matched as a prefix
+        last = len(query_tokens) - 1
+        words = [self._word_levels(q, partial=i == last) for i, q in enumerate(query_tokens)]
+        words = [levels for levels in words if levels]
+        if not words:
+            return []
+
+        matching = [set().union(*(keys for _, keys in levels)) for levels in words]
+        candidates = set.intersection(*matching)
+        if len(candidates) < limit:
+            candidates = min(matching, key=len)
+
+        if len(words) == 1:
+            by_score = [(score, keys & candidates) for score, keys in words[0]]
+        else:
+            # Sum each record's best score per word; the candidates are
+            # usually few once every word has to match
+            scores = dict.fromkeys(candidates, 0)
+            for levels in words:
+                seen = set()
+                for score, keys in levels:
+                    for key in (keys & candidates) - seen:
+                        scores[key] += score
+                    seen |= keys
+            grouped = defaultdict(set)
+            for key, score in scores.items():
+                grouped[round(score, 6)].add(key)
+            by_score = sorted(grouped.items(), key=lambda level: -level[0])
+
+        # Best score first, alphabetical by name within a score
+        ranked = []
+        for _, keys in by_score:
+            keys = keys.difference(ranked)
+            ranked.extend(heapq.nsmallest(limit - len(ranked), keys, key=self._names.__getitem__))
+            if len(ranked) >= limit:
+                break
+        return [self._records[key] for key in ranked]